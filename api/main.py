@@ -1,129 +1,176 @@
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import Dict, List, Optional, Any
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+from typing import Callable, Dict, List, Optional, Any
 import os
+import asyncio
+from contextlib import asynccontextmanager
 
 # Import search methods
 from search.bm25_search import search_bm25
 from search.unicoil_search import search_unicoil
 from search.weaviate_dense_search import search_dense_weaviate
 from search.weaviate_multivector_search import search_multivector_weaviate
+from search.snippets import SNIPPET_MAX_LENGTH, apply_snippets
+from search.rerank import RERANK_MAX_CANDIDATES, RERANK_CANDIDATES_LIMIT, rerank_results
+from search.results import METADATA_FIELDS
+from search.index_registry import IndexGeneration, current_generation, pinned, start_watcher, stop_watcher
+from search.sharded_search import shutdown_shard_pool
+
+from api.serialization import FastJSONResponse, ndjson_line
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open and warm the published index generation, then hot-swap to new ones
+    await run_in_threadpool(start_watcher)
+    yield
+    stop_watcher()
+    shutdown_shard_pool()
 
 app = FastAPI(
     title="Veterinary Learning Content Search API",
     description="API for searching veterinary learning content using multiple retrieval methods",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 class SearchRequest(BaseModel):
     query: str
     filters: Optional[Dict[str, str]] = None
-    top_k: int = 10
+    top_k: int = Field(10, gt=0)
+    collapse_duplicates: bool = False
+    # Replace full contents with a query-biased snippet of at most this many characters
+    snippet_length: Optional[int] = Field(None, gt=0, le=SNIPPET_MAX_LENGTH)
+    # /search/all only: stream NDJSON lines, one per backend as soon as it finishes
+    stream: bool = False
+    # Rerank retrieved candidates with a cross-encoder, within candidate and time budgets
+    rerank: bool = False
+    rerank_candidates: Optional[int] = Field(None, gt=0)
+    rerank_budget_ms: Optional[float] = Field(None, gt=0)
 
-class SearchResponse(BaseModel):
-    results: List[Dict[str, Any]]
-    metadata: Dict[str, Any]
+    @field_validator("filters")
+    @classmethod
+    def check_filter_fields(cls, filters: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        # Every backend filters on the same metadata fields
+        unknown = sorted(set(filters or {}) - set(METADATA_FIELDS))
+        if unknown:
+            raise ValueError(f"Unsupported filter fields: {', '.join(unknown)} "
+                             f"(supported: {', '.join(METADATA_FIELDS)})")
+        return filters
 
-@app.get("/")
-async def root():
-    return {"message": "Welcome to the Veterinary Learning Content Search API"}
+# Result keys of /search/all and the search function behind each
+ALL_SEARCH_METHODS = {
+    "bm25_results": search_bm25,
+    "unicoil_results": search_unicoil,
+    "dense_results": search_dense_weaviate,
+    "multi_vector_results": search_multivector_weaviate
+}
 
-@app.post("/search/bm25", response_model=SearchResponse)
-async def bm25_search(request: SearchRequest):
+def request_metadata(request: SearchRequest, generation: IndexGeneration) -> Dict[str, Any]:
+    return {
+        "query": request.query,
+        "filters": request.filters,
+        "top_k": request.top_k,
+        "collapse_duplicates": request.collapse_duplicates,
+        "snippet_length": request.snippet_length,
+        "rerank": request.rerank,
+        "index_generation": generation.name
+    }
+
+def run_search(search_fn: Callable, request: SearchRequest, generation: IndexGeneration) -> List[Dict[str, Any]]:
+    """
+    Run a search function for a request, reranking and shortening contents to snippets if requested.
+
+    The whole request is served from one index generation, resolved by the
+    caller, even if a newer one is activated while it runs.
+    """
+    with pinned(generation):
+        return _run_search(search_fn, request)
+
+def _run_search(search_fn: Callable, request: SearchRequest) -> List[Dict[str, Any]]:
+    if request.rerank:
+        # Retrieve the candidate budget, capped server-side, then keep the top_k after reranking
+        candidates = min(request.rerank_candidates or RERANK_MAX_CANDIDATES, RERANK_CANDIDATES_LIMIT)
+        num_candidates = max(request.top_k, candidates)
+        results = search_fn(request.query, request.filters, num_candidates, request.collapse_duplicates)
+        results = rerank_results(request.query, results, request.top_k, num_candidates, request.rerank_budget_ms)
+    else:
+        results = search_fn(request.query, request.filters, request.top_k, request.collapse_duplicates)
+    if request.snippet_length:
+        results = apply_snippets(results, request.query, request.snippet_length)
+    return results
+
+async def single_search(search_fn: Callable, search_method: str, request: SearchRequest) -> FastJSONResponse:
+    if request.stream:
+        # Only /search/all streams; a single method has one result list to send
+        raise HTTPException(status_code=422, detail="stream is only supported by /search/all")
+    generation = current_generation()
     try:
-        results = search_bm25(request.query, request.filters, request.top_k)
-        return {
+        results = await run_in_threadpool(run_search, search_fn, request, generation)
+        # Results are plain dicts already; serialize them without re-validation
+        return FastJSONResponse({
             "results": results,
-            "metadata": {
-                "search_method": "BM25",
-                "query": request.query,
-                "filters": request.filters,
-                "top_k": request.top_k
-            }
-        }
+            "metadata": dict(request_metadata(request, generation), search_method=search_method)
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/search/unicoil", response_model=SearchResponse)
+@app.get("/")
+async def root():
+    return {"message": "Welcome to the Veterinary Learning Content Search API"}
+
+@app.post("/search/bm25")
+async def bm25_search(request: SearchRequest):
+    return await single_search(search_bm25, "BM25", request)
+
+@app.post("/search/unicoil")
 async def unicoil_search(request: SearchRequest):
-    try:
-        results = search_unicoil(request.query, request.filters, request.top_k)
-        return {
-            "results": results,
-            "metadata": {
-                "search_method": "uniCOIL",
-                "query": request.query,
-                "filters": request.filters,
-                "top_k": request.top_k
-            }
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await single_search(search_unicoil, "uniCOIL", request)
 
-@app.post("/search/dense", response_model=SearchResponse)
+@app.post("/search/dense")
 async def dense_search(request: SearchRequest):
-    try:
-        results = search_dense_weaviate(request.query, request.filters, request.top_k)
-        return {
-            "results": results,
-            "metadata": {
-                "search_method": "Dense BGE-M3",
-                "query": request.query,
-                "filters": request.filters,
-                "top_k": request.top_k
-            }
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await single_search(search_dense_weaviate, "Dense BGE-M3", request)
 
-@app.post("/search/multivector", response_model=SearchResponse)
+@app.post("/search/multivector")
 async def multivector_search(request: SearchRequest):
-    try:
-        results = search_multivector_weaviate(request.query, request.filters, request.top_k)
-        return {
-            "results": results,
-            "metadata": {
-                "search_method": "Multi-vector BGE-M3",
-                "query": request.query,
-                "filters": request.filters,
-                "top_k": request.top_k
-            }
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await single_search(search_multivector_weaviate, "Multi-vector BGE-M3", request)
+
+async def stream_all(request: SearchRequest, generation: IndexGeneration):
+    """Yield one NDJSON line per backend in completion order, then the metadata"""
+    async def run_backend(key: str, search_fn: Callable):
+        try:
+            return {"backend": key, "results": await run_in_threadpool(run_search, search_fn, request, generation)}
+        except Exception as e:
+            return {"backend": key, "error": str(e)}
+
+    # Held for the whole stream, which starts after the generation was resolved
+    with generation.in_use():
+        tasks = [run_backend(key, search_fn) for key, search_fn in ALL_SEARCH_METHODS.items()]
+        for next_done in asyncio.as_completed(tasks):
+            yield ndjson_line(await next_done)
+        yield ndjson_line({"metadata": request_metadata(request, generation)})
 
 @app.post("/search/all")
 async def search_all(request: SearchRequest):
+    # Every backend serves this request from the same generation
+    generation = current_generation()
+    if request.stream:
+        return StreamingResponse(stream_all(request, generation), media_type="application/x-ndjson")
     try:
-        # Get results from all search methods
-        bm25_results = search_bm25(request.query, request.filters, request.top_k)
-        unicoil_results = search_unicoil(request.query, request.filters, request.top_k)
-        dense_results = search_dense_weaviate(request.query, request.filters, request.top_k)
-        multivector_results = search_multivector_weaviate(request.query, request.filters, request.top_k)
-        
-        # Store results for later analysis
-        search_record = {
-            "query": request.query,
-            "filters": request.filters,
-            "top_k": request.top_k,
-            "bm25_results": bm25_results,
-            "unicoil_results": unicoil_results,
-            "dense_results": dense_results,
-            "multi_vector_results": multivector_results
-        }
+        # Get results from all search methods concurrently, off the event loop
+        bm25_results, unicoil_results, dense_results, multivector_results = await asyncio.gather(
+            *(run_in_threadpool(run_search, search_fn, request, generation) for search_fn in ALL_SEARCH_METHODS.values())
+        )
         
         # Return combined results
-        return {
+        return FastJSONResponse({
             "bm25_results": bm25_results,
             "unicoil_results": unicoil_results,
             "dense_results": dense_results,
             "multi_vector_results": multivector_results,
-            "metadata": {
-                "query": request.query,
-                "filters": request.filters,
-                "top_k": request.top_k
-            }
-        }
+            "metadata": request_metadata(request, generation)
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
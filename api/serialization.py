@@ -0,0 +1,37 @@
+from typing import Any
+import json
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+def _default(obj: Any) -> Any:
+    # NumPy scalars and arrays from the search backends
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(payload: Any) -> bytes:
+    """Serialize a payload to compact JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+def ndjson_line(payload: Any) -> bytes:
+    """Serialize a payload as one NDJSON line"""
+    return dumps(payload) + b"\n"
+
+class FastJSONResponse(Response):
+    """
+    JSON response that skips response_model validation and re-encoding.
+
+    Returning a Response from an endpoint makes FastAPI send it as-is, so the
+    already plain-dict search results are serialized exactly once.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,87 @@
+"""
+Measure query-encode throughput and tail latency with and without micro-batching.
+
+Each concurrency level runs that many client threads issuing encodes back to
+back for a fixed duration, first calling the model directly (one forward pass
+per query) and then through EncodeBatcher.
+
+Usage:
+    python -m benchmarks.encode_batching_bench --concurrency 1 4 16 64 --window-ms 5
+    python -m benchmarks.encode_batching_bench --real-model --duration 30
+"""
+import time
+import argparse
+import threading
+from typing import Callable, List, Optional
+
+from benchmarks.stats import summarize, format_summary
+from benchmarks.standin_models import StandInEncoder
+from search.query_encoder import EncodeBatcher
+
+QUERIES = [
+    "How to treat CKD in cats?",
+    "Diagnosis of hypertrophic cardiomyopathy",
+    "Cranial cruciate ligament rupture surgical options",
+    "Fluid therapy for parvovirus in dogs",
+    "Wound healing phases",
+]
+
+def drive(encode: Callable[[str], object], concurrency: int, duration: float):
+    latencies: List[float] = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(offset: int):
+        i = offset
+        local = []
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            encode(QUERIES[i % len(QUERIES)])
+            local.append((time.perf_counter() - start) * 1000.0)
+            i += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, time.perf_counter() - start)
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched query encoding")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per run")
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--real-model", action="store_true", help="Use BGE-M3 instead of the stand-in")
+    parser.add_argument("--fixed-ms", type=float, default=20.0, help="Stand-in cost per model call")
+    parser.add_argument("--per-item-ms", type=float, default=2.0, help="Stand-in cost per query")
+    args = parser.parse_args(argv)
+
+    if args.real_model:
+        from search.query_encoder import get_model
+        model = get_model()
+    else:
+        model = StandInEncoder(fixed_ms=args.fixed_ms, per_item_ms=args.per_item_ms)
+
+    model_lock = threading.Lock()
+
+    def direct(text: str):
+        # One forward pass per query; the lock models a single CPU-bound model instance
+        with model_lock:
+            return model.encode(text)
+
+    batcher = EncodeBatcher(lambda texts: model.encode(texts, batch_size=len(texts)),
+                            args.window_ms, args.max_batch_size)
+    try:
+        for concurrency in args.concurrency:
+            print(format_summary(f"unbatched c={concurrency}", drive(direct, concurrency, args.duration)))
+            print(format_summary(f"batched   c={concurrency}", drive(batcher.encode, concurrency, args.duration)))
+    finally:
+        batcher.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Compare the native impact index with Lucene, or verify it on a synthetic corpus.
+
+With --lucene-index, queries are encoded once with uniCOIL and run against both
+engines; ranking agreement (identical top-k, identical scores up to tie order,
+overlap@k) and latency are reported.
+With --synthetic, a random Zipfian corpus is generated and the MaxScore search is
+checked against exhaustive scoring, which needs neither the JVM nor the model.
+
+Usage:
+    python -m benchmarks.impact_index_bench --native-index /app/indexes/unicoil_native \\
+        --lucene-index /app/indexes/unicoil --queries queries.jsonl
+    python -m benchmarks.impact_index_bench --synthetic --num-docs 100000
+"""
+import json
+import time
+import random
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.stats import summarize, format_summary
+from search.impact_index import ImpactIndex
+
+def load_queries(path: Optional[str], limit: int) -> List[str]:
+    """Read queries from a JSONL file with a "query" field, or use sample content snippets"""
+    if path:
+        with open(path, 'r') as f:
+            return [json.loads(line)["query"] for line in f if line.strip()][:limit]
+    from data_generator import content_snippets
+    snippets = [s for values in content_snippets.values() for s in values]
+    return [" ".join(s.split()[:8]) for s in snippets][:limit]
+
+STRANDS = ["Internal Medicine", "Surgery", "Diagnostics"]
+
+def synthetic_corpus(num_docs: int, rng: random.Random) -> Tuple[List[Dict], List[str], List[float]]:
+    """Random impact-encoded documents over a Zipfian vocabulary; returns (docs, vocab, term weights)"""
+    vocab = [f"term{i}" for i in range(max(1000, num_docs // 10))]
+    weights = [1.0 / (i + 1) for i in range(len(vocab))]
+    docs = [
+        {
+            "id": f"doc{d}",
+            "strand": rng.choice(STRANDS),
+            "vector": {t: rng.randint(1, 300) for t in rng.choices(vocab, weights=weights, k=rng.randint(5, 80))}
+        }
+        for d in range(num_docs)
+    ]
+    return docs, vocab, weights
+
+def synthetic_query(rng: random.Random, vocab: List[str], weights: List[float]) -> Dict[str, int]:
+    return {t: rng.randint(1, 200) for t in rng.choices(vocab, weights=weights, k=rng.randint(1, 8))}
+
+def synthetic_check(num_docs: int, num_queries: int, k: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    docs, vocab, weights = synthetic_corpus(num_docs, rng)
+    index = ImpactIndex.from_documents(docs)
+
+    maxscore, exhaustive, mismatches = [], [], 0
+    for q in range(num_queries):
+        query = synthetic_query(rng, vocab, weights)
+        filters = {"strand": rng.choice(STRANDS)} if q % 2 else None
+        start = time.perf_counter()
+        fast = index.search(query, k, filters)
+        maxscore.append((time.perf_counter() - start) * 1000.0)
+        start = time.perf_counter()
+        reference = index.exhaustive_search(query, k, filters)
+        exhaustive.append((time.perf_counter() - start) * 1000.0)
+        mismatches += fast != reference
+
+    print(f"{num_queries - mismatches}/{num_queries} queries match exhaustive scoring")
+    uncompressed = index.offsets[-1] * (4 + index.impacts.itemsize)
+    print(f"Posting lists: {index.postings_nbytes / 1e6:.1f} MB "
+          f"({uncompressed / 1e6:.1f} MB as uint32 doc numbers and fixed-width impacts)")
+    print(format_summary("native MaxScore", summarize(maxscore, sum(maxscore) / 1000.0)))
+    print(format_summary("exhaustive", summarize(exhaustive, sum(exhaustive) / 1000.0)))
+
+def lucene_comparison(native_path: str, lucene_path: str, queries: List[str], k: int) -> None:
+    from pyserini.search.lucene import LuceneImpactSearcher
+    from search.sharded_search import search_impact_weights
+    from search.unicoil_search import encode_query
+
+    index = ImpactIndex.load(native_path)
+    searcher = LuceneImpactSearcher(lucene_path, query_encoder=None)
+
+    native_ms, lucene_ms = [], []
+    identical, same_scores, overlap = 0, 0, 0.0
+    for query in queries:
+        weights: Dict[str, int] = encode_query(query)
+
+        start = time.perf_counter()
+        native_hits = index.search(weights, k)
+        native_ms.append((time.perf_counter() - start) * 1000.0)
+
+        start = time.perf_counter()
+        lucene_hits = search_impact_weights(searcher, weights, k)
+        lucene_ms.append((time.perf_counter() - start) * 1000.0)
+
+        native_ids = [index.docs[d]["id"] for d, _ in native_hits]
+        lucene_ids = [hit.docid for hit in lucene_hits]
+        identical += native_ids == lucene_ids
+        # The engines may order tied documents differently
+        same_scores += [score for _, score in native_hits] == [hit.score for hit in lucene_hits]
+        if lucene_ids:
+            overlap += len(set(native_ids) & set(lucene_ids)) / len(lucene_ids)
+
+    print(f"Identical top-{k}: {identical}/{len(queries)}, identical scores: {same_scores}/{len(queries)}, "
+          f"mean overlap@{k}: {overlap / max(1, len(queries)):.3f}")
+    print(format_summary("native", summarize(native_ms, sum(native_ms) / 1000.0)))
+    print(format_summary("lucene", summarize(lucene_ms, sum(lucene_ms) / 1000.0)))
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the native uniCOIL impact index")
+    parser.add_argument("--synthetic", action="store_true", help="Verify on a random corpus")
+    parser.add_argument("--num-docs", type=int, default=50000)
+    parser.add_argument("--native-index", default="/app/indexes/unicoil_native")
+    parser.add_argument("--lucene-index", default="/app/indexes/unicoil")
+    parser.add_argument("--queries", default=None, help="JSONL file with a 'query' field per line")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        synthetic_check(args.num_docs, args.num_queries, args.top_k)
+    else:
+        lucene_comparison(args.native_index, args.lucene_index,
+                          load_queries(args.queries, args.num_queries), args.top_k)
+
+if __name__ == "__main__":
+    main()
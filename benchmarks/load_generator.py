@@ -0,0 +1,262 @@
+"""
+Open-loop load generator for the search API.
+
+Arrival times are drawn from a Poisson process at --rate requests per second
+before the run starts. Every request is sent at its scheduled time, however
+many requests are still outstanding, and its latency is measured from that
+scheduled time. A slow server therefore cannot slow the offered load down,
+and queueing delay shows up in the latencies instead of being hidden
+(coordinated omission).
+
+Queries are replayed from a JSONL file of request bodies (one SearchRequest
+per line, optionally with an "endpoint" field), or taken from a synthetic
+mix built from the sample data. Endpoints and filter selectivities are drawn
+from weighted mixes: no filter, a strand filter (broad) or a course_id
+filter (narrow).
+
+Usage:
+    python -m benchmarks.load_generator --url http://localhost:8000 --rate 50 --duration 60
+    python -m benchmarks.load_generator --queries logged_requests.jsonl --rate 200 \\
+        --mix bm25=4,unicoil=2,dense=2,multivector=1,all=1 --filters none=6,strand=3,course_id=1
+
+Run it against local stand-ins for Weaviate and the models with:
+    python -m benchmarks.standin_api --port 8000
+"""
+import json
+import random
+import asyncio
+import argparse
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Any, Tuple
+
+import httpx
+
+from benchmarks.stats import summarize, format_summary
+
+ENDPOINTS = {
+    "bm25": "/search/bm25",
+    "unicoil": "/search/unicoil",
+    "dense": "/search/dense",
+    "multivector": "/search/multivector",
+    "all": "/search/all"
+}
+
+# Filter selectivities of --filters: no filter, one strand, or one course
+FILTER_SELECTIVITIES = ["none", "strand", "course_id"]
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float("inf")]
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """Parse "a=3,b=1" into [("a", 3.0), ("b", 1.0)]"""
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+def load_request_bodies(path: str) -> List[Dict[str, Any]]:
+    """Read one request body per line; lines need at least a "query" field"""
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def synthetic_request_bodies() -> List[Dict[str, Any]]:
+    """Queries from the sample data: activity names and the opening words of each snippet"""
+    from data_generator import activities, content_snippets
+    queries = [activity["name"] for activity in activities]
+    queries += [" ".join(s.split()[:6]) for snippets in content_snippets.values() for s in snippets]
+    return [{"query": query} for query in queries]
+
+def synthetic_filters(selectivity: str, rng: random.Random) -> Optional[Dict[str, str]]:
+    from data_generator import activities, courses
+    if selectivity == "strand":
+        return {"strand": rng.choice(sorted({a["strand"] for a in activities}))}
+    if selectivity == "course_id":
+        return {"course_id": rng.choice(courses)["id"]}
+    return None
+
+def poisson_schedule(rate: float, duration: float, rng: random.Random) -> List[float]:
+    """Send offsets in seconds of a Poisson process with the given rate"""
+    offsets, t = [], rng.expovariate(rate)
+    while t < duration:
+        offsets.append(t)
+        t += rng.expovariate(rate)
+    return offsets
+
+def plan_requests(bodies: List[Dict[str, Any]], offsets: List[float], endpoint_mix: List[Tuple[str, float]],
+                  filter_mix: List[Tuple[str, float]], rng: random.Random) -> List[Tuple[float, str, Dict[str, Any]]]:
+    """
+    Assign a body, endpoint and (for bodies without filters) a filter to every arrival.
+
+    Raises:
+        ValueError: On endpoints or filter selectivities the generator does not know
+    """
+    unknown = sorted({name for name, _ in endpoint_mix} - set(ENDPOINTS))
+    if unknown:
+        raise ValueError(f"Unknown endpoints in --mix: {', '.join(unknown)} (choose from {', '.join(ENDPOINTS)})")
+    unknown = sorted({name for name, _ in filter_mix} - set(FILTER_SELECTIVITIES))
+    if unknown:
+        raise ValueError(f"Unknown selectivities in --filters: {', '.join(unknown)} "
+                         f"(choose from {', '.join(FILTER_SELECTIVITIES)})")
+    unknown = sorted({body["endpoint"] for body in bodies if body.get("endpoint")} - set(ENDPOINTS))
+    if unknown:
+        raise ValueError(f"Unknown endpoints in --queries: {', '.join(unknown)}")
+    endpoints, endpoint_weights = zip(*endpoint_mix)
+    selectivities, filter_weights = zip(*filter_mix)
+    plan = []
+    for offset in offsets:
+        body = dict(rng.choice(bodies))
+        endpoint = body.pop("endpoint", None) or rng.choices(endpoints, endpoint_weights)[0]
+        if "filters" not in body:
+            filters = synthetic_filters(rng.choices(selectivities, filter_weights)[0], rng)
+            if filters:
+                body["filters"] = filters
+        plan.append((offset, endpoint, body))
+    return plan
+
+class Recorder:
+    """Latencies, errors and send lag of one run"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.send_lag_ms: List[float] = []
+
+    def record(self, endpoint: str, latency_ms: float, error: Optional[str]) -> None:
+        if error:
+            self.errors[endpoint][error] += 1
+        else:
+            self.latencies[endpoint].append(latency_ms)
+
+async def send(client: httpx.AsyncClient, endpoint: str, body: Dict[str, Any], scheduled: float,
+               timeout: float, recorder: Optional[Recorder]) -> None:
+    loop = asyncio.get_running_loop()
+    if recorder is not None:
+        recorder.send_lag_ms.append((loop.time() - scheduled) * 1000.0)
+    error = None
+    # The timeout runs from the scheduled time, so time spent queued behind the
+    # scheduler counts towards it; a request already past it times out unsent
+    remaining = max(0.0, timeout - (loop.time() - scheduled))
+    try:
+        response = await asyncio.wait_for(client.post(ENDPOINTS[endpoint], json=body), remaining)
+        await response.aread()
+        if response.status_code >= 400:
+            error = f"http_{response.status_code}"
+    except asyncio.TimeoutError:
+        error = "timeout"
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    # Measured from the scheduled send time, not from when the request went out
+    latency_ms = (loop.time() - scheduled) * 1000.0
+    if recorder is not None:
+        recorder.record(endpoint, latency_ms, error)
+
+async def run_load(url: str, plan: List[Tuple[float, str, Dict[str, Any]]], warmup: float, timeout: float,
+                   max_connections: int) -> Tuple[Recorder, float]:
+    """
+    Send every planned request at its scheduled time.
+
+    Args:
+        url: Base URL of the API
+        plan: (offset, endpoint, body) per request, sorted by offset
+        warmup: Requests scheduled before this offset are sent but not recorded
+        timeout: Per-request timeout in seconds, counted from the scheduled time
+        max_connections: Connection limit of the HTTP client
+
+    Returns:
+        Tuple of (recorder, measured duration in seconds)
+    """
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=httpx.Timeout(timeout, pool=None)) as client:
+        loop = asyncio.get_running_loop()
+        start = loop.time() + 0.1
+        tasks = []
+        for offset, endpoint, body in plan:
+            scheduled = start + offset
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(
+                send(client, endpoint, body, scheduled, timeout, recorder if offset >= warmup else None)
+            ))
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - start - warmup
+    return recorder, elapsed
+
+def histogram(latencies_ms: List[float], width: int = 40) -> str:
+    """Text histogram of latencies over HISTOGRAM_BOUNDS_MS"""
+    counts = [0] * len(HISTOGRAM_BOUNDS_MS)
+    for latency in latencies_ms:
+        counts[next(i for i, bound in enumerate(HISTOGRAM_BOUNDS_MS) if latency <= bound)] += 1
+    peak = max(counts) or 1
+    lines, lower = [], 0
+    for bound, count in zip(HISTOGRAM_BOUNDS_MS, counts):
+        if count:
+            label = f"{lower:g}-{bound:g}ms" if bound != float("inf") else f">{lower:g}ms"
+            lines.append(f"    {label:>14} {count:>7} {'#' * max(1, round(width * count / peak))}")
+        lower = bound
+    return "\n".join(lines)
+
+def report(recorder: Recorder, elapsed: float, rate: float) -> Dict[str, Any]:
+    """Print and return per-endpoint latency, throughput and error rates"""
+    rows = {}
+    endpoints = sorted(set(recorder.latencies) | set(recorder.errors))
+    for endpoint in endpoints + ["total"]:
+        if endpoint == "total":
+            latencies = [l for values in recorder.latencies.values() for l in values]
+            errors = sum((c for c in recorder.errors.values()), Counter())
+        else:
+            latencies, errors = recorder.latencies[endpoint], recorder.errors[endpoint]
+        sent = len(latencies) + sum(errors.values())
+        summary = summarize(latencies, elapsed)
+        rows[endpoint] = dict(summary, sent=sent, errors=dict(errors),
+                              error_rate=sum(errors.values()) / sent if sent else 0.0)
+        print(format_summary(endpoint, summary) + f"  errors={sum(errors.values())}/{sent} {dict(errors) or ''}")
+        if latencies:
+            print(histogram(latencies))
+
+    lag = summarize(recorder.send_lag_ms, elapsed)
+    print(f"offered {rate:.1f} req/s, completed {rows['total']['qps']:.1f} req/s over {elapsed:.1f}s; "
+          f"send lag p99 {lag['p99_ms']:.1f}ms")
+    if lag["p99_ms"] > 10:
+        print("warning: the generator fell behind its schedule; latencies include its own delay")
+    rows["send_lag"] = lag
+    return rows
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Open-loop Poisson load generator for the search API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--rate", type=float, default=20.0, help="Mean arrival rate in requests/s")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of load, including warm-up")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds excluded from the results")
+    parser.add_argument("--queries", default=None, help="JSONL file of request bodies to replay")
+    parser.add_argument("--mix", default="bm25=1,unicoil=1,dense=1,multivector=1", help="Endpoint weights")
+    parser.add_argument("--filters", default="none=7,strand=2,course_id=1", help="Filter selectivity weights")
+    parser.add_argument("--top-k", type=int, default=None, help="Override top_k in every request")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--max-connections", type=int, default=512)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    bodies = load_request_bodies(args.queries) if args.queries else synthetic_request_bodies()
+    if args.top_k:
+        bodies = [dict(body, top_k=args.top_k) for body in bodies]
+    try:
+        plan = plan_requests(bodies, poisson_schedule(args.rate, args.duration, rng),
+                             parse_mix(args.mix), parse_mix(args.filters), rng)
+    except ValueError as e:
+        # Nothing has been sent yet
+        parser.error(str(e))
+    print(f"Sending {len(plan)} requests to {args.url} at {args.rate:g} req/s for {args.duration:g}s")
+
+    recorder, elapsed = asyncio.run(run_load(args.url, plan, args.warmup, args.timeout, args.max_connections))
+    rows = report(recorder, elapsed, args.rate)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
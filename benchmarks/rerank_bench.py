@@ -0,0 +1,160 @@
+"""
+Measure the quality and latency of budgeted cross-encoder reranking.
+
+Queries come from a qrels file (JSONL with "query" and "relevant" id lists)
+or are sampled from the documents as known-item queries: a few consecutive
+words of a document, relevant to every document containing that phrase.
+Candidates are retrieved with one of the search methods (or a simple
+in-memory term-count retriever that needs no indexes), then reranked at
+each candidate/time budget. MRR@k, nDCG@k, Recall@k and reranking latency
+are reported against the retrieval-only baseline.
+
+The defaults (stand-in cross-encoder, known-item queries) measure the
+budgeting and latency only: the stand-in scores query word overlap and a
+known-item query is a phrase copied from its document, which is exactly
+what the stand-in rewards. Meaningful quality numbers need --real-model
+and judged --qrels; the output says which case applies.
+
+Usage:
+    python -m benchmarks.rerank_bench --method overlap --num-docs 2000 --budgets-ms 25 50 100 200
+    python -m benchmarks.rerank_bench --method bm25 --data /app/data/vet_moodle_dataset.jsonl \\
+        --real-model --candidates 20 50 --budgets-ms 100 200 400
+"""
+import re
+import json
+import math
+import random
+import argparse
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Any, Set, Tuple
+
+from benchmarks.stats import summarize, format_summary
+from benchmarks.standin_models import StandInCrossEncoder
+from search.rerank import Reranker, ScoreCache
+
+Qrels = List[Tuple[str, Set[str]]]
+
+_WORD_RE = re.compile(r"\w+")
+
+def load_documents(path: Optional[str], num_docs: int) -> List[Dict[str, Any]]:
+    if path:
+        with open(path, 'r') as f:
+            return [json.loads(line) for line in f][:num_docs]
+    from data_generator import generate_sample_data
+    return generate_sample_data(num_docs)
+
+def load_qrels(path: str) -> Qrels:
+    with open(path, 'r') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["query"], set(row["relevant"])) for row in rows]
+
+def known_item_qrels(documents: List[Dict[str, Any]], num_queries: int, words: int = 6, seed: int = 0) -> Qrels:
+    """Phrases sampled from documents, relevant to every document containing them"""
+    rng = random.Random(seed)
+    lowered = [(doc["id"], " ".join(_WORD_RE.findall(doc.get("contents", "").lower()))) for doc in documents]
+    qrels = []
+    for doc in rng.sample(documents, min(num_queries, len(documents))):
+        tokens = _WORD_RE.findall(doc.get("contents", "").lower())
+        if len(tokens) < words:
+            continue
+        start = rng.randrange(len(tokens) - words + 1)
+        phrase = " ".join(tokens[start:start + words])
+        qrels.append((phrase, {doc_id for doc_id, text in lowered if phrase in text}))
+    return qrels
+
+def overlap_retriever(documents: List[Dict[str, Any]]) -> Callable[[str, int], List[Dict[str, Any]]]:
+    """Rank documents by raw query-term counts, a deliberately weak first stage"""
+    counts = [Counter(_WORD_RE.findall(doc.get("contents", "").lower())) for doc in documents]
+
+    def search(query: str, k: int) -> List[Dict[str, Any]]:
+        terms = set(_WORD_RE.findall(query.lower()))
+        scored = [(sum(c[t] for t in terms), i) for i, c in enumerate(counts)]
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        return [dict(documents[i], score=float(s)) for s, i in scored[:k] if s > 0]
+    return search
+
+def search_method(name: str) -> Callable[[str, int], List[Dict[str, Any]]]:
+    from api.main import ALL_SEARCH_METHODS
+    search_fn = ALL_SEARCH_METHODS[f"{name}_results"]
+    return lambda query, k: search_fn(query, None, k)
+
+def metrics(ranked_ids: List[str], relevant: Set[str], k: int) -> Dict[str, float]:
+    top = ranked_ids[:k]
+    rr = next((1.0 / (rank + 1) for rank, doc_id in enumerate(top) if doc_id in relevant), 0.0)
+    dcg = sum(1.0 / math.log2(rank + 2) for rank, doc_id in enumerate(top) if doc_id in relevant)
+    idcg = sum(1.0 / math.log2(rank + 2) for rank in range(min(k, len(relevant))))
+    return {
+        f"mrr@{k}": rr,
+        f"ndcg@{k}": dcg / idcg if idcg else 0.0,
+        f"recall@{k}": len(set(top) & relevant) / len(relevant) if relevant else 0.0
+    }
+
+def mean_metrics(rows: List[Dict[str, float]]) -> Dict[str, float]:
+    return {key: sum(row[key] for row in rows) / len(rows) for key in rows[0]} if rows else {}
+
+def evaluate(qrels: Qrels, candidates: List[List[Dict[str, Any]]], model, k: int, max_candidates: int,
+             budget_ms: float, batch_size: int, stable_batches: int) -> Tuple[Dict[str, float], Dict[str, Any], Dict[str, Any]]:
+    # A fresh cache per configuration, so every query pays for its scoring
+    reranker = Reranker(model, batch_size=batch_size, stable_batches=stable_batches, cache=ScoreCache())
+    rows, latencies, scored, stops = [], [], [], Counter()
+    for (query, relevant), results in zip(qrels, candidates):
+        reranked, stats = reranker.rerank(query, results, k, max_candidates=max_candidates, budget_ms=budget_ms)
+        rows.append(metrics([r["id"] for r in reranked], relevant, k))
+        latencies.append(stats["elapsed_ms"])
+        scored.append(stats["scored"])
+        stops[stats["stop_reason"]] += 1
+    summary = summarize(latencies, sum(latencies) / 1000.0)
+    return mean_metrics(rows), summary, {"mean_scored": sum(scored) / len(scored), "stops": dict(stops)}
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Benchmark budgeted cross-encoder reranking")
+    parser.add_argument("--method", default="overlap", choices=["overlap", "bm25", "unicoil", "dense", "multi_vector"])
+    parser.add_argument("--data", default=None, help="JSONL dataset (default: generated sample data)")
+    parser.add_argument("--num-docs", type=int, default=2000)
+    parser.add_argument("--qrels", default=None, help="JSONL with 'query' and 'relevant' ids per line")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[20, 50])
+    parser.add_argument("--budgets-ms", type=float, nargs="+", default=[50, 100, 200, 1000])
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--stable-batches", type=int, default=2)
+    parser.add_argument("--real-model", action="store_true", help="Use RERANK_MODEL instead of the stand-in")
+    args = parser.parse_args(argv)
+
+    documents = load_documents(args.data, args.num_docs)
+    qrels = load_qrels(args.qrels) if args.qrels else known_item_qrels(documents, args.num_queries)
+    retrieve = overlap_retriever(documents) if args.method == "overlap" else search_method(args.method)
+    if args.real_model:
+        from search.rerank import get_reranker
+        model = get_reranker().model
+    else:
+        model = StandInCrossEncoder()
+
+    max_depth = max(args.candidates + [args.top_k])
+    candidates = [retrieve(query, max_depth) for query, _ in qrels]
+    baseline = mean_metrics([metrics([r["id"] for r in results], relevant, args.top_k)
+                             for (_, relevant), results in zip(qrels, candidates)])
+    print(f"{len(qrels)} queries, {args.method} retrieval")
+    if not args.real_model and not args.qrels:
+        print("Note: the stand-in cross-encoder scores word overlap and known-item queries are phrases copied "
+              "from their documents, so the quality numbers say nothing about a real reranker; only the "
+              "latency and budgeting numbers are meaningful. Use --real-model with --qrels to measure quality.")
+    elif not args.real_model:
+        print("Note: the stand-in cross-encoder scores word overlap, not relevance; use --real-model to measure "
+              "reranking quality.")
+    elif not args.qrels:
+        print("Note: known-item queries are phrases copied from their documents, which favour exact-match "
+              "scoring; use --qrels with judged queries for representative quality.")
+    print(f"{'retrieval only':<28} " + "  ".join(f"{key}={value:.3f}" for key, value in baseline.items()))
+
+    for max_candidates in args.candidates:
+        for budget_ms in args.budgets_ms:
+            quality, summary, stats = evaluate(qrels, candidates, model, args.top_k, max_candidates, budget_ms,
+                                               args.batch_size, args.stable_batches)
+            label = f"rerank {max_candidates}@{budget_ms:g}ms"
+            print(f"{label:<28} " + "  ".join(f"{key}={value:.3f}" for key, value in quality.items())
+                  + f"  scored={stats['mean_scored']:.1f}  stops={stats['stops']}")
+            print(format_summary(f"  {label} latency", summary))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Verify sharded scatter-gather search against the unsharded index and measure its scaling.
+
+Both modes build an unsharded and a sharded index from the same documents,
+check that the merged sharded top-k equals the unsharded top-k (same scores;
+ids may only differ among hits tied at the cut-off), and report QPS for each
+number of shard worker processes next to the single-process baseline.
+Shards are pinned to workers, so more workers than shards add nothing.
+
+--synthetic uses random impact-encoded documents and the native uniCOIL
+engine, which needs neither the JVM nor a model. --data builds Lucene BM25
+indexes from a JSONL dataset and checks the global-statistics scoring.
+
+Usage:
+    python -m benchmarks.sharded_search_bench --synthetic --num-docs 100000 --shards 4 --workers 1 2 4
+    python -m benchmarks.sharded_search_bench --data /app/data/vet_moodle_dataset.jsonl \\
+        --work-dir /tmp/shard_bench --shards 4 --workers 1 2 4 8
+"""
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, Any
+
+from benchmarks.stats import summarize, format_summary
+from benchmarks.impact_index_bench import STRANDS, load_queries, synthetic_corpus, synthetic_query
+from indexing.sharding import partition, shard_dirs, write_shard_manifest, read_shard_manifest
+from search import sharded_search
+from search.sharded_search import scatter_gather, search_bm25_sharded, search_impact_shard, shutdown_shard_pool
+from search.impact_index import ImpactIndex
+
+Ranking = List[Tuple[str, float]]
+
+def same_ranking(reference: Ranking, candidate: Ranking, rel_tol: float) -> bool:
+    """Equal scores at every rank, and equal ids except among hits tied with the last one"""
+    if len(reference) != len(candidate):
+        return False
+    for (_, a), (_, b) in zip(reference, candidate):
+        if abs(a - b) > rel_tol * max(abs(a), abs(b), 1.0):
+            return False
+    if not reference:
+        return True
+    cutoff = reference[-1][1] * (1 + rel_tol) + rel_tol
+    return {i for i, s in reference if s > cutoff} == {i for i, s in candidate if s > cutoff}
+
+def throughput(search_fn: Callable[[Any], Any], queries: List[Any], concurrency: int) -> dict:
+    """Run every query from a thread pool and summarize latency and QPS"""
+    def timed(query) -> float:
+        start = time.perf_counter()
+        search_fn(query)
+        return (time.perf_counter() - start) * 1000.0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, queries))
+    return summarize(latencies, time.perf_counter() - start)
+
+def run(queries: List[Any], reference_fn: Callable[[Any], Ranking], sharded_fn: Callable[[Any], Ranking],
+        workers: List[int], concurrency: int, rel_tol: float) -> None:
+    shutdown_shard_pool()
+    sharded_search.SHARD_WORKERS = max(workers)
+    mismatches = sum(not same_ranking(reference_fn(q), sharded_fn(q), rel_tol) for q in queries)
+    print(f"{len(queries) - mismatches}/{len(queries)} queries match the unsharded index")
+
+    print(format_summary("unsharded (1 process)", throughput(reference_fn, queries, concurrency)))
+    for num_workers in workers:
+        shutdown_shard_pool()
+        sharded_search.SHARD_WORKERS = num_workers
+        # Let the workers open their shards before timing
+        throughput(sharded_fn, queries, concurrency)
+        print(format_summary(f"sharded ({num_workers} workers)", throughput(sharded_fn, queries, concurrency)))
+    shutdown_shard_pool()
+
+def synthetic_bench(args) -> None:
+    rng = random.Random(0)
+    docs, vocab, weights = synthetic_corpus(args.num_docs, rng)
+    index = ImpactIndex.from_documents(docs)
+
+    sharded_dir = os.path.join(args.work_dir, "unicoil_native_sharded")
+    shutil.rmtree(sharded_dir, ignore_errors=True)
+    for shard_docs, shard_dir in zip(partition(docs, args.shards), shard_dirs(sharded_dir, args.shards)):
+        ImpactIndex.from_documents(shard_docs).save(shard_dir)
+    write_shard_manifest(sharded_dir, args.shards)
+    shard_manifest = read_shard_manifest(sharded_dir)
+
+    queries = [(synthetic_query(rng, vocab, weights), {"strand": rng.choice(STRANDS)} if q % 2 else None)
+               for q in range(args.num_queries)]
+
+    def reference(query) -> Ranking:
+        weights_, filters = query
+        return [(index.docs[d]["id"], s) for d, s in index.search(weights_, args.top_k, filters)]
+
+    def sharded(query) -> Ranking:
+        weights_, filters = query
+        return [(doc["id"], s) for s, doc in scatter_gather(search_impact_shard, sharded_dir, shard_manifest,
+                                                            weights_, args.top_k, filters, engine="native")]
+
+    run(queries, reference, sharded, args.workers, args.concurrency, 0.0)
+
+def bm25_bench(args) -> None:
+    from pyserini.search.lucene import LuceneSearcher
+    from indexing.pyserini_bm25_index import create_bm25_index
+
+    with open(args.data, 'r') as f:
+        docs = [json.loads(line) for line in f]
+    unsharded_dir = os.path.join(args.work_dir, "bm25")
+    sharded_dir = os.path.join(args.work_dir, "bm25_sharded")
+    if not args.reuse:
+        shutil.rmtree(unsharded_dir, ignore_errors=True)
+        shutil.rmtree(sharded_dir, ignore_errors=True)
+        create_bm25_index(docs, unsharded_dir)
+        for shard_docs, shard_dir in zip(partition(docs, args.shards), shard_dirs(sharded_dir, args.shards)):
+            create_bm25_index(shard_docs, shard_dir)
+        write_shard_manifest(sharded_dir, args.shards)
+    shard_manifest = read_shard_manifest(sharded_dir)
+
+    searcher = LuceneSearcher(unsharded_dir)
+    searcher.set_bm25(sharded_search.BM25_K1, sharded_search.BM25_B)
+
+    def reference(query: str) -> Ranking:
+        return [(hit.docid, hit.score) for hit in searcher.search(query, k=args.top_k)]
+
+    def sharded(query: str) -> Ranking:
+        return [(doc["id"], s) for s, doc in search_bm25_sharded(sharded_dir, shard_manifest, query, args.top_k)]
+
+    # Lucene scores in single precision, so allow for float rounding
+    run(load_queries(args.queries, args.num_queries), reference, sharded, args.workers, args.concurrency, 1e-5)
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Verify and benchmark sharded scatter-gather search")
+    parser.add_argument("--synthetic", action="store_true", help="Native uniCOIL shards on a random corpus")
+    parser.add_argument("--num-docs", type=int, default=100000)
+    parser.add_argument("--data", default=None, help="JSONL dataset to build BM25 indexes from")
+    parser.add_argument("--reuse", action="store_true", help="Reuse indexes already built in --work-dir")
+    parser.add_argument("--queries", default=None, help="JSONL file with a 'query' field per line")
+    parser.add_argument("--work-dir", default="/tmp/shard_bench")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        synthetic_bench(args)
+    elif args.data:
+        bm25_bench(args)
+    else:
+        parser.error("Pass --synthetic or --data")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Run the search API against local stand-ins for Weaviate and the models.
+
+A stand-in Weaviate server is started on a free port, a native uniCOIL index
+is built from generated sample data with hashed term impacts, and the query
+encoders and cross-encoder are replaced by the stand-ins in
+benchmarks.standin_models. Everything else — request handling, batching,
+caching, result formatting, reranking — is the real query path, so load
+tests such as benchmarks.load_generator can run on a laptop.
+
+BM25 is served from a second native index whose impacts are quantized
+BM25 term weights, behind a searcher with the LuceneSearcher methods that
+search.bm25_search uses, so /search/bm25 and /search/all work without
+Pyserini or the JVM.
+
+Usage:
+    python -m benchmarks.standin_api --port 8000 --num-docs 5000 --weaviate-latency-ms 2
+"""
+import os
+import re
+import json
+import math
+import zlib
+import argparse
+import tempfile
+from collections import Counter, namedtuple
+from typing import Dict, List, Optional
+
+_WORD_RE = re.compile(r"\w+")
+
+# Fixed-point scale of the quantized BM25 weights
+BM25_SCALE = 100
+
+StandInHit = namedtuple("StandInHit", ["docid", "score"])
+
+def standin_impacts(text: str) -> Dict[str, int]:
+    """Quantized term impacts from term counts and a hash of each term"""
+    counts = Counter(_WORD_RE.findall(text.lower()))
+    return {term: count * (zlib.crc32(term.encode("utf-8")) % 50 + 1) for term, count in counts.items()}
+
+def standin_query_impacts(query: str) -> Dict[str, int]:
+    return {term: 1 for term in _WORD_RE.findall(query.lower())}
+
+def build_native_index(documents: List[dict], output_dir: str) -> None:
+    from search.impact_index import ImpactIndex
+
+    documents = [dict(doc, vector=standin_impacts(doc["contents"])) for doc in documents]
+    ImpactIndex.from_documents(documents).save(output_dir)
+
+def bm25_impacts(documents: List[dict], k1: float = 0.9, b: float = 0.4) -> List[Dict[str, int]]:
+    """Per-document BM25 term weights (Pyserini's default k1 and b), quantized to integers"""
+    counts = [Counter(_WORD_RE.findall(doc["contents"].lower())) for doc in documents]
+    doc_freqs = Counter(term for c in counts for term in c)
+    avgdl = sum(sum(c.values()) for c in counts) / max(len(counts), 1)
+    idf = {term: math.log(1 + (len(counts) - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()}
+    impacts = []
+    for c in counts:
+        norm = k1 * (1 - b + b * sum(c.values()) / avgdl)
+        impacts.append({term: max(1, round(BM25_SCALE * idf[term] * tf * (k1 + 1) / (tf + norm)))
+                        for term, tf in c.items()})
+    return impacts
+
+def build_bm25_index(documents: List[dict], output_dir: str) -> None:
+    from search.impact_index import ImpactIndex
+
+    documents = [dict(doc, vector=impacts) for doc, impacts in zip(documents, bm25_impacts(documents))]
+    ImpactIndex.from_documents(documents).save(output_dir)
+
+class StandInBm25Searcher:
+    """The parts of LuceneSearcher used by search.bm25_search, over a BM25-weighted native index"""
+
+    def __init__(self, path: str):
+        from search.impact_index import ImpactIndex
+        self.index = ImpactIndex.load(path)
+        self.doc_nums = {doc["id"]: i for i, doc in enumerate(self.index.docs)}
+
+    def search(self, query: str, k: int = 10):
+        # search_bm25 applies the filters to the stored documents of the hits
+        weights = Counter(_WORD_RE.findall(query.lower()))
+        return [StandInHit(self.index.docs[doc_num]["id"], score / BM25_SCALE)
+                for doc_num, score in self.index.search(weights, k=k)]
+
+    def doc(self, docid: str) -> "StandInDocument":
+        return StandInDocument(json.dumps(self.index.docs[self.doc_nums[docid]]))
+
+class StandInDocument:
+    """A stored document as returned by LuceneSearcher.doc"""
+
+    def __init__(self, raw: str):
+        self._raw = raw
+
+    def raw(self) -> str:
+        return self._raw
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Run the search API with local stand-ins for Weaviate and the models")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--num-docs", type=int, default=5000, help="Documents in the uniCOIL and BM25 indexes")
+    parser.add_argument("--weaviate-results", type=int, default=10)
+    parser.add_argument("--weaviate-latency-ms", type=float, default=2.0)
+    parser.add_argument("--encoder-fixed-ms", type=float, default=20.0)
+    parser.add_argument("--encoder-per-item-ms", type=float, default=2.0)
+    parser.add_argument("--work-dir", default=None, help="Directory for the indexes (default: a temporary one)")
+    args = parser.parse_args(argv)
+
+    from benchmarks.standin_weaviate import start_server
+    from data_generator import generate_sample_data
+    weaviate_server = start_server(0, args.weaviate_results, args.weaviate_latency_ms)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="standin_api_")
+    documents = generate_sample_data(args.num_docs)
+    native_path = os.path.join(work_dir, "unicoil_native")
+    build_native_index(documents, native_path)
+    bm25_path = os.path.join(work_dir, "bm25")
+    build_bm25_index(documents, bm25_path)
+
+    # The search modules read their configuration at import time
+    os.environ["WEAVIATE_HOST"], port = weaviate_server.server_address[0], weaviate_server.server_address[1]
+    os.environ["WEAVIATE_PORT"] = str(port)
+    os.environ["INDEX_ROOT"] = work_dir
+    os.environ["UNICOIL_ENGINE"] = "native"
+    os.environ["UNICOIL_NATIVE_INDEX_PATH"] = native_path
+    os.environ["BM25_INDEX_PATH"] = bm25_path
+
+    import uvicorn
+    from benchmarks.standin_models import StandInEncoder, StandInCrossEncoder
+    from search import query_encoder, rerank, unicoil_search
+    from search.index_registry import IndexGeneration
+    from api.main import app
+
+    query_encoder.model = StandInEncoder(fixed_ms=args.encoder_fixed_ms, per_item_ms=args.encoder_per_item_ms)
+    unicoil_search.encode_query = standin_query_impacts
+    rerank._reranker = rerank.Reranker(StandInCrossEncoder())
+    IndexGeneration.bm25_searcher = lambda self: self._get(
+        "bm25", lambda: StandInBm25Searcher(self.manifest["bm25_path"]))
+
+    print(f"Stand-in Weaviate on port {port}, {args.num_docs} documents in {native_path} and {bm25_path}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
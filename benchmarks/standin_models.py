@@ -0,0 +1,53 @@
+"""
+Local stand-ins for the embedding models used by the query path.
+
+StandInEncoder mimics SentenceTransformer.encode: it returns deterministic
+unit vectors derived from a hash of the text and sleeps for a configurable
+cost of fixed_ms + per_item_ms * batch_size, which is the shape of a CPU
+forward pass where small batches waste most of the fixed overhead.
+
+StandInCrossEncoder mimics CrossEncoder.predict the same way, scoring each
+(query, passage) pair by the share of query words found in the passage.
+"""
+import re
+import time
+import zlib
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+class StandInEncoder:
+    def __init__(self, dim: int = 1024, fixed_ms: float = 20.0, per_item_ms: float = 2.0):
+        self.dim = dim
+        self.fixed_ms = fixed_ms
+        self.per_item_ms = per_item_ms
+        self.calls = 0
+
+    def _vector(self, text: str) -> np.ndarray:
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        vector = rng.normal(size=self.dim).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        self.calls += 1
+        time.sleep((self.fixed_ms + self.per_item_ms * len(texts)) / 1000.0)
+        vectors = np.stack([self._vector(text) for text in texts]) if texts else np.empty((0, self.dim))
+        return vectors[0] if single else vectors
+
+class StandInCrossEncoder:
+    def __init__(self, fixed_ms: float = 10.0, per_item_ms: float = 4.0):
+        self.fixed_ms = fixed_ms
+        self.per_item_ms = per_item_ms
+        self.calls = 0
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        self.calls += 1
+        time.sleep((self.fixed_ms + self.per_item_ms * len(pairs)) / 1000.0)
+        scores = []
+        for query, passage in pairs:
+            query_words = set(re.findall(r"\w+", query.lower()))
+            passage_words = set(re.findall(r"\w+", passage.lower()))
+            scores.append(len(query_words & passage_words) / max(1, len(query_words)))
+        return np.asarray(scores, dtype=np.float32)
@@ -0,0 +1,116 @@
+"""
+Minimal local stand-in for the Weaviate REST/GraphQL API.
+
+It answers the readiness, meta and schema endpoints the client touches and
+returns canned GraphQL "Get" results, with optional artificial latency, so
+the query path can be benchmarked without a real Weaviate instance.
+
+Usage:
+    python -m benchmarks.standin_weaviate --port 8081 --num-results 10 --latency-ms 2
+"""
+import re
+import json
+import time
+import uuid
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+_CLASS_RE = re.compile(r"Get\s*\{\s*(\w+)")
+
+def make_handler(num_results: int = 10, latency_ms: float = 0.0):
+    """Build a request handler class returning num_results hits per query"""
+
+    class StandInWeaviateHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; with Nagle's algorithm
+        # and delayed ACKs every reused keep-alive connection would wait ~40ms
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, payload, status: int = 200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith("/v1/.well-known/"):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif self.path.startswith("/v1/meta"):
+                self._send_json({"hostname": "http://[::]:8080", "version": "1.29.0", "modules": {}})
+            elif self.path.startswith("/v1/schema"):
+                self._send_json({"classes": []})
+            else:
+                self._send_json({"error": [{"message": "not found"}]}, status=404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.startswith("/v1/graphql"):
+                self._send_json({}, status=200)
+                return
+            if latency_ms:
+                time.sleep(latency_ms / 1000.0)
+            match = _CLASS_RE.search(body.get("query", ""))
+            class_name = match.group(1) if match else "VetDocument"
+            hits = [
+                {
+                    "passage_id": f"standin-{i}",
+                    "chunk_index": 0,
+                    "parent_id": f"standin-{i}",
+                    "contents": f"Stand-in document {i} for benchmarking the query path.",
+                    "course_id": "VET101",
+                    "activity_id": "ACT101",
+                    "course_name": "Small Animal Medicine",
+                    "activity_name": "Renal Diseases",
+                    "strand": "Internal Medicine",
+                    "cluster_id": f"standin-{i}",
+                    "_additional": {"id": str(uuid.UUID(int=i + 1)), "distance": i / (i + 1)}
+                }
+                for i in range(num_results)
+            ]
+            self._send_json({"data": {"Get": {class_name: hits}}})
+
+    return StandInWeaviateHandler
+
+def start_server(port: int = 0, num_results: int = 10, latency_ms: float = 0.0,
+                 host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Start the stand-in server on a background thread.
+
+    Args:
+        port: Port to listen on, 0 picks a free one
+        num_results: Hits returned per GraphQL query
+        latency_ms: Artificial server-side latency per query
+        host: Interface to bind
+
+    Returns:
+        The running server; its address is server.server_address
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(num_results, latency_ms))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Weaviate API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--num-results", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.num_results, args.latency_ms))
+    print(f"Stand-in Weaviate listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
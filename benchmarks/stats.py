@@ -0,0 +1,37 @@
+"""Shared latency statistics helpers for the benchmark scripts."""
+import math
+from typing import Dict, List
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(latencies_ms: List[float], elapsed_s: float) -> Dict[str, float]:
+    """
+    Summarize request latencies.
+
+    Args:
+        latencies_ms: Per-request latencies in milliseconds
+        elapsed_s: Wall-clock duration of the run in seconds
+
+    Returns:
+        Dictionary with count, throughput and latency percentiles
+    """
+    values = sorted(latencies_ms)
+    return {
+        "count": len(values),
+        "qps": len(values) / elapsed_s if elapsed_s > 0 else 0.0,
+        "mean_ms": sum(values) / len(values) if values else float("nan"),
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1] if values else float("nan"),
+    }
+
+def format_summary(label: str, summary: Dict[str, float]) -> str:
+    return (f"{label:<28} n={summary['count']:<6} qps={summary['qps']:>8.1f}  "
+            f"mean={summary['mean_ms']:>7.2f}ms  p50={summary['p50_ms']:>7.2f}ms  "
+            f"p95={summary['p95_ms']:>7.2f}ms  p99={summary['p99_ms']:>7.2f}ms")
@@ -0,0 +1,229 @@
+"""
+Sweep Weaviate vector index settings and report recall, latency and memory.
+
+For every build configuration in the grid, a scratch class is created with
+that vector index config, the corpus vectors are imported, and the query
+set is run at each query-time ef. Recall@k is measured against exact
+(brute-force cosine) search. Memory is reported as an estimate of the
+in-memory vector and graph footprint and, when --metrics-url points at
+Weaviate's Prometheus endpoint, as the measured heap growth of the import.
+
+Usage:
+    python -m benchmarks.vector_index_sweep --source-class VetDocument --num-queries 200
+    python -m benchmarks.vector_index_sweep --synthetic 20000 --dim 1024 --grid grid.json
+
+The grid file is a JSON list of settings dictionaries as accepted by
+indexing.vector_index_config.build_vector_index_config, e.g.
+    [{"compression": "none"}, {"compression": "sq", "rescoreLimit": 64},
+     {"compression": "pq", "pqSegments": 256}, {"compression": "bq", "rescoreLimit": 200}]
+"""
+import re
+import json
+import time
+import argparse
+import urllib.request
+from typing import Dict, List, Optional, Any, Tuple
+
+import numpy as np
+import weaviate
+
+from benchmarks.stats import summarize
+from indexing.vector_index_config import build_vector_index_config
+from search.weaviate_client import WEAVIATE_URL, create_client
+
+SWEEP_CLASS = "VetIndexSweep"
+
+DEFAULT_GRID = [
+    {"compression": "none"},
+    {"compression": "sq", "rescoreLimit": 64},
+    {"compression": "bq", "rescoreLimit": 256},
+    {"compression": "pq"},
+]
+
+def fetch_vectors(client: weaviate.Client, class_name: str, limit: int) -> np.ndarray:
+    """Page through a class with the cursor API and collect its vectors"""
+    vectors, after = [], None
+    while len(vectors) < limit:
+        page = client.data_object.get(class_name=class_name, with_vector=True,
+                                      limit=min(500, limit - len(vectors)), after=after)
+        objects = page.get("objects", [])
+        if not objects:
+            break
+        vectors.extend(obj["vector"] for obj in objects if obj.get("vector"))
+        after = objects[-1]["id"]
+    return np.asarray(vectors, dtype=np.float32)
+
+def synthetic_vectors(num: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors, which behave more like embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, num // 100), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), num)] + 0.5 * rng.normal(size=(num, dim)).astype(np.float32)
+    return vectors
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force cosine top-k ids for each query"""
+    sims = normalize(queries) @ normalize(corpus).T
+    top = np.argpartition(-sims, k, axis=1)[:, :k]
+    return np.take_along_axis(top, np.argsort(-np.take_along_axis(sims, top, axis=1), axis=1), axis=1)
+
+def estimate_memory_bytes(num: int, dim: int, settings: Dict[str, Any]) -> int:
+    """Approximate resident size of the compressed vectors plus the HNSW layer-0 links"""
+    compression = settings.get("compression", "none")
+    if compression == "pq":
+        segments = settings.get("pqSegments") or dim // 4
+        per_vector = segments  # one byte code per segment
+    elif compression == "bq":
+        per_vector = dim // 8
+    elif compression == "sq":
+        per_vector = dim
+    else:
+        per_vector = dim * 4
+    links = 2 * settings.get("maxConnections", 32) * 8
+    return num * (per_vector + links)
+
+def heap_bytes(metrics_url: Optional[str]) -> Optional[float]:
+    """Read go_memstats_heap_inuse_bytes from Weaviate's Prometheus endpoint"""
+    if not metrics_url:
+        return None
+    text = urllib.request.urlopen(metrics_url, timeout=10).read().decode("utf-8")
+    match = re.search(r"^go_memstats_heap_inuse_bytes\s+(\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+def import_vectors(client: weaviate.Client, vectors: np.ndarray, batch_size: int) -> None:
+    client.batch.configure(batch_size=batch_size, dynamic=False)
+    with client.batch as batch:
+        for i, vector in enumerate(vectors):
+            batch.add_data_object({"contents": str(i)}, SWEEP_CLASS, uuid=_uuid(i), vector=vector.tolist())
+
+def _uuid(i: int) -> str:
+    return f"00000000-0000-0000-0000-{i:012d}"
+
+def sweep_settings(settings: Dict[str, Any], corpus_size: int) -> Dict[str, Any]:
+    """Settings for the scratch class, training the quantizer on no more objects than the corpus has"""
+    settings = dict(settings, distance="cosine")
+    if settings.get("compression") in ("pq", "sq"):
+        settings["trainingLimit"] = min(settings.get("trainingLimit", 100000), corpus_size)
+    return settings
+
+def is_compressed(client: weaviate.Client) -> bool:
+    """Whether every shard of the scratch class reports a compressed vector index"""
+    nodes = client.cluster.get_nodes_status(class_name=SWEEP_CLASS, output="verbose")
+    shards = [shard for node in nodes for shard in node.get("shards") or [] if shard.get("class") == SWEEP_CLASS]
+    return bool(shards) and all(shard.get("compressed") for shard in shards)
+
+def wait_for_compression(client: weaviate.Client, timeout: float) -> bool:
+    """Wait for the quantizer to be trained and the vectors compressed"""
+    deadline = time.monotonic() + timeout
+    while not is_compressed(client):
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(1.0)
+    return True
+
+def run_queries(client: weaviate.Client, queries: np.ndarray, k: int) -> Tuple[List[List[int]], List[float]]:
+    ids, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        result = client.query.get(SWEEP_CLASS, ["contents"]).with_near_vector(
+            {"vector": query.tolist()}
+        ).with_limit(k).do()
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        hits = result.get("data", {}).get("Get", {}).get(SWEEP_CLASS) or []
+        ids.append([int(hit["contents"]) for hit in hits])
+    return ids, latencies
+
+def recall_at_k(found: List[List[int]], truth: np.ndarray, k: int) -> float:
+    return float(np.mean([len(set(f[:k]) & set(t[:k].tolist())) / k for f, t in zip(found, truth)]))
+
+def sweep(client: weaviate.Client, corpus: np.ndarray, queries: np.ndarray, grid: List[Dict[str, Any]],
+          ef_values: List[int], k: int, batch_size: int, metrics_url: Optional[str],
+          compression_timeout: float = 300.0) -> List[Dict[str, Any]]:
+    truth = exact_top_k(corpus, queries, k)
+    rows = []
+    for settings in grid:
+        if client.schema.exists(SWEEP_CLASS):
+            client.schema.delete_class(SWEEP_CLASS)
+        client.schema.create_class({
+            "class": SWEEP_CLASS,
+            "vectorizer": "none",
+            "vectorIndexType": "hnsw",
+            "vectorIndexConfig": build_vector_index_config(sweep_settings(settings, len(corpus))),
+            "properties": [{"name": "contents", "dataType": ["text"]}]
+        })
+        heap_before = heap_bytes(metrics_url)
+        start = time.perf_counter()
+        import_vectors(client, corpus, batch_size)
+        # Compressed rows only count once Weaviate has actually compressed the index
+        if settings.get("compression", "none") != "none" and not wait_for_compression(client, compression_timeout):
+            print(f"Skipping {json.dumps(settings)}: index still uncompressed after {compression_timeout:g}s")
+            client.schema.delete_class(SWEEP_CLASS)
+            continue
+        import_seconds = time.perf_counter() - start
+        heap_after = heap_bytes(metrics_url)
+
+        for ef in ef_values:
+            client.schema.update_config(SWEEP_CLASS, {"vectorIndexConfig": {"ef": ef}})
+            found, latencies = run_queries(client, queries, k)
+            summary = summarize(latencies, sum(latencies) / 1000.0)
+            rows.append({
+                "settings": settings,
+                "ef": ef,
+                f"recall@{k}": recall_at_k(found, truth, k),
+                "p50_ms": summary["p50_ms"],
+                "p95_ms": summary["p95_ms"],
+                "qps": summary["qps"],
+                "import_s": import_seconds,
+                "est_memory_mb": estimate_memory_bytes(len(corpus), corpus.shape[1], settings) / 2**20,
+                "heap_growth_mb": (heap_after - heap_before) / 2**20 if heap_before is not None and heap_after is not None else None
+            })
+            print(json.dumps(rows[-1]))
+        client.schema.delete_class(SWEEP_CLASS)
+    return rows
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Sweep Weaviate vector index configurations")
+    parser.add_argument("--url", default=WEAVIATE_URL)
+    parser.add_argument("--source-class", default=None, help="Take corpus vectors from this class")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--max-vectors", type=int, default=100000)
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ef", type=int, nargs="+", default=[64, 128, 256])
+    parser.add_argument("--grid", default=None, help="JSON file with a list of settings")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--metrics-url", default=None, help="e.g. http://weaviate:2112/metrics")
+    parser.add_argument("--compression-timeout", type=float, default=300.0,
+                        help="Seconds to wait for a compressed index before skipping its rows")
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    client = create_client(args.url)
+    if args.synthetic:
+        corpus = synthetic_vectors(args.synthetic, args.dim)
+    elif args.source_class:
+        corpus = fetch_vectors(client, args.source_class, args.max_vectors)
+    else:
+        parser.error("Pass --source-class or --synthetic")
+
+    # Queries are perturbed corpus vectors, so every query has close neighbours
+    rng = np.random.default_rng(1)
+    picks = rng.choice(len(corpus), size=min(args.num_queries, len(corpus)), replace=False)
+    queries = corpus[picks] + 0.1 * rng.normal(size=(len(picks), corpus.shape[1])).astype(np.float32)
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid, 'r') as f:
+            grid = json.load(f)
+
+    rows = sweep(client, corpus, queries, grid, args.ef, args.top_k, args.batch_size, args.metrics_url,
+                 args.compression_timeout)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare a per-request Weaviate client with the shared pooled client.
+
+By default a local stand-in server is started, so only client overhead
+(connection setup, readiness/meta checks, HTTP keep-alive) is measured.
+Pass --url to benchmark against a real Weaviate instead.
+
+Usage:
+    python -m benchmarks.weaviate_client_bench --requests 500 --concurrency 1 8 32
+"""
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import weaviate
+
+from benchmarks.standin_weaviate import start_server
+from benchmarks.stats import summarize, format_summary
+from search.results import RESULT_FIELDS
+from search.weaviate_client import create_client
+
+def run_query(client: weaviate.Client, vector: List[float], k: int):
+    return client.query.get(
+        "VetDocument",
+        ["id"] + RESULT_FIELDS
+    ).with_near_vector(
+        {"vector": vector}
+    ).with_limit(k).do()
+
+def bench(get_client: Callable[[], weaviate.Client], num_requests: int, concurrency: int,
+          dim: int, k: int):
+    vector = [random.random() for _ in range(dim)]
+
+    def one_request(_):
+        start = time.perf_counter()
+        run_query(get_client(), vector, k)
+        return (time.perf_counter() - start) * 1000.0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(one_request, range(num_requests)))
+    return summarize(latencies, time.perf_counter() - start)
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Benchmark Weaviate client pooling")
+    parser.add_argument("--url", default=None, help="Weaviate URL (default: start a local stand-in)")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Stand-in server latency")
+    args = parser.parse_args(argv)
+
+    url = args.url
+    if url is None:
+        server = start_server(num_results=args.top_k, latency_ms=args.latency_ms)
+        url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+        print(f"Started stand-in Weaviate at {url}")
+
+    pooled = create_client(url)
+    for concurrency in args.concurrency:
+        per_request = bench(lambda: weaviate.Client(url), args.requests, concurrency, args.dim, args.top_k)
+        shared = bench(lambda: pooled, args.requests, concurrency, args.dim, args.top_k)
+        print(format_summary(f"per-request c={concurrency}", per_request))
+        print(format_summary(f"pooled      c={concurrency}", shared))
+
+if __name__ == "__main__":
+    main()
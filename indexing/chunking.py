@@ -0,0 +1,159 @@
+import os
+import re
+import threading
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Split documents into overlapping passages before any index is built
+CHUNKING_ENABLED = os.environ.get("CHUNKING_ENABLED", "true").lower() == "true"
+# Passage length and overlap between consecutive passages, in tokens
+CHUNK_TOKENS = int(os.environ.get("CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP = int(os.environ.get("CHUNK_OVERLAP", "32"))
+# Tokenizer the windows are measured in ("whitespace" counts words instead).
+# The uniCOIL vocabulary is the finest-grained of the indexing models, so
+# passages of CHUNK_TOKENS stay within every model's 512-token limit.
+CHUNK_TOKENIZER = os.environ.get("CHUNK_TOKENIZER", "castorini/unicoil-noexp-msmarco")
+
+# Separates the parent document id from the passage number in passage ids
+PASSAGE_ID_SEPARATOR = "#"
+# Fields computed from a whole document's text (near-duplicate cluster, uniCOIL
+# impacts), which do not hold for a passage cut from it
+DOCUMENT_DERIVED_FIELDS = ("cluster_id", "vector")
+
+_WORD_RE = re.compile(r"\S+")
+
+_tokenizer = None
+_lock = threading.Lock()
+
+def get_tokenizer():
+    """Load CHUNK_TOKENIZER once; None for whitespace tokenization"""
+    global _tokenizer
+    if CHUNK_TOKENIZER == "whitespace":
+        return None
+    if _tokenizer is None:
+        with _lock:
+            if _tokenizer is None:
+                from transformers import AutoTokenizer
+                _tokenizer = AutoTokenizer.from_pretrained(CHUNK_TOKENIZER, use_fast=True)
+    return _tokenizer
+
+def token_spans(text: str, tokenizer=None) -> List[Tuple[int, int, bool]]:
+    """
+    Character spans of the tokens of a text.
+
+    Args:
+        text: Text to tokenize
+        tokenizer: Fast Hugging Face tokenizer, or None to split on whitespace
+
+    Returns:
+        List of (start, end, starts_word) per token
+    """
+    if tokenizer is None:
+        return [(m.start(), m.end(), True) for m in _WORD_RE.finditer(text)]
+    encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+    word_ids = encoding.word_ids()
+    return [(start, end, i == 0 or word_ids[i] != word_ids[i - 1])
+            for i, (start, end) in enumerate(encoding["offset_mapping"])]
+
+def passage_windows(spans: List[Tuple[int, int, bool]], size: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    Token windows of at most size tokens, overlapping by about overlap tokens.
+
+    Windows end on a word boundary where possible, so no word is split
+    between passages.
+
+    Args:
+        spans: Output of token_spans
+        size: Maximum tokens per window
+        overlap: Tokens repeated at the start of the next window
+
+    Returns:
+        List of (first token, end token) index pairs
+    """
+    windows = []
+    start = 0
+    while start < len(spans):
+        end = min(start + size, len(spans))
+        if end < len(spans):
+            # Back off to the start of the word that would be cut
+            boundary = end
+            while boundary > start + 1 and not spans[boundary][2]:
+                boundary -= 1
+            if boundary > start + 1:
+                end = boundary
+        windows.append((start, end))
+        if end == len(spans):
+            break
+        start = max(start + 1, end - overlap)
+        # Start the next window at a word start as well
+        while start < end and not spans[start][2]:
+            start += 1
+    return windows
+
+def passage_id(parent_id: str, index: int) -> str:
+    return f"{parent_id}{PASSAGE_ID_SEPARATOR}{index}"
+
+def chunk_document(doc: Dict[str, Any], position: int = 0, size: int = CHUNK_TOKENS,
+                   overlap: int = CHUNK_OVERLAP, tokenizer=None) -> List[Dict[str, Any]]:
+    """
+    Split a document into overlapping passages.
+
+    Passages keep the document's metadata and get a parent_id and a
+    chunk_index; fields derived from the whole text (DOCUMENT_DERIVED_FIELDS)
+    are dropped and must be recomputed per passage. A document that fits in
+    one window is kept as it is, under its own id, so chunking passages
+    again changes nothing.
+
+    Args:
+        doc: Document with contents and metadata
+        position: Position in the dataset, for documents without an id
+        size: Maximum tokens per passage
+        overlap: Tokens shared by consecutive passages
+        tokenizer: Fast Hugging Face tokenizer, or None to split on whitespace
+
+    Returns:
+        List of passage documents, in reading order
+    """
+    parent_id = doc.get("id", f"doc{position}")
+    text = doc.get("contents", "")
+    spans = token_spans(text, tokenizer)
+    if len(spans) <= size:
+        return [dict(doc, id=parent_id, parent_id=doc.get("parent_id", parent_id),
+                     chunk_index=doc.get("chunk_index", 0))]
+
+    metadata = {key: value for key, value in doc.items() if key not in DOCUMENT_DERIVED_FIELDS}
+    passages = []
+    for index, (first, end) in enumerate(passage_windows(spans, size, min(overlap, size - 1))):
+        passages.append(dict(
+            metadata,
+            id=passage_id(parent_id, index),
+            contents=text[spans[first][0]:spans[end - 1][1]],
+            parent_id=parent_id,
+            chunk_index=index
+        ))
+    return passages
+
+def chunk_documents(documents: Iterable[Dict[str, Any]], size: int = CHUNK_TOKENS,
+                    overlap: int = CHUNK_OVERLAP) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the passages of a stream of documents.
+
+    Args:
+        documents: Documents with contents and metadata
+        size: Maximum tokens per passage
+        overlap: Tokens shared by consecutive passages
+
+    Returns:
+        Iterator over passage documents
+    """
+    tokenizer = get_tokenizer()
+    for position, doc in enumerate(documents):
+        yield from chunk_document(doc, position, size, overlap, tokenizer)
+
+def chunking_settings() -> Optional[Dict[str, Any]]:
+    """Chunking settings recorded in the index generation manifest, None when disabled"""
+    if not CHUNKING_ENABLED:
+        return None
+    return {"tokens": CHUNK_TOKENS, "overlap": CHUNK_OVERLAP, "tokenizer": CHUNK_TOKENIZER}
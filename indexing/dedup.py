@@ -0,0 +1,149 @@
+import os
+import re
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Any
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Near-duplicate detection settings
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.8"))
+DEDUP_NUM_PERM = int(os.environ.get("DEDUP_NUM_PERM", "128"))
+DEDUP_BANDS = int(os.environ.get("DEDUP_BANDS", "16"))
+DEDUP_SHINGLE_SIZE = int(os.environ.get("DEDUP_SHINGLE_SIZE", "5"))
+DEDUP_SEED = int(os.environ.get("DEDUP_SEED", "42"))
+
+# Prime just below 2**32, so (a * x + b) stays inside uint64 for 32-bit hashes
+_PRIME = np.uint64(4294967291)
+_TOKEN_RE = re.compile(r"\w+")
+
+def _shingle_hashes(text: str, shingle_size: int) -> np.ndarray:
+    """Hash the word n-gram shingles of a text to 32-bit integers"""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    if len(tokens) <= shingle_size:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+        for s in shingles
+    ]
+    return np.array(hashes, dtype=np.uint64)
+
+def minhash_signatures(texts: List[str], num_perm: int = DEDUP_NUM_PERM,
+                       shingle_size: int = DEDUP_SHINGLE_SIZE, seed: int = DEDUP_SEED) -> np.ndarray:
+    """
+    Compute MinHash signatures for a list of texts.
+
+    Args:
+        texts: Texts to sign
+        num_perm: Number of hash permutations (signature length)
+        shingle_size: Number of words per shingle
+        seed: Seed for the permutation coefficients
+
+    Returns:
+        Array of shape (len(texts), num_perm); texts without tokens get an all-max signature
+    """
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, 2**32 - 5, size=num_perm, dtype=np.int64).astype(np.uint64)
+    b = rng.randint(0, 2**32 - 5, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    signatures = np.full((len(texts), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for i, text in enumerate(texts):
+        hashes = _shingle_hashes(text, shingle_size)
+        if hashes.size == 0:
+            continue
+        permuted = (np.outer(hashes, a) + b) % _PRIME
+        signatures[i] = permuted.min(axis=0)
+    return signatures
+
+def find_near_duplicates(documents: List[Dict[str, Any]], threshold: float = DEDUP_THRESHOLD,
+                         num_perm: int = DEDUP_NUM_PERM, bands: int = DEDUP_BANDS,
+                         shingle_size: int = DEDUP_SHINGLE_SIZE) -> Dict[str, str]:
+    """
+    Group near-duplicate documents with MinHash and LSH banding.
+
+    Documents are visited in input order. Each one joins the cluster of the
+    most similar earlier representative it shares an LSH bucket with, if
+    their estimated Jaccard similarity reaches the threshold; otherwise it
+    becomes the representative of a new cluster. Every member is therefore
+    a near-duplicate of its representative itself, not merely of another
+    member, so chains of small edits are not merged into one cluster.
+
+    Args:
+        documents: List of document dictionaries
+        threshold: Minimum estimated Jaccard similarity for a duplicate
+        num_perm: Number of MinHash permutations
+        bands: Number of LSH bands (must divide num_perm)
+        shingle_size: Number of words per shingle
+
+    Returns:
+        Dictionary mapping each document id to its cluster representative id
+    """
+    if num_perm % bands != 0:
+        raise ValueError(f"DEDUP_BANDS ({bands}) must divide DEDUP_NUM_PERM ({num_perm})")
+    rows = num_perm // bands
+
+    ids = [doc.get("id", f"doc{i}") for i, doc in enumerate(documents)]
+    texts = [doc.get("contents", "") for doc in documents]
+    signatures = minhash_signatures(texts, num_perm=num_perm, shingle_size=shingle_size)
+    empty = np.all(signatures == np.iinfo(np.uint64).max, axis=1)
+
+    # LSH buckets per band, holding representatives only
+    buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+    representative = list(range(len(documents)))
+    for i in range(len(documents)):
+        if empty[i]:
+            continue
+        keys = [signatures[i, band * rows:(band + 1) * rows].tobytes() for band in range(bands)]
+        candidates = sorted({r for band, key in enumerate(keys) for r in buckets[band].get(key, ())})
+        best, best_similarity = None, threshold
+        for candidate in candidates:
+            similarity = float(np.mean(signatures[candidate] == signatures[i]))
+            # Candidates are in input order, so ties go to the earliest representative
+            if similarity >= threshold and (best is None or similarity > best_similarity):
+                best, best_similarity = candidate, similarity
+        if best is not None:
+            representative[i] = best
+            continue
+        for band, key in enumerate(keys):
+            buckets[band].setdefault(key, []).append(i)
+
+    return {ids[i]: ids[representative[i]] for i in range(len(documents))}
+
+def assign_clusters(documents: List[Dict[str, Any]]) -> int:
+    """
+    Tag every document with the id of its near-duplicate cluster representative.
+
+    Args:
+        documents: List of document dictionaries, updated in place with "cluster_id"
+
+    Returns:
+        Number of distinct clusters
+    """
+    representatives = find_near_duplicates(documents)
+    for i, doc in enumerate(documents):
+        doc["cluster_id"] = representatives[doc.get("id", f"doc{i}")]
+    num_clusters = len(set(representatives.values()))
+    logger.info(f"Found {len(documents) - num_clusters} near-duplicates in {num_clusters} clusters")
+    return num_clusters
+
+def group_by_cluster(documents: List[Dict[str, Any]]) -> "OrderedDict[str, List[Dict[str, Any]]]":
+    """
+    Group documents by cluster, representative first, in order of first appearance.
+
+    Args:
+        documents: List of document dictionaries
+
+    Returns:
+        Ordered mapping of cluster id to its member documents
+    """
+    clusters: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+    for i, doc in enumerate(documents):
+        cluster_id = doc.get("cluster_id") or doc.get("id", f"doc{i}")
+        clusters.setdefault(cluster_id, []).append(doc)
+    return clusters
@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import shutil
+from typing import Dict, Any, Optional, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Index generation layout
+INDEX_ROOT = os.environ.get("INDEX_ROOT", "/app/indexes")
+GENERATIONS_DIR = os.path.join(INDEX_ROOT, "generations")
+# Manifest of the generation the API serves, and of the one being built
+CURRENT_MANIFEST = os.path.join(INDEX_ROOT, "CURRENT.json")
+BUILDING_MANIFEST = os.path.join(INDEX_ROOT, "BUILDING.json")
+# Generations kept on disk and in Weaviate, including the current one
+KEEP_GENERATIONS = int(os.environ.get("KEEP_GENERATIONS", "2"))
+
+# Base Weaviate classes; each generation gets its own copy
+BASE_CLASSES = ["VetDocument", "VetDocumentMultiVector"]
+
+def read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    """Read a generation manifest, or None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def write_manifest(path: str, manifest: Dict[str, Any]) -> None:
+    """Write a manifest atomically, so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def new_generation(name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Describe a new index generation.
+
+    Args:
+        name: Generation name, defaults to a UTC timestamp
+
+    Returns:
+        Manifest with the generation's index paths and Weaviate class names
+    """
+    name = name or time.strftime("G%Y%m%d%H%M%S", time.gmtime())
+    root = os.path.join(GENERATIONS_DIR, name)
+    return {
+        "generation": name,
+        "root": root,
+        "bm25_path": os.path.join(root, "bm25"),
+        "unicoil_path": os.path.join(root, "unicoil"),
+        "unicoil_native_path": os.path.join(root, "unicoil_native"),
+        "unicoil_work_dir": os.path.join(root, "unicoil_encoded"),
+        "checkpoint_dir": os.path.join(root, "checkpoints"),
+        "weaviate_classes": {base: f"{base}_{name}" for base in BASE_CLASSES},
+        "created_at": time.time()
+    }
+
+def start_build() -> Dict[str, Any]:
+    """
+    Return the generation to build into, resuming an unfinished build if any.
+
+    Returns:
+        Manifest of the generation being built
+    """
+    manifest = read_manifest(BUILDING_MANIFEST)
+    if manifest is not None:
+        logger.info(f"Resuming build of index generation {manifest['generation']}")
+        return manifest
+    manifest = new_generation()
+    os.makedirs(manifest["root"], exist_ok=True)
+    write_manifest(BUILDING_MANIFEST, manifest)
+    logger.info(f"Building new index generation {manifest['generation']}")
+    return manifest
+
+def publish(manifest: Dict[str, Any]) -> None:
+    """Atomically make a finished generation the one the API serves"""
+    write_manifest(CURRENT_MANIFEST, dict(manifest, published_at=time.time()))
+    if os.path.exists(BUILDING_MANIFEST):
+        os.remove(BUILDING_MANIFEST)
+    logger.info(f"Published index generation {manifest['generation']}")
+
+def list_generations() -> List[str]:
+    """Generation names on disk, oldest first"""
+    if not os.path.isdir(GENERATIONS_DIR):
+        return []
+    return sorted(name for name in os.listdir(GENERATIONS_DIR)
+                  if os.path.isdir(os.path.join(GENERATIONS_DIR, name)))
+
+def retire_old_generations(client=None, keep: int = KEEP_GENERATIONS) -> List[str]:
+    """
+    Delete all but the newest `keep` generations, never the current or building one.
+
+    The previous generation is kept by default so an API that has not yet
+    swapped to the new one keeps serving from intact indexes.
+
+    Args:
+        client: Weaviate client used to drop retired classes
+        keep: Number of generations to keep
+
+    Returns:
+        Names of the retired generations
+    """
+    protected = {m["generation"] for m in (read_manifest(CURRENT_MANIFEST), read_manifest(BUILDING_MANIFEST)) if m}
+    generations = list_generations()
+    retired = [name for name in generations[:max(0, len(generations) - keep)] if name not in protected]
+    for name in retired:
+        shutil.rmtree(os.path.join(GENERATIONS_DIR, name), ignore_errors=True)
+        if client is not None:
+            for class_name in new_generation(name)["weaviate_classes"].values():
+                try:
+                    if client.schema.exists(class_name):
+                        client.schema.delete_class(class_name)
+                except Exception as e:
+                    logger.error(f"Error deleting Weaviate class {class_name}: {str(e)}")
+        logger.info(f"Retired index generation {name}")
+    return retired
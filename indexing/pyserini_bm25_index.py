@@ -2,22 +2,23 @@ import os
 import json
 import tempfile
 import shutil
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pyserini.index.lucene import LuceneIndexReader as IndexReader
 from pyserini.index.lucene import LuceneIndexer
 import logging
 
 logger = logging.getLogger(__name__)
 
-def create_bm25_index(documents: List[Dict[str, Any]]) -> None:
+def create_bm25_index(documents: List[Dict[str, Any]], output_dir: Optional[str] = None) -> None:
     """
     Create a BM25 index using Pyserini from the provided documents.
     
     Args:
         documents: List of document dictionaries
+        output_dir: Index directory, defaults to BM25_INDEX_PATH
     """
     # Create output directory if it doesn't exist
-    output_dir = os.environ.get("BM25_INDEX_PATH", "/app/indexes/bm25")
+    output_dir = output_dir or os.environ.get("BM25_INDEX_PATH", "/app/indexes/bm25")
     os.makedirs(output_dir, exist_ok=True)
     
     # Create temporary directory for indexing
@@ -40,7 +41,8 @@ def create_bm25_index(documents: List[Dict[str, Any]]) -> None:
         indexer.set_storeRaw(True)
         
         # Additional fields to index
-        indexer.set_fields(["contents", "course_id", "activity_id", "course_name", "activity_name", "strand"])
+        indexer.set_fields(["contents", "course_id", "activity_id", "course_name", "activity_name", "strand", "cluster_id",
+                            "parent_id"])
         
         # Index the documents
         logger.info("Indexing documents for BM25")
@@ -2,84 +2,170 @@ import os
 import json
 import tempfile
 import shutil
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import torch
 from transformers import AutoTokenizer, AutoModel
 import logging
 
+from indexing.chunking import CHUNKING_ENABLED, chunk_documents
+
 logger = logging.getLogger(__name__)
 
-def create_unicoil_index(documents: List[Dict[str, Any]]) -> None:
+# Pretrained uniCOIL model
+MODEL_NAME = "castorini/unicoil-noexp-msmarco"
+
+# Scale applied before rounding impacts to the integers Lucene stores
+IMPACT_QUANTIZATION = int(os.environ.get("IMPACT_QUANTIZATION", "100"))
+
+# Model loaded once per indexing worker process
+_worker_model = None
+_worker_tokenizer = None
+
+def load_unicoil_model():
+    """Load the pretrained uniCOIL model and tokenizer"""
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModel.from_pretrained(MODEL_NAME)
+    return model, tokenizer
+
+def encode_unicoil_document(content: str, model, tokenizer) -> List[List[Any]]:
     """
-    Create a uniCOIL index using Pyserini.
+    Compute uniCOIL term impacts for a document.
     
     Args:
-        documents: List of document dictionaries
+        content: Document text
+        model: uniCOIL model
+        tokenizer: uniCOIL tokenizer
+    
+    Returns:
+        List of [term, weight] pairs with positive weight
+    """
+    # Tokenize the content
+    inputs = tokenizer(content, return_tensors="pt", max_length=512, truncation=True)
+    
+    # Get the weights from the model
+    with torch.no_grad():
+        outputs = model(**inputs)
+        term_weights = outputs.term_weights.squeeze().cpu().numpy()
+    
+    # Create term-impact pairs
+    term_impact_pairs = []
+    for token_id, weight in zip(inputs.input_ids.squeeze().tolist(), term_weights):
+        if weight > 0:
+            term = tokenizer.decode([token_id]).strip()
+            if term:
+                term_impact_pairs.append([term, float(weight)])
+    return term_impact_pairs
+
+def quantize_impacts(term_impact_pairs: List[List[Any]], scale: int = IMPACT_QUANTIZATION) -> Dict[str, int]:
+    """
+    Convert term-impact pairs to the integer {term: impact} vector used by impact indexes.
+    
+    Repeated terms keep their highest weight; terms that round to zero are dropped.
+    
+    Args:
+        term_impact_pairs: List of [term, weight] pairs
+        scale: Quantization scale, the index's for query weights
+    
+    Returns:
+        Dictionary mapping terms to quantized impacts
+    """
+    vector = {}
+    for term, weight in term_impact_pairs:
+        impact = int(round(weight * scale))
+        if impact > vector.get(term, 0):
+            vector[term] = impact
+    return vector
+
+def to_indexed_document(doc: Dict[str, Any], term_impact_pairs: List[List[Any]], position: int) -> Dict[str, Any]:
+    """Prepare a document with its term impacts for the Lucene impact indexer"""
+    return {
+        "id": doc.get("id", f"doc{position}"),
+        "contents": doc.get("contents", ""),
+        "vector": quantize_impacts(term_impact_pairs),
+        "course_id": doc.get("course_id", ""),
+        "activity_id": doc.get("activity_id", ""),
+        "course_name": doc.get("course_name", ""),
+        "activity_name": doc.get("activity_name", ""),
+        "strand": doc.get("strand", ""),
+        "cluster_id": doc.get("cluster_id", doc.get("id", f"doc{position}")),
+        "parent_id": doc.get("parent_id", doc.get("id", f"doc{position}")),
+        "chunk_index": doc.get("chunk_index", 0)
+    }
+
+def init_unicoil_worker(num_threads: int = 1) -> None:
+    """Process pool initializer: load the model once per worker"""
+    global _worker_model, _worker_tokenizer
+    torch.set_num_threads(num_threads)
+    _worker_model, _worker_tokenizer = load_unicoil_model()
+
+def encode_unicoil_batch(texts: List[str]) -> List[List[List[Any]]]:
+    """Encode a batch of texts inside a worker started with init_unicoil_worker"""
+    return [encode_unicoil_document(text, _worker_model, _worker_tokenizer) for text in texts]
+
+def build_unicoil_index(input_dir: str, output_dir: Optional[str] = None) -> None:
+    """
+    Build the Lucene impact index from a directory of uniCOIL-encoded documents.
+    
+    Args:
+        input_dir: Directory of JSON/JSONL files produced by to_indexed_document
+        output_dir: Index directory, defaults to UNICOIL_INDEX_PATH
     """
     # Create output directory if it doesn't exist
-    output_dir = os.environ.get("UNICOIL_INDEX_PATH", "/app/indexes/unicoil")
+    output_dir = output_dir or os.environ.get("UNICOIL_INDEX_PATH", "/app/indexes/unicoil")
     os.makedirs(output_dir, exist_ok=True)
     
+    # Use Pyserini's impact indexer
+    from pyserini.index.lucene import IndexArgs, LuceneIndexer
+    
+    index_args = IndexArgs()
+    index_args.index_path = output_dir
+    index_args.input = input_dir
+    index_args.impact = True
+    index_args.fields = ["contents", "course_id", "activity_id", "course_name", "activity_name", "strand", "cluster_id",
+                         "parent_id"]
+    index_args.storePositions = True
+    index_args.storeDocvectors = True
+    index_args.storeContents = True
+    index_args.storeRaw = True
+    
+    # Create the index
+    logger.info("Creating uniCOIL index")
+    LuceneIndexer(index_args)
+    
+    logger.info(f"uniCOIL index created at {output_dir}")
+
+def create_unicoil_index(documents: List[Dict[str, Any]]) -> None:
+    """
+    Create a uniCOIL index using Pyserini.
+    
+    Args:
+        documents: List of document dictionaries
+    """
     # Load pretrained uniCOIL model and tokenizer
-    model_name = "castorini/unicoil-noexp-msmarco"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModel.from_pretrained(model_name)
+    model, tokenizer = load_unicoil_model()
+    
+    # Encode passages short enough for the model instead of truncating long documents
+    if CHUNKING_ENABLED:
+        documents = list(chunk_documents(documents))
     
     # Create temporary directory for indexing
     with tempfile.TemporaryDirectory() as temp_dir:
         # Process documents with uniCOIL
         logger.info(f"Processing {len(documents)} documents with uniCOIL")
+        # Near-duplicates share the impacts of their cluster representative
+        impacts_by_cluster = {}
         for i, doc in enumerate(documents):
-            # Get the document content
-            content = doc.get("contents", "")
-            
-            # Tokenize the content
-            inputs = tokenizer(content, return_tensors="pt", max_length=512, truncation=True)
+            cluster_id = doc.get("cluster_id")
             
-            # Get the weights from the model
-            with torch.no_grad():
-                outputs = model(**inputs)
-                term_weights = outputs.term_weights.squeeze().cpu().numpy()
-            
-            # Create term-impact pairs
-            term_impact_pairs = []
-            for token_id, weight in zip(inputs.input_ids.squeeze().tolist(), term_weights):
-                if weight > 0:
-                    term = tokenizer.decode([token_id]).strip()
-                    if term:
-                        term_impact_pairs.append((term, weight))
-            
-            # Prepare document for indexing
-            indexed_doc = {
-                "id": doc.get("id", f"doc{i}"),
-                "contents": content,
-                "vector": term_impact_pairs,
-                "course_id": doc.get("course_id", ""),
-                "activity_id": doc.get("activity_id", ""),
-                "course_name": doc.get("course_name", ""),
-                "activity_name": doc.get("activity_name", ""),
-                "strand": doc.get("strand", "")
-            }
+            if cluster_id is not None and cluster_id in impacts_by_cluster:
+                term_impact_pairs = impacts_by_cluster[cluster_id]
+            else:
+                term_impact_pairs = encode_unicoil_document(doc.get("contents", ""), model, tokenizer)
+                if cluster_id is not None:
+                    impacts_by_cluster[cluster_id] = term_impact_pairs
             
             # Write document to temporary file
             with open(os.path.join(temp_dir, f"doc{i}.json"), 'w') as f:
-                json.dump(indexed_doc, f)
-        
-        # Use Pyserini's impact indexer
-        from pyserini.index.lucene import IndexArgs, LuceneIndexer
-        
-        index_args = IndexArgs()
-        index_args.index_path = output_dir
-        index_args.input = temp_dir
-        index_args.impact = True
-        index_args.fields = ["contents", "course_id", "activity_id", "course_name", "activity_name", "strand"]
-        index_args.storePositions = True
-        index_args.storeDocvectors = True
-        index_args.storeContents = True
-        index_args.storeRaw = True
-        
-        # Create the index
-        logger.info("Creating uniCOIL index")
-        LuceneIndexer(index_args)
+                json.dump(to_indexed_document(doc, term_impact_pairs, i), f)
         
-        logger.info(f"uniCOIL index created at {output_dir}")
\ No newline at end of file
+        build_unicoil_index(temp_dir)
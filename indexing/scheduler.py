@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Dict, List, Optional, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint and progress settings
+CHECKPOINT_DIR = os.environ.get("CHECKPOINT_DIR", "/app/indexes/checkpoints")
+PROGRESS_INTERVAL = float(os.environ.get("PROGRESS_INTERVAL", "30"))
+
+class Checkpoint:
+    """
+    Persistent progress marker for a single indexing stage.
+
+    The state is a small JSON document written atomically, so a crash can
+    never leave a half-written checkpoint behind.
+    """
+
+    def __init__(self, stage: str, checkpoint_dir: str = CHECKPOINT_DIR):
+        self.path = os.path.join(checkpoint_dir, f"{stage}.json")
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.state = {"position": 0, "completed": False}
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                self.state.update(json.load(f))
+
+    @property
+    def position(self) -> int:
+        return self.state["position"]
+
+    @property
+    def completed(self) -> bool:
+        return self.state["completed"]
+
+    def save(self, position: int, **extra: Any) -> None:
+        """Record that the first `position` work items are done"""
+        self.state.update(extra, position=position)
+        self._write()
+
+    def mark_complete(self) -> None:
+        self.state["completed"] = True
+        self._write()
+
+    def reset(self) -> None:
+        self.state = {"position": 0, "completed": False}
+        self._write()
+
+    def _write(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+class StageProgress:
+    """Thread-safe progress counter that periodically logs throughput and ETA"""
+
+    def __init__(self, stage: str, total: int, done: int = 0, interval: float = PROGRESS_INTERVAL):
+        self.stage = stage
+        self.total = total
+        self.done = done
+        self.interval = interval
+        self._resumed_from = done
+        self._start = time.monotonic()
+        self._last_report = self._start
+        self._lock = threading.Lock()
+
+    def update(self, count: int = 1) -> None:
+        with self._lock:
+            self.done += count
+            now = time.monotonic()
+            if now - self._last_report >= self.interval or self.done >= self.total:
+                self._last_report = now
+                self.report()
+
+    def report(self) -> None:
+        elapsed = time.monotonic() - self._start
+        rate = (self.done - self._resumed_from) / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        eta = f"{remaining / rate:.0f}s" if rate > 0 else "unknown"
+        logger.info(f"[{self.stage}] {self.done}/{self.total} ({rate:.1f} items/s, ETA {eta})")
+
+class Stage:
+    """
+    An independent unit of indexing work.
+
+    Args:
+        name: Stage name, also used for its checkpoint file
+        run: Callable taking (checkpoint, progress) that performs the work,
+            resuming from checkpoint.position
+        total: Number of work items, used for progress and ETA
+        depends_on: Names of stages that must complete first
+    """
+
+    def __init__(self, name: str, run: Callable[[Checkpoint, StageProgress], None],
+                 total: int = 1, depends_on: Optional[List[str]] = None):
+        self.name = name
+        self.run = run
+        self.total = total
+        self.depends_on = depends_on or []
+
+def reset_checkpoints(checkpoint_dir: str = CHECKPOINT_DIR) -> None:
+    """Discard all checkpoints so the next run starts from scratch"""
+    if os.path.exists(checkpoint_dir):
+        shutil.rmtree(checkpoint_dir)
+
+def run_stages(stages: List[Stage], checkpoint_dir: str = CHECKPOINT_DIR) -> None:
+    """
+    Run stages concurrently, each as soon as its dependencies have completed.
+
+    Completed stages (per their checkpoint) are skipped. If a stage fails,
+    stages depending on it are not started and the first error is re-raised
+    once all running stages have finished.
+
+    Args:
+        stages: Stages to run
+        checkpoint_dir: Directory holding the per-stage checkpoints
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        for dependency in stage.depends_on:
+            if dependency not in by_name:
+                raise ValueError(f"Stage {stage.name} depends on unknown stage {dependency}")
+
+    futures: Dict[str, Future] = {}
+
+    def execute(stage: Stage) -> None:
+        for dependency in stage.depends_on:
+            futures[dependency].result()
+
+        checkpoint = Checkpoint(stage.name, checkpoint_dir)
+        if checkpoint.completed:
+            logger.info(f"[{stage.name}] already complete, skipping")
+            return
+        if checkpoint.position:
+            logger.info(f"[{stage.name}] resuming from item {checkpoint.position}")
+
+        progress = StageProgress(stage.name, stage.total, checkpoint.position)
+        start = time.monotonic()
+        try:
+            stage.run(checkpoint, progress)
+        except Exception:
+            logger.exception(f"[{stage.name}] failed")
+            raise
+        checkpoint.mark_complete()
+        logger.info(f"[{stage.name}] complete in {time.monotonic() - start:.1f}s")
+
+    with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="stage") as executor:
+        # Submit in dependency order so every dependency future exists before it is awaited
+        pending = list(stages)
+        while pending:
+            ready = [s for s in pending if all(d in futures for d in s.depends_on)]
+            if not ready:
+                raise ValueError("Stage dependencies contain a cycle")
+            for stage in ready:
+                futures[stage.name] = executor.submit(execute, stage)
+                pending.remove(stage)
+
+    errors = [f.exception() for f in futures.values() if f.exception() is not None]
+    if errors:
+        raise errors[0]
@@ -0,0 +1,66 @@
+import os
+import zlib
+from typing import Dict, Any, List, Optional
+import logging
+
+from indexing.generations import read_manifest, write_manifest
+
+logger = logging.getLogger(__name__)
+
+# Number of shards the BM25 and uniCOIL indexes are split into (1 = unsharded)
+INDEX_SHARDS = int(os.environ.get("INDEX_SHARDS", "1"))
+# Document field that decides the shard: "id" spreads documents evenly,
+# "course_id" keeps a course in one shard so course filters hit a single shard
+SHARD_BY = os.environ.get("SHARD_BY", "id")
+
+# Written into a sharded index directory, next to the shard subdirectories
+SHARD_MANIFEST = "shards.json"
+
+def shard_name(shard: int) -> str:
+    return f"shard-{shard:02d}"
+
+def shard_of(doc: Dict[str, Any], num_shards: int, shard_by: str = SHARD_BY) -> int:
+    """
+    Stable shard number of a document.
+
+    Documents without a value for shard_by are placed by id.
+
+    Args:
+        doc: Document dictionary
+        num_shards: Number of shards
+        shard_by: Field to shard on
+
+    Returns:
+        Shard number in [0, num_shards)
+    """
+    key = str(doc.get(shard_by) or doc.get("id", ""))
+    return zlib.crc32(key.encode("utf-8")) % num_shards
+
+def partition(documents: List[Dict[str, Any]], num_shards: int,
+              shard_by: str = SHARD_BY) -> List[List[Dict[str, Any]]]:
+    """Split documents into num_shards lists, keeping their order"""
+    shards = [[] for _ in range(num_shards)]
+    for doc in documents:
+        shards[shard_of(doc, num_shards, shard_by)].append(doc)
+    return shards
+
+def shard_dirs(index_dir: str, num_shards: int) -> List[str]:
+    """Directory of each shard; an unsharded index is its own single shard"""
+    if num_shards <= 1:
+        return [index_dir]
+    return [os.path.join(index_dir, shard_name(shard)) for shard in range(num_shards)]
+
+def write_shard_manifest(index_dir: str, num_shards: int, shard_by: str = SHARD_BY) -> None:
+    """Mark index_dir as a sharded index; nothing is written for a single shard"""
+    if num_shards <= 1:
+        return
+    write_manifest(os.path.join(index_dir, SHARD_MANIFEST), {
+        "num_shards": num_shards,
+        "shard_by": shard_by,
+        "shards": [shard_name(shard) for shard in range(num_shards)]
+    })
+    logger.info(f"Wrote {num_shards}-shard manifest to {index_dir}")
+
+def read_shard_manifest(index_dir: str) -> Optional[Dict[str, Any]]:
+    """Shard manifest of an index directory, or None if it is not sharded"""
+    return read_manifest(os.path.join(index_dir, SHARD_MANIFEST))
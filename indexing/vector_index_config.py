@@ -0,0 +1,116 @@
+import os
+import json
+from typing import Dict, Any, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# JSON object (inline or a path to a file) overriding the settings below per class
+WEAVIATE_INDEX_CONFIG = os.environ.get("WEAVIATE_INDEX_CONFIG", "")
+
+# Default vector index settings per class. HNSW keys are passed through to
+# Weaviate; "compression" is one of none/pq/bq/sq.
+DEFAULT_INDEX_SETTINGS: Dict[str, Dict[str, Any]] = {
+    # Weaviate defaults, full precision
+    "VetDocument": {
+        "compression": "none"
+    },
+    "VetDocumentMultiVector": {
+        "vectorCacheMaxObjects": 500000,
+        "ef": 256,
+        "efConstruction": 512,
+        "maxConnections": 128,
+        "multiVectorStorage": True,
+        "compression": "none"
+    }
+}
+
+# Compression options consumed here rather than passed through as HNSW
+# parameters: the modes each applies to and its smallest and largest value
+_COMPRESSION_OPTIONS = {
+    "rescoreLimit": (("bq", "sq"), 1, None),
+    "trainingLimit": (("pq", "sq"), 1, None),
+    # 0 lets Weaviate choose the number of segments from the vector dimension
+    "pqSegments": (("pq",), 0, None),
+    "pqCentroids": (("pq",), 1, 256)
+}
+_COMPRESSION_KEYS = {"compression"} | set(_COMPRESSION_OPTIONS)
+
+def load_index_overrides(value: str = WEAVIATE_INDEX_CONFIG) -> Dict[str, Dict[str, Any]]:
+    """Parse WEAVIATE_INDEX_CONFIG, given either inline JSON or a path to a JSON file"""
+    if not value:
+        return {}
+    if value.lstrip().startswith("{"):
+        return json.loads(value)
+    with open(value, 'r') as f:
+        return json.load(f)
+
+def get_index_settings(class_name: str, base_class: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Resolve the vector index settings for a class.
+
+    Args:
+        class_name: Weaviate class name
+        base_class: Class whose defaults apply when class_name has none (e.g. a
+            versioned copy of VetDocument)
+
+    Returns:
+        Settings dictionary, defaults updated with any overrides
+    """
+    overrides = load_index_overrides()
+    settings = dict(DEFAULT_INDEX_SETTINGS.get(class_name) or DEFAULT_INDEX_SETTINGS.get(base_class, {}))
+    settings.update(overrides.get(base_class, {}) if base_class else {})
+    settings.update(overrides.get(class_name, {}))
+    return settings
+
+def build_vector_index_config(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Translate index settings into a Weaviate "vectorIndexConfig".
+
+    Args:
+        settings: HNSW parameters plus compression options:
+            compression: "none", "pq", "bq" or "sq"
+            rescoreLimit: Candidates re-scored at full precision (bq/sq)
+            trainingLimit: Objects used to train the quantizer (pq/sq)
+            pqSegments, pqCentroids: Product quantization shape
+
+    Returns:
+        vectorIndexConfig dictionary
+
+    Raises:
+        ValueError: On an unknown compression, an option that does not apply
+            to it, or an option value out of range
+    """
+    config = {"skip": False}
+    config.update({k: v for k, v in settings.items() if k not in _COMPRESSION_KEYS})
+
+    compression = settings.get("compression", "none")
+    if compression == "pq":
+        config["pq"] = {
+            "enabled": True,
+            "segments": settings.get("pqSegments", 0),
+            "centroids": settings.get("pqCentroids", 256),
+            "trainingLimit": settings.get("trainingLimit", 100000),
+            "encoder": {"type": "kmeans", "distribution": "log-normal"}
+        }
+    elif compression == "bq":
+        config["bq"] = {"enabled": True}
+    elif compression == "sq":
+        config["sq"] = {"enabled": True, "trainingLimit": settings.get("trainingLimit", 100000)}
+    elif compression != "none":
+        raise ValueError(f"Unknown vector compression: {compression}")
+
+    for key, (modes, minimum, maximum) in _COMPRESSION_OPTIONS.items():
+        if key not in settings:
+            continue
+        value = settings[key]
+        if compression not in modes:
+            raise ValueError(f"{key} only applies to {' and '.join(modes)} compression")
+        if isinstance(value, bool) or not isinstance(value, int) or value < minimum \
+                or (maximum is not None and value > maximum):
+            bounds = f"between {minimum} and {maximum}" if maximum is not None else f"at least {minimum}"
+            raise ValueError(f"{key} must be an integer {bounds}, got {value!r}")
+
+    if "rescoreLimit" in settings:
+        config[compression]["rescoreLimit"] = settings["rescoreLimit"]
+    return config
@@ -1,18 +1,23 @@
 import os
+import uuid
 import weaviate
 import torch
 from transformers import AutoTokenizer, AutoModel
 from sentence_transformers import SentenceTransformer
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import logging
 import numpy as np
 
+from indexing.vector_index_config import get_index_settings, build_vector_index_config
+
 logger = logging.getLogger(__name__)
 
 # Weaviate connection settings
 WEAVIATE_HOST = os.environ.get("WEAVIATE_HOST", "weaviate")
 WEAVIATE_PORT = os.environ.get("WEAVIATE_PORT", "8080")
 WEAVIATE_URL = f"http://{WEAVIATE_HOST}:{WEAVIATE_PORT}"
+# Objects per batch request when ingesting
+WEAVIATE_BATCH_SIZE = int(os.environ.get("WEAVIATE_BATCH_SIZE", "64"))
 
 # BGE-M3 model for embeddings
 MODEL_NAME = "BAAI/bge-m3"
@@ -26,105 +31,117 @@ def get_model():
         tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
     return model, tokenizer
 
-def initialize_weaviate_schema():
-    """Initialize Weaviate schema for both dense and multi-vector embeddings"""
-    client = weaviate.Client(WEAVIATE_URL)
+# Properties shared by the dense and multi-vector classes
+DOCUMENT_PROPERTIES = [
+    {
+        "name": "contents",
+        "dataType": ["text"],
+        "description": "The textual content of the document"
+    },
+    {
+        "name": "course_id",
+        "dataType": ["string"],
+        "description": "Course identifier"
+    },
+    {
+        "name": "activity_id",
+        "dataType": ["string"],
+        "description": "Activity identifier"
+    },
+    {
+        "name": "course_name",
+        "dataType": ["string"],
+        "description": "Course name"
+    },
+    {
+        "name": "activity_name",
+        "dataType": ["string"],
+        "description": "Activity name"
+    },
+    {
+        "name": "strand",
+        "dataType": ["string"],
+        "description": "Learning strand"
+    },
+    {
+        "name": "cluster_id",
+        "dataType": ["string"],
+        "description": "Id of the near-duplicate cluster representative"
+    },
+    {
+        "name": "parent_id",
+        "dataType": ["string"],
+        "description": "Id of the document a passage was cut from"
+    },
+    {
+        "name": "passage_id",
+        "dataType": ["string"],
+        "description": "Id of the passage (the document id for documents indexed whole)"
+    },
+    {
+        "name": "chunk_index",
+        "dataType": ["int"],
+        "description": "Position of the passage in its parent document"
+    }
+]
+
+# Description of each document class
+DOCUMENT_CLASSES = {
+    "VetDocument": "Veterinary learning content document with dense embedding",
+    "VetDocumentMultiVector": "Veterinary learning content document with multi-vector embedding"
+}
+
+def build_class_schema(class_name: str, description: str, index_settings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a Weaviate class definition for documents with our own vectors.
+    
+    Args:
+        class_name: Weaviate class name
+        description: Class description
+        index_settings: Vector index settings (see indexing.vector_index_config)
+        
+    Returns:
+        Class definition dictionary
+    """
+    return {
+        "class": class_name,
+        "description": description,
+        "vectorizer": "none",  # We'll provide our own vectors
+        "vectorIndexType": "hnsw",
+        "vectorIndexConfig": build_vector_index_config(index_settings),
+        "properties": DOCUMENT_PROPERTIES
+    }
+
+def initialize_weaviate_schema(class_names: Optional[Dict[str, str]] = None, recreate: bool = False,
+                               client: Optional[weaviate.Client] = None):
+    """
+    Initialize Weaviate schema for both dense and multi-vector embeddings.
+    
+    Args:
+        class_names: Maps each base class in DOCUMENT_CLASSES to the class to
+            create (e.g. a versioned index generation); defaults to the base names
+        recreate: Drop the classes first if they exist, so a re-ingest does not
+            collide with objects left by an earlier run
+        client: Weaviate client to use, by default a new one
+    """
+    client = client or weaviate.Client(WEAVIATE_URL)
+    class_names = class_names or {}
     
     # Check if classes already exist
     schema = client.schema.get()
     existing_classes = [c['class'] for c in schema['classes']] if schema.get('classes') else []
     
-    # Create VetDocument class for dense embeddings if it doesn't exist
-    if "VetDocument" not in existing_classes:
-        vet_doc_class = {
-            "class": "VetDocument",
-            "description": "Veterinary learning content document with dense embedding",
-            "vectorizer": "none",  # We'll provide our own vectors
-            "properties": [
-                {
-                    "name": "contents",
-                    "dataType": ["text"],
-                    "description": "The textual content of the document"
-                },
-                {
-                    "name": "course_id",
-                    "dataType": ["string"],
-                    "description": "Course identifier"
-                },
-                {
-                    "name": "activity_id",
-                    "dataType": ["string"],
-                    "description": "Activity identifier"
-                },
-                {
-                    "name": "course_name",
-                    "dataType": ["string"],
-                    "description": "Course name"
-                },
-                {
-                    "name": "activity_name",
-                    "dataType": ["string"],
-                    "description": "Activity name"
-                },
-                {
-                    "name": "strand",
-                    "dataType": ["string"],
-                    "description": "Learning strand"
-                }
-            ]
-        }
-        client.schema.create_class(vet_doc_class)
-        logger.info("Created VetDocument class in Weaviate")
-    
-    # Create VetDocumentMultiVector class for multi-vector embeddings if it doesn't exist
-    if "VetDocumentMultiVector" not in existing_classes:
-        vet_multivec_class = {
-            "class": "VetDocumentMultiVector",
-            "description": "Veterinary learning content document with multi-vector embedding",
-            "vectorizer": "none",  # We'll provide our own vectors
-            "vectorIndexConfig": {
-                "skip": False,
-                "vectorCacheMaxObjects": 500000,
-                "ef": 256,
-                "efConstruction": 512,
-                "maxConnections": 128,
-                "multiVectorStorage": True  # Enable multi-vector storage
-            },
-            "properties": [
-                {
-                    "name": "contents",
-                    "dataType": ["text"],
-                    "description": "The textual content of the document"
-                },
-                {
-                    "name": "course_id",
-                    "dataType": ["string"],
-                    "description": "Course identifier"
-                },
-                {
-                    "name": "activity_id",
-                    "dataType": ["string"],
-                    "description": "Activity identifier"
-                },
-                {
-                    "name": "course_name",
-                    "dataType": ["string"],
-                    "description": "Course name"
-                },
-                {
-                    "name": "activity_name",
-                    "dataType": ["string"],
-                    "description": "Activity name"
-                },
-                {
-                    "name": "strand",
-                    "dataType": ["string"],
-                    "description": "Learning strand"
-                }
-            ]
-        }
-        client.schema.create_class(vet_multivec_class)
-        logger.info("Created VetDocumentMultiVector class in Weaviate")
+    # Create each document class with its configured vector index if it doesn't exist
+    for base_class, description in DOCUMENT_CLASSES.items():
+        class_name = class_names.get(base_class, base_class)
+        if recreate and class_name in existing_classes:
+            client.schema.delete_class(class_name)
+            existing_classes.remove(class_name)
+            logger.info(f"Dropped {class_name} class to re-ingest it from scratch")
+        if class_name not in existing_classes:
+            index_settings = get_index_settings(class_name, base_class)
+            client.schema.create_class(build_class_schema(class_name, description, index_settings))
+            logger.info(f"Created {class_name} class in Weaviate with index settings {index_settings}")
 
 def get_token_embeddings(text: str, model, tokenizer):
     """Generate token-level embeddings for multi-vector storage"""
@@ -154,15 +171,102 @@ def get_token_embeddings(text: str, model, tokenizer):
     
     return pooled_embeddings
 
-def ingest_into_weaviate(doc: Dict[str, Any]):
+def embed_document(text: str):
+    """
+    Generate the dense and multi-vector embeddings for a document text.
+    
+    Args:
+        text: Document content
+        
+    Returns:
+        Tuple of (dense_vector, multi_vectors)
+    """
+    model, tokenizer = get_model()
+    dense_vector = model.encode(text).tolist()
+    multi_vectors = get_token_embeddings(text, model.model, tokenizer)
+    return dense_vector, multi_vectors
+
+def init_embedding_worker(num_threads: int = 1) -> None:
+    """Process pool initializer: load BGE-M3 once per worker"""
+    torch.set_num_threads(num_threads)
+    get_model()
+
+def embed_batch(texts: List[str]):
+    """Embed a batch of texts inside a worker started with init_embedding_worker"""
+    return [embed_document(text) if text else (None, None) for text in texts]
+
+def object_uuid(doc_id: str) -> str:
+    """Weaviate object id of a document: its own id if that is a UUID, else one derived from it"""
+    try:
+        return str(uuid.UUID(doc_id))
+    except ValueError:
+        # Passage ids ("<parent>#<n>") and other non-UUID ids
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, doc_id))
+
+def document_properties(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Weaviate properties of a document or passage.
+
+    The passage id is stored as a property because queries only return the
+    object UUID (derived from it by object_uuid) as an _additional field.
+
+    Args:
+        doc: Document dictionary with content and metadata
+
+    Returns:
+        Dictionary of DOCUMENT_PROPERTIES values
+    """
+    doc_id = doc.get("id", "")
+    return {
+        "contents": doc.get("contents", ""),
+        "course_id": doc.get("course_id", ""),
+        "activity_id": doc.get("activity_id", ""),
+        "course_name": doc.get("course_name", ""),
+        "activity_name": doc.get("activity_name", ""),
+        "strand": doc.get("strand", ""),
+        "cluster_id": doc.get("cluster_id", doc_id),
+        "parent_id": doc.get("parent_id", doc_id),
+        "passage_id": doc_id,
+        "chunk_index": doc.get("chunk_index", 0)
+    }
+
+def configure_batch(client: weaviate.Client, batch_size: int = WEAVIATE_BATCH_SIZE) -> None:
+    """Use fixed-size batches on a client and log the objects Weaviate rejects"""
+    client.batch.configure(batch_size=batch_size, dynamic=False, callback=log_batch_errors)
+
+def log_batch_errors(results: Optional[List[Dict[str, Any]]]) -> None:
+    """Batch callback: log every object of a batch that failed"""
+    for result in results or []:
+        errors = (result.get("result") or {}).get("errors")
+        if errors:
+            logger.error(f"Error adding object {result.get('id')} to {result.get('class')} class: {errors}")
+
+def ingest_into_weaviate(doc: Dict[str, Any], dense_vector: Optional[List[float]] = None,
+                         multi_vectors: Optional[List[List[float]]] = None,
+                         class_names: Optional[Dict[str, str]] = None,
+                         client: Optional[weaviate.Client] = None):
     """
     Ingest a document into Weaviate with both dense and multi-vector embeddings.
     
+    The dense object is added to the client's batch, so callers ingesting
+    many documents share one client configured with configure_batch and
+    flush it (e.g. by leaving a "with client.batch" block).
+    
     Args:
         doc: Document dictionary with content and metadata
+        dense_vector: Precomputed dense embedding (e.g. shared by a near-duplicate cluster)
+        multi_vectors: Precomputed token-level embeddings
+        class_names: Maps base class names to the classes to write to
+        client: Shared Weaviate client; a single document gets its own, flushed on return
     """
-    client = weaviate.Client(WEAVIATE_URL)
-    model, tokenizer = get_model()
+    if client is None:
+        client = weaviate.Client(WEAVIATE_URL)
+        configure_batch(client)
+        with client.batch:
+            return ingest_into_weaviate(doc, dense_vector, multi_vectors, class_names, client)
+    class_names = class_names or {}
+    dense_class = class_names.get("VetDocument", "VetDocument")
+    multi_class = class_names.get("VetDocumentMultiVector", "VetDocumentMultiVector")
     
     # Get document text
     text = doc.get("contents", "")
@@ -170,47 +274,24 @@ def ingest_into_weaviate(doc: Dict[str, Any]):
         logger.warning(f"Skipping document {doc.get('id', 'unknown')} with empty content")
         return
     
-    # Get dense document embedding
-    dense_vector = model.encode(text).tolist()
+    # Embed the document unless vectors were supplied
+    if dense_vector is None or multi_vectors is None:
+        dense_vector, multi_vectors = embed_document(text)
     
-    # Get token-level embeddings for multi-vector
-    multi_vectors = get_token_embeddings(text, model.model, tokenizer)
-    
-    # Add document with dense embedding
+    # Add document with dense embedding; failures are reported by log_batch_errors
     doc_id = doc.get("id", "")
-    try:
-        client.data_object.create(
-            data_object={
-                "contents": text,
-                "course_id": doc.get("course_id", ""),
-                "activity_id": doc.get("activity_id", ""),
-                "course_name": doc.get("course_name", ""),
-                "activity_name": doc.get("activity_name", ""),
-                "strand": doc.get("strand", "")
-            },
-            class_name="VetDocument",
-            uuid=doc_id,
-            vector=dense_vector
-        )
-        logger.debug(f"Added document {doc_id} to VetDocument class")
-    except Exception as e:
-        logger.error(f"Error adding document {doc_id} to VetDocument class: {str(e)}")
+    properties = document_properties(doc)
+    client.batch.add_data_object(properties, dense_class, uuid=object_uuid(doc_id), vector=dense_vector)
     
-    # Add document with multi-vector embedding
+    # Add document with multi-vector embedding; a batch object holds a single
+    # vector, so these are still created one by one on the shared client
     try:
         client.data_object.create(
-            data_object={
-                "contents": text,
-                "course_id": doc.get("course_id", ""),
-                "activity_id": doc.get("activity_id", ""),
-                "course_name": doc.get("course_name", ""),
-                "activity_name": doc.get("activity_name", ""),
-                "strand": doc.get("strand", "")
-            },
-            class_name="VetDocumentMultiVector",
-            uuid=doc_id,
+            data_object=properties,
+            class_name=multi_class,
+            uuid=object_uuid(doc_id),
             vectors=multi_vectors
         )
-        logger.debug(f"Added document {doc_id} to VetDocumentMultiVector class")
+        logger.debug(f"Added document {doc_id} to {multi_class} class")
     except Exception as e:
-        logger.error(f"Error adding document {doc_id} to VetDocumentMultiVector class: {str(e)}")
\ No newline at end of file
+        logger.error(f"Error adding document {doc_id} to {multi_class} class: {str(e)}")
\ No newline at end of file
@@ -1,13 +1,31 @@
 import os
 import json
+import shutil
 import logging
-from tqdm import tqdm
-from typing import Dict, List, Any
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Any
 
 # Import indexing functions
 from indexing.pyserini_bm25_index import create_bm25_index
-from indexing.pyserini_unicoil_index import create_unicoil_index
-from indexing.weaviate_ingest import initialize_weaviate_schema, ingest_into_weaviate
+from indexing.pyserini_unicoil_index import (
+    IMPACT_QUANTIZATION, MODEL_NAME as UNICOIL_MODEL_NAME,
+    build_unicoil_index, encode_unicoil_batch, init_unicoil_worker, to_indexed_document
+)
+from indexing.weaviate_ingest import (
+    MODEL_NAME as EMBEDDING_MODEL_NAME,
+    configure_batch, initialize_weaviate_schema, ingest_into_weaviate, embed_batch, init_embedding_worker
+)
+from indexing.chunking import CHUNKING_ENABLED, chunk_documents, chunking_settings
+from indexing.dedup import (
+    DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_BANDS, DEDUP_SHINGLE_SIZE, DEDUP_SEED, assign_clusters, group_by_cluster
+)
+from indexing.scheduler import Checkpoint, Stage, StageProgress, reset_checkpoints, run_stages
+from indexing.generations import start_build, publish, retire_old_generations
+from indexing.sharding import INDEX_SHARDS, SHARD_BY, partition, shard_dirs, shard_of, write_shard_manifest
+from search.impact_index import ImpactIndex
+from search.weaviate_client import create_client
 
 # Configure logging
 logging.basicConfig(
@@ -16,6 +34,83 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Scheduler settings
+CHECKPOINT_EVERY = int(os.environ.get("CHECKPOINT_EVERY", "64"))
+UNICOIL_WORKERS = int(os.environ.get("UNICOIL_WORKERS", "1"))
+EMBEDDING_WORKERS = int(os.environ.get("EMBEDDING_WORKERS", "1"))
+# Seconds the indexer waits for Weaviate to become ready
+WEAVIATE_STARTUP_PERIOD = int(os.environ.get("WEAVIATE_STARTUP_PERIOD", "30"))
+
+Cluster = List[Dict[str, Any]]
+
+def run_batched(clusters: List[Cluster], checkpoint: Checkpoint, progress: StageProgress,
+                pool: ProcessPoolExecutor, workers: int, encode_fn: Callable, handle_fn: Callable) -> None:
+    """
+    Encode cluster representatives in a process pool and hand results over in order.
+    
+    Work is split into CHECKPOINT_EVERY-sized batches starting at the checkpoint
+    position. A bounded number of batches is kept in flight so the pool stays
+    busy while the handler runs, and the checkpoint advances after each batch.
+    
+    Args:
+        clusters: Document clusters, representative first
+        checkpoint: Stage checkpoint
+        progress: Stage progress reporter
+        pool: Process pool whose workers can run encode_fn
+        workers: Number of workers in the pool
+        encode_fn: Picklable function mapping a list of texts to a list of encodings
+        handle_fn: Called with (start, batch, encodings) for each finished batch
+    """
+    starts = iter(range(checkpoint.position, len(clusters), CHECKPOINT_EVERY))
+    in_flight = deque()
+    
+    def submit_next() -> bool:
+        start = next(starts, None)
+        if start is None:
+            return False
+        batch = clusters[start:start + CHECKPOINT_EVERY]
+        texts = [members[0].get("contents", "") for members in batch]
+        in_flight.append((start, batch, pool.submit(encode_fn, texts)))
+        return True
+    
+    while len(in_flight) < 2 * workers and submit_next():
+        pass
+    while in_flight:
+        start, batch, future = in_flight.popleft()
+        encodings = future.result()
+        submit_next()
+        handle_fn(start, batch, encodings)
+        checkpoint.save(start + len(batch))
+        progress.update(len(batch))
+
+def make_pool(workers: int, initializer: Callable, threads_per_worker: int) -> ProcessPoolExecutor:
+    """Create a model worker pool; spawned because the parent already runs threads and a JVM"""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer,
+        initargs=(threads_per_worker,)
+    )
+
+def data_fingerprint(data_path: str) -> str:
+    """Identify the dataset (and chunking, dedup, shard and encoder settings) the checkpoints belong to"""
+    stat = os.stat(data_path)
+    dedup = os.environ.get("DEDUP_ENABLED", "true")
+    if dedup.lower() == "true":
+        # Checkpoint positions index into the cluster list these settings produce
+        dedup += f",{DEDUP_THRESHOLD},{DEDUP_NUM_PERM},{DEDUP_BANDS},{DEDUP_SHINGLE_SIZE},{DEDUP_SEED}"
+    return (f"{os.path.abspath(data_path)}:{stat.st_size}:{stat.st_mtime_ns}:dedup={dedup}"
+            f":shards={INDEX_SHARDS}:{SHARD_BY}:chunking={json.dumps(chunking_settings(), sort_keys=True)}"
+            # Checkpointed encodings are only reusable with the same models and impact scale
+            f":models={UNICOIL_MODEL_NAME},{EMBEDDING_MODEL_NAME}:quantization={IMPACT_QUANTIZATION}")
+
+def read_documents(data_path: str) -> Iterator[Dict[str, Any]]:
+    """Stream documents from a JSONL file"""
+    with open(data_path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
 def main():
     # Get environment variables
     data_path = os.environ.get("DATA_PATH", "/app/data/vet_moodle_dataset.jsonl")
@@ -25,33 +120,131 @@ def main():
         logger.error(f"Data file not found: {data_path}")
         return
     
-    # Load data
+    # Build into a new index generation, or resume the unfinished one;
+    # the API keeps serving the current generation until this one is published
+    generation = start_build()
+    checkpoint_dir = generation["checkpoint_dir"]
+    unicoil_work_dir = generation["unicoil_work_dir"]
+    
+    # Start over if the data changed since the checkpoints were written
+    fingerprint = data_fingerprint(data_path)
+    if Checkpoint("run", checkpoint_dir).state.get("fingerprint") != fingerprint:
+        logger.info("No checkpoints for this dataset, indexing from scratch")
+        reset_checkpoints(checkpoint_dir)
+        Checkpoint("run", checkpoint_dir).save(0, fingerprint=fingerprint)
+    
+    # Load data, split into passages on the way in when chunking is enabled.
+    # Dedup, the cluster batches of the resumable stages and the BM25 shards
+    # all need the whole corpus, so every passage is held in memory; only the
+    # unchunked documents are streamed and never kept.
     logger.info(f"Loading data from {data_path}")
-    documents = []
-    with open(data_path, 'r') as f:
-        for line in f:
-            documents.append(json.loads(line))
+    if CHUNKING_ENABLED:
+        documents = list(chunk_documents(read_documents(data_path)))
+        num_parents = len({doc["parent_id"] for doc in documents})
+        logger.info(f"Loaded {num_parents} documents as {len(documents)} passages")
+    else:
+        documents = list(read_documents(data_path))
+        logger.info(f"Loaded {len(documents)} documents")
+    
+    # Every index holds the same passages; search aggregates them per parent document
+    generation["chunking"] = chunking_settings()
+    # Queries are quantized with the scale of the index, not the API's environment
+    generation["impact_quantization"] = IMPACT_QUANTIZATION
+    
+    # Group near-duplicates so each cluster is only encoded once
+    if os.environ.get("DEDUP_ENABLED", "true").lower() == "true":
+        logger.info("Detecting near-duplicate documents")
+        assign_clusters(documents)
+    clusters = list(group_by_cluster(documents).values())
+    
+    # uniCOIL and BGE-M3 workers share the available cores
+    threads_per_worker = max(1, (os.cpu_count() or 1) // (UNICOIL_WORKERS + EMBEDDING_WORKERS))
+    
+    # With INDEX_SHARDS > 1 the BM25 and uniCOIL indexes are split into shards
+    # that the API searches in parallel worker processes
+    encoded_dirs = shard_dirs(unicoil_work_dir, INDEX_SHARDS)
+    
+    def bm25_stage(checkpoint: Checkpoint, progress: StageProgress) -> None:
+        # A partially written Lucene index cannot be resumed, so rebuild it
+        shutil.rmtree(generation["bm25_path"], ignore_errors=True)
+        for shard_docs, shard_dir in zip(partition(documents, INDEX_SHARDS),
+                                         shard_dirs(generation["bm25_path"], INDEX_SHARDS)):
+            create_bm25_index(shard_docs, shard_dir)
+        write_shard_manifest(generation["bm25_path"], INDEX_SHARDS)
+        progress.update(len(documents))
+    
+    def unicoil_encode_stage(checkpoint: Checkpoint, progress: StageProgress) -> None:
+        if checkpoint.position == 0:
+            shutil.rmtree(unicoil_work_dir, ignore_errors=True)
+        for encoded_dir in encoded_dirs:
+            os.makedirs(encoded_dir, exist_ok=True)
+        
+        def write_batch(start: int, batch: List[Cluster], encodings: List[Any]) -> None:
+            indexed = [[] for _ in encoded_dirs]
+            for offset, (members, term_impact_pairs) in enumerate(zip(batch, encodings)):
+                for doc in members:
+                    indexed_doc = to_indexed_document(doc, term_impact_pairs, start + offset)
+                    indexed[shard_of(indexed_doc, len(encoded_dirs))].append(indexed_doc)
+            # One JSONL file per batch and shard, so a resumed batch simply overwrites it
+            for encoded_dir, shard_docs in zip(encoded_dirs, indexed):
+                batch_path = os.path.join(encoded_dir, f"batch-{start:08d}.jsonl")
+                with open(f"{batch_path}.tmp", 'w') as f:
+                    for indexed_doc in shard_docs:
+                        f.write(json.dumps(indexed_doc) + "\n")
+                os.replace(f"{batch_path}.tmp", batch_path)
+        
+        with make_pool(UNICOIL_WORKERS, init_unicoil_worker, threads_per_worker) as pool:
+            run_batched(clusters, checkpoint, progress, pool, UNICOIL_WORKERS, encode_unicoil_batch, write_batch)
     
-    logger.info(f"Loaded {len(documents)} documents")
+    def unicoil_index_stage(checkpoint: Checkpoint, progress: StageProgress) -> None:
+        shutil.rmtree(generation["unicoil_path"], ignore_errors=True)
+        for encoded_dir, shard_dir in zip(encoded_dirs, shard_dirs(generation["unicoil_path"], INDEX_SHARDS)):
+            build_unicoil_index(encoded_dir, shard_dir)
+        write_shard_manifest(generation["unicoil_path"], INDEX_SHARDS)
+        progress.update()
     
-    # Create BM25 index
-    logger.info("Creating BM25 index")
-    create_bm25_index(documents)
+    def unicoil_native_stage(checkpoint: Checkpoint, progress: StageProgress) -> None:
+        # Array-backed impact index for the in-process engine (UNICOIL_ENGINE=native)
+        for encoded_dir, shard_dir in zip(encoded_dirs, shard_dirs(generation["unicoil_native_path"], INDEX_SHARDS)):
+            ImpactIndex.from_encoded_dir(encoded_dir).save(shard_dir)
+        write_shard_manifest(generation["unicoil_native_path"], INDEX_SHARDS)
+        progress.update()
     
-    # Create uniCOIL index
-    logger.info("Creating uniCOIL index")
-    create_unicoil_index(documents)
+    def weaviate_stage(checkpoint: Checkpoint, progress: StageProgress) -> None:
+        # One pooled client for the whole stage, writing through its batch
+        client = create_client(startup_period=WEAVIATE_STARTUP_PERIOD)
+        configure_batch(client)
+        # Starting over (new data or settings): drop objects from an earlier attempt,
+        # which create() could not overwrite
+        initialize_weaviate_schema(generation["weaviate_classes"], recreate=checkpoint.position == 0, client=client)
+        
+        def ingest_batch(start: int, batch: List[Cluster], encodings: List[Any]) -> None:
+            # Leaving the batch block flushes it, before the checkpoint covers these clusters
+            with client.batch:
+                # Share the representative's vectors with the rest of the cluster
+                for members, (dense_vector, multi_vectors) in zip(batch, encodings):
+                    for doc in members:
+                        ingest_into_weaviate(doc, dense_vector, multi_vectors, generation["weaviate_classes"],
+                                             client)
+        
+        with make_pool(EMBEDDING_WORKERS, init_embedding_worker, threads_per_worker) as pool:
+            run_batched(clusters, checkpoint, progress, pool, EMBEDDING_WORKERS, embed_batch, ingest_batch)
     
-    # Initialize Weaviate schema
-    logger.info("Initializing Weaviate schema")
-    initialize_weaviate_schema()
+    # The Lucene BM25 build runs alongside model inference in the other stages
+    stages = [
+        Stage("bm25", bm25_stage, total=len(documents)),
+        Stage("unicoil_encode", unicoil_encode_stage, total=len(clusters)),
+        Stage("unicoil_index", unicoil_index_stage, depends_on=["unicoil_encode"]),
+        Stage("unicoil_native", unicoil_native_stage, depends_on=["unicoil_encode"]),
+        Stage("weaviate", weaviate_stage, total=len(clusters)),
+    ]
+    run_stages(stages, checkpoint_dir)
     
-    # Ingest documents into Weaviate
-    logger.info("Ingesting documents into Weaviate")
-    for doc in tqdm(documents, desc="Ingesting documents"):
-        ingest_into_weaviate(doc)
+    # Hot-swap the API over to the new generation, then drop old ones
+    publish(generation)
+    retire_old_generations(create_client(startup_period=WEAVIATE_STARTUP_PERIOD))
     
     logger.info("Indexing complete!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
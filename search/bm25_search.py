@@ -1,12 +1,11 @@
-from pyserini.search import LuceneSearcher
 from typing import Dict, List, Optional, Any
-import os
-import json
 
-# Path to the BM25 index
-INDEX_PATH = os.environ.get("BM25_INDEX_PATH", "/app/indexes/bm25")
+from search.results import format_result, retrieve_top_k
+from search.index_registry import current_generation
+from search.sharded_search import collect_hits, search_bm25_sharded
 
-def search_bm25(query: str, filters: Optional[Dict[str, str]] = None, k: int = 10) -> List[Dict[str, Any]]:
+def search_bm25(query: str, filters: Optional[Dict[str, str]] = None, k: int = 10,
+                collapse: bool = False) -> List[Dict[str, Any]]:
     """
     Search using BM25 with optional metadata filtering.
     
@@ -14,40 +13,28 @@ def search_bm25(query: str, filters: Optional[Dict[str, str]] = None, k: int = 1
         query: The search query string
         filters: Optional dictionary of metadata filters (field:value)
         k: Number of results to return
+        collapse: Return one hit per near-duplicate cluster
         
     Returns:
         List of search results with document content and metadata
     """
-    # Initialize the searcher
-    searcher = LuceneSearcher(INDEX_PATH)
+    generation = current_generation()
+    shard_manifest = generation.shard_manifest("bm25_path")
+    if shard_manifest:
+        # Scatter over the shard workers, scored with global statistics
+        def retrieve(num_candidates: int) -> List[Dict[str, Any]]:
+            hits = search_bm25_sharded(generation.manifest["bm25_path"], shard_manifest,
+                                       query, num_candidates, filters)
+            return [format_result(doc, doc.get("id", ""), score) for score, doc in hits]
+        return retrieve_top_k(retrieve, k, collapse)
     
-    # Construct filter query if filters are provided
-    filter_query = None
-    if filters and len(filters) > 0:
-        filter_clauses = []
-        for field, value in filters.items():
-            filter_clauses.append(f"{field}:{value}")
-        filter_query = " AND ".join(filter_clauses)
+    # Shared searcher of the index generation being served
+    searcher = generation.bm25_searcher()
     
-    # Perform the search
-    if filter_query:
-        hits = searcher.search(query, k=k, query_generator=None, filter_query=filter_query)
-    else:
-        hits = searcher.search(query, k=k)
+    # Filters are exact field matches on the stored documents, as in the
+    # sharded path, deepening the hit list until enough pass
+    def retrieve(num_candidates: int) -> List[Dict[str, Any]]:
+        hits = collect_hits(lambda n: searcher.search(query, k=n), searcher, num_candidates, filters)
+        return [format_result(doc, doc.get("id", ""), score) for score, doc in hits]
     
-    # Process results
-    results = []
-    for hit in hits:
-        doc = json.loads(searcher.doc(hit.docid).raw())
-        results.append({
-            "id": doc.get("id", hit.docid),
-            "score": hit.score,
-            "contents": doc.get("contents", ""),
-            "course_id": doc.get("course_id", ""),
-            "activity_id": doc.get("activity_id", ""),
-            "course_name": doc.get("course_name", ""),
-            "activity_name": doc.get("activity_name", ""),
-            "strand": doc.get("strand", "")
-        })
-    
-    return results
\ No newline at end of file
+    return retrieve_top_k(retrieve, k, collapse)
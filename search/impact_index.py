@@ -0,0 +1,383 @@
+import os
+import json
+import glob
+import threading
+from typing import Dict, List, Optional, Any, Tuple
+import logging
+import numpy as np
+
+from search.results import METADATA_FIELDS, metadata_value
+
+logger = logging.getLogger(__name__)
+
+# Postings per compressed block; a block is the unit of decoding
+BLOCK_SIZE = 128
+
+def encode_varints(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode non-negative integers as varints (7 bits per byte, high bit set on all but the last byte).
+
+    Args:
+        values: Integers to encode
+
+    Returns:
+        Tuple of (encoded bytes, number of bytes of each value)
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for bits in (7, 14, 21, 28):
+        lengths += values >= (1 << bits)
+    starts = np.cumsum(lengths) - lengths
+    repeated = np.repeat(values, lengths)
+    byte_nums = np.arange(len(repeated)) - np.repeat(starts, lengths)
+    data = (repeated >> (7 * byte_nums).astype(np.uint64)) & 0x7F
+    data[byte_nums < np.repeat(lengths - 1, lengths)] |= 0x80
+    return data.astype(np.uint8), lengths
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    """Decode a run of varints written by encode_varints"""
+    if not len(data) or data.max() < 0x80:
+        # Every value fits in one byte, as do most doc number gaps
+        return data.astype(np.int64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    shifts = 7 * (np.arange(len(data)) - np.repeat(starts, ends - starts + 1))
+    return np.add.reduceat((data & 0x7F).astype(np.int64) << shifts, starts)
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenation of np.arange(start, end) for each pair"""
+    lengths = ends - starts
+    return np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+
+class ImpactIndex:
+    """
+    In-memory learned-sparse index over quantized uniCOIL impacts.
+
+    Posting lists are concatenated term by term; per-term offsets index
+    postings. Doc numbers are sorted within each list and stored as
+    varint-encoded gaps in blocks of BLOCK_SIZE postings, with the byte
+    offset and last doc number of every block, so a lookup only decodes
+    the blocks that can hold it. Impacts stay fixed-width, in the narrowest
+    integer type that fits, since uniCOIL impacts rarely compress below
+    one byte.
+
+    Queries are answered exactly with term-at-a-time MaxScore into a sparse
+    accumulator (a per-thread score array and the documents touched, the
+    only entries read and reset per query): once the remaining terms cannot
+    lift an unseen document into the top-k, they are only looked up for the
+    surviving candidates.
+    """
+
+    def __init__(self, vocab: Dict[str, int], offsets: np.ndarray, doc_bytes: np.ndarray,
+                 block_offsets: np.ndarray, block_last_docs: np.ndarray, impacts: np.ndarray,
+                 docs: List[Dict[str, Any]]):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.doc_bytes = doc_bytes
+        self.block_offsets = block_offsets
+        self.block_last_docs = block_last_docs
+        self.impacts = impacts
+        self.docs = docs
+
+        # Block layout follows from the posting list lengths
+        num_blocks = -(-np.diff(offsets) // BLOCK_SIZE)
+        self.term_blocks = np.zeros(len(num_blocks) + 1, dtype=np.int64)
+        np.cumsum(num_blocks, out=self.term_blocks[1:])
+        first_blocks = np.repeat(self.term_blocks[:-1], num_blocks)
+        self.block_postings = np.append(
+            np.repeat(offsets[:-1], num_blocks) + (np.arange(self.term_blocks[-1]) - first_blocks) * BLOCK_SIZE,
+            offsets[-1]
+        )
+        # Gaps of a block's first posting are relative to the previous block's last doc
+        self.block_bases = np.zeros(self.term_blocks[-1], dtype=np.int64)
+        continued = np.arange(self.term_blocks[-1]) != first_blocks
+        self.block_bases[continued] = block_last_docs[np.flatnonzero(continued) - 1]
+
+        self.max_impacts = np.array(
+            [impacts[offsets[t]:offsets[t + 1]].max() if offsets[t + 1] > offsets[t] else 0
+             for t in range(len(offsets) - 1)],
+            dtype=np.int64
+        )
+        self._field_codes, self._field_values = self._encode_fields(docs)
+        self._local = threading.local()
+
+    @staticmethod
+    def _encode_fields(docs: List[Dict[str, Any]]) -> Tuple[Dict[str, np.ndarray], Dict[str, Dict[str, int]]]:
+        codes, values = {}, {}
+        for field in METADATA_FIELDS:
+            mapping: Dict[str, int] = {}
+            column = np.empty(len(docs), dtype=np.int32)
+            for i, doc in enumerate(docs):
+                column[i] = mapping.setdefault(metadata_value(doc, field), len(mapping))
+            codes[field], values[field] = column, mapping
+        return codes, values
+
+    @classmethod
+    def from_postings(cls, vocab: Dict[str, int], offsets: np.ndarray, doc_nums: np.ndarray,
+                      impacts: np.ndarray, docs: List[Dict[str, Any]]) -> "ImpactIndex":
+        """
+        Build an index from uncompressed CSR posting lists.
+
+        Args:
+            vocab: Term to term number
+            offsets: Start of each term's postings, plus the total
+            doc_nums: Doc numbers, sorted within each term
+            impacts: Impact of each posting
+            docs: Stored documents by doc number
+
+        Returns:
+            ImpactIndex
+        """
+        doc_nums = np.asarray(doc_nums, dtype=np.int64)
+        gaps = np.diff(doc_nums, prepend=0)
+        # Each list starts from doc number 0
+        starts = offsets[:-1][np.diff(offsets) > 0]
+        gaps[starts] = doc_nums[starts]
+        doc_bytes, lengths = encode_varints(gaps)
+        byte_starts = np.append(np.cumsum(lengths) - lengths, len(doc_bytes))
+
+        num_blocks = -(-np.diff(offsets) // BLOCK_SIZE)
+        block_starts = np.repeat(offsets[:-1], num_blocks) + \
+            (np.arange(num_blocks.sum()) - np.repeat(np.cumsum(num_blocks) - num_blocks, num_blocks)) * BLOCK_SIZE
+        block_ends = np.minimum(block_starts + BLOCK_SIZE, np.repeat(offsets[1:], num_blocks))
+        block_offsets = np.append(byte_starts[block_starts], len(doc_bytes))
+        block_last_docs = doc_nums[block_ends - 1].astype(np.uint32)
+        return cls(vocab, offsets, doc_bytes, block_offsets, block_last_docs, impacts, docs)
+
+    @classmethod
+    def from_documents(cls, documents) -> "ImpactIndex":
+        """
+        Build an index from documents carrying a uniCOIL "vector".
+
+        Args:
+            documents: Iterable of indexed documents with an integer {term: impact} vector
+
+        Returns:
+            ImpactIndex
+        """
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        docs = []
+        for doc in documents:
+            doc_num = len(docs)
+            vector = doc.get("vector", {})
+            if isinstance(vector, list):
+                # Older encodings stored [term, weight] pairs
+                from indexing.pyserini_unicoil_index import quantize_impacts
+                vector = quantize_impacts(vector)
+            for term, impact in vector.items():
+                if impact > 0:
+                    doc_list, impact_list = postings.setdefault(term, ([], []))
+                    doc_list.append(doc_num)
+                    impact_list.append(int(impact))
+            docs.append({k: v for k, v in doc.items() if k != "vector"})
+
+        vocab = {term: t for t, term in enumerate(postings)}
+        lengths = np.array([len(postings[term][0]) for term in vocab], dtype=np.int64)
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        max_impact = max((max(p[1]) for p in postings.values()), default=0)
+        impact_dtype = next((dtype for dtype in (np.uint8, np.uint16, np.uint32)
+                             if max_impact <= np.iinfo(dtype).max), np.uint32)
+        impact_limit = int(np.iinfo(impact_dtype).max)
+        if max_impact > impact_limit:
+            logger.warning(f"Clipping impacts above {impact_limit} (largest is {max_impact})")
+        doc_nums = np.empty(offsets[-1], dtype=np.int64)
+        impacts = np.empty(offsets[-1], dtype=impact_dtype)
+        for term, t in vocab.items():
+            # Doc numbers are appended in increasing order, so each list is already sorted
+            doc_nums[offsets[t]:offsets[t + 1]] = postings[term][0]
+            impacts[offsets[t]:offsets[t + 1]] = np.minimum(postings[term][1], impact_limit)
+        logger.info(f"Built impact index with {len(docs)} documents and {len(vocab)} terms")
+        return cls.from_postings(vocab, offsets, doc_nums, impacts, docs)
+
+    @classmethod
+    def from_encoded_dir(cls, input_dir: str) -> "ImpactIndex":
+        """Build an index from the JSON/JSONL files written by the uniCOIL indexer"""
+        def iter_documents():
+            for path in sorted(glob.glob(os.path.join(input_dir, "*.json*"))):
+                with open(path, 'r') as f:
+                    if path.endswith(".jsonl"):
+                        for line in f:
+                            yield json.loads(line)
+                    else:
+                        yield json.load(f)
+        return cls.from_documents(iter_documents())
+
+    def save(self, path: str) -> None:
+        """Persist the index to a directory"""
+        os.makedirs(path, exist_ok=True)
+        np.savez_compressed(os.path.join(path, "postings.npz"),
+                            offsets=self.offsets, doc_bytes=self.doc_bytes, block_offsets=self.block_offsets,
+                            block_last_docs=self.block_last_docs, impacts=self.impacts)
+        with open(os.path.join(path, "vocab.json"), 'w') as f:
+            json.dump(list(self.vocab), f)
+        with open(os.path.join(path, "docs.jsonl"), 'w') as f:
+            for doc in self.docs:
+                f.write(json.dumps(doc) + "\n")
+
+    @classmethod
+    def load(cls, path: str) -> "ImpactIndex":
+        """Load an index saved with save()"""
+        arrays = np.load(os.path.join(path, "postings.npz"))
+        with open(os.path.join(path, "vocab.json"), 'r') as f:
+            vocab = {term: t for t, term in enumerate(json.load(f))}
+        with open(os.path.join(path, "docs.jsonl"), 'r') as f:
+            docs = [json.loads(line) for line in f]
+        if "doc_nums" in arrays:
+            # Saved before posting lists were compressed
+            return cls.from_postings(vocab, arrays["offsets"], arrays["doc_nums"], arrays["impacts"], docs)
+        return cls(vocab, arrays["offsets"], arrays["doc_bytes"], arrays["block_offsets"],
+                   arrays["block_last_docs"], arrays["impacts"], docs)
+
+    @property
+    def postings_nbytes(self) -> int:
+        """Memory held by the posting lists and their block index"""
+        return sum(a.nbytes for a in (self.offsets, self.doc_bytes, self.block_offsets, self.block_last_docs,
+                                      self.block_bases, self.block_postings, self.impacts))
+
+    def filter_mask(self, filters: Optional[Dict[str, str]]) -> Optional[np.ndarray]:
+        """Boolean mask of documents matching all filters, or None when unfiltered"""
+        if not filters:
+            return None
+        mask = np.ones(len(self.docs), dtype=bool)
+        for field, value in filters.items():
+            if field not in self._field_codes:
+                raise ValueError(f"Unsupported filter field: {field}")
+            code = self._field_values[field].get(str(value))
+            if code is None:
+                return np.zeros(len(self.docs), dtype=bool)
+            mask &= self._field_codes[field] == code
+        return mask
+
+    def _accumulator(self) -> np.ndarray:
+        """This thread's score array, all zeros between queries"""
+        scores = getattr(self._local, "scores", None)
+        if scores is None:
+            scores = self._local.scores = np.zeros(len(self.docs), dtype=np.int64)
+        return scores
+
+    def _postings(self, t: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Doc numbers and impacts of a whole posting list"""
+        blocks = self.block_offsets[self.term_blocks[t]:self.term_blocks[t + 1] + 1]
+        if len(blocks) < 2:
+            return np.zeros(0, dtype=np.int64), self.impacts[:0]
+        # The list's first gap is relative to doc 0, so a running sum decodes it
+        doc_nums = np.cumsum(decode_varints(self.doc_bytes[blocks[0]:blocks[-1]]))
+        return doc_nums, self.impacts[self.offsets[t]:self.offsets[t + 1]]
+
+    def _decode_blocks(self, blocks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Doc numbers and impacts of some blocks, in block order"""
+        counts = self.block_postings[blocks + 1] - self.block_postings[blocks]
+        gaps = decode_varints(self.doc_bytes[_ranges(self.block_offsets[blocks], self.block_offsets[blocks + 1])])
+        # Running sum restarted at each block's base
+        sums = np.cumsum(gaps)
+        before = np.concatenate([[0], sums[np.cumsum(counts)[:-1] - 1]])
+        doc_nums = sums + np.repeat(self.block_bases[blocks] - before, counts)
+        impacts = self.impacts[_ranges(self.block_postings[blocks], self.block_postings[blocks + 1])]
+        return doc_nums, impacts
+
+    def _lookup(self, t: int, doc_nums: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Which of some sorted doc numbers a term's list holds, and their impacts there"""
+        first, last = self.term_blocks[t], self.term_blocks[t + 1]
+        # Block of each doc: the first one ending at or after it
+        doc_blocks = np.searchsorted(self.block_last_docs[first:last], doc_nums)
+        in_list = doc_blocks < last - first
+        hit = np.zeros(len(doc_nums), dtype=bool)
+        if not in_list.any():
+            return hit, self.impacts[:0]
+        doc_blocks = doc_blocks[in_list]
+        # doc_nums are sorted, so each block's lookups are adjacent
+        blocks = doc_blocks[np.concatenate([[True], doc_blocks[1:] != doc_blocks[:-1]])]
+        if 2 * len(blocks) > last - first:
+            # Most blocks are needed: decoding the whole list in one pass is cheaper
+            block_docs, block_impacts = self._postings(t)
+        else:
+            block_docs, block_impacts = self._decode_blocks(blocks + first)
+        positions = np.minimum(np.searchsorted(block_docs, doc_nums), len(block_docs) - 1)
+        hit = block_docs[positions] == doc_nums
+        return hit, block_impacts[positions[hit]]
+
+    def search(self, query_weights: Dict[str, int], k: int = 10,
+               filters: Optional[Dict[str, str]] = None) -> List[Tuple[int, int]]:
+        """
+        Exact top-k impact search.
+
+        Args:
+            query_weights: Quantized query term weights
+            k: Number of results to return
+            filters: Optional dictionary of metadata filters (field:value)
+
+        Returns:
+            List of (internal doc number, score), by descending score then doc number
+        """
+        terms = [(self.vocab[term], int(weight)) for term, weight in query_weights.items()
+                 if weight > 0 and term in self.vocab]
+        if not terms or k <= 0:
+            return []
+        # Highest upper bound first; remaining[i] bounds what terms i.. can still add
+        terms.sort(key=lambda tw: tw[1] * self.max_impacts[tw[0]], reverse=True)
+        bounds = np.array([w * self.max_impacts[t] for t, w in terms], dtype=np.int64)
+        remaining = np.concatenate([np.cumsum(bounds[::-1])[::-1], [0]])
+        mask = self.filter_mask(filters)
+
+        scores = self._accumulator()
+        touched: List[np.ndarray] = []
+        try:
+            threshold = 0
+            i = 0
+            # Essential phase: accumulate full posting lists while unseen documents can still qualify
+            while i < len(terms):
+                if i > 0:
+                    candidates = np.concatenate(touched)
+                    if len(candidates) >= k:
+                        threshold = np.partition(scores[candidates], -k)[-k]
+                        if remaining[i] < threshold:
+                            break
+                t, weight = terms[i]
+                doc_nums, impacts = self._postings(t)
+                if mask is not None:
+                    keep = mask[doc_nums]
+                    doc_nums, impacts = doc_nums[keep], impacts[keep]
+                # Impacts and weights are positive, so an untouched document scores 0
+                touched.append(doc_nums[scores[doc_nums] == 0])
+                scores[doc_nums] += weight * impacts.astype(np.int64)
+                i += 1
+
+            candidates = np.concatenate(touched) if touched else np.zeros(0, dtype=np.int64)
+            if i < len(terms):
+                # Non-essential phase: only look up candidates that can still reach the top-k
+                candidates = np.sort(candidates[scores[candidates] + remaining[i] >= threshold])
+            candidate_scores = scores[candidates]
+            if i < len(terms):
+                for j in range(i, len(terms)):
+                    t, weight = terms[j]
+                    hit, impacts = self._lookup(t, candidates)
+                    candidate_scores[hit] += weight * impacts.astype(np.int64)
+                    # Partial scores are lower bounds, so their k-th largest can only raise the threshold
+                    if len(candidate_scores) >= k:
+                        threshold = max(threshold, np.partition(candidate_scores, -k)[-k])
+                    keep = candidate_scores + remaining[j + 1] >= threshold
+                    candidates, candidate_scores = candidates[keep], candidate_scores[keep]
+        finally:
+            for doc_nums in touched:
+                scores[doc_nums] = 0
+
+        if len(candidates) == 0:
+            return []
+        order = np.lexsort((candidates, -candidate_scores))[:k]
+        return [(int(candidates[o]), int(candidate_scores[o])) for o in order]
+
+    def exhaustive_search(self, query_weights: Dict[str, int], k: int = 10,
+                          filters: Optional[Dict[str, str]] = None) -> List[Tuple[int, int]]:
+        """Reference implementation scoring every posting, used to verify search()"""
+        scores = np.zeros(len(self.docs), dtype=np.int64)
+        for term, weight in query_weights.items():
+            if weight > 0 and term in self.vocab:
+                doc_nums, impacts = self._postings(self.vocab[term])
+                scores[doc_nums] += int(weight) * impacts.astype(np.int64)
+        mask = self.filter_mask(filters)
+        if mask is not None:
+            scores[~mask] = 0
+        candidates = np.flatnonzero(scores)
+        order = np.lexsort((candidates, -scores[candidates]))[:k]
+        return [(int(candidates[o]), int(scores[candidates[o]])) for o in order]
@@ -0,0 +1,278 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, List, Optional
+import logging
+
+from indexing.generations import CURRENT_MANIFEST, read_manifest
+from indexing.sharding import read_shard_manifest
+
+logger = logging.getLogger(__name__)
+
+# How often to look for a newly published index generation
+INDEX_POLL_INTERVAL = float(os.environ.get("INDEX_POLL_INTERVAL", "10"))
+# How long a replaced generation stays open for requests still using it
+INDEX_RETIRE_GRACE = float(os.environ.get("INDEX_RETIRE_GRACE", "60"))
+# Queries run against a generation before it takes traffic ("|"-separated, empty disables)
+WARMUP_QUERIES = [q for q in os.environ.get(
+    "WARMUP_QUERIES", "canine vaccination schedule|equine colic treatment|feline chronic kidney disease"
+).split("|") if q.strip()]
+
+class IndexGeneration:
+    """
+    Index paths, Weaviate class names and open searchers of one index generation.
+
+    Searchers are opened once and shared by all requests served from the
+    generation, instead of being opened per query. Requests hold the
+    generation while they use it (see in_use), so a retired generation is
+    only closed once the last of them has finished.
+
+    Args:
+        manifest: Generation manifest (see indexing.generations)
+    """
+
+    def __init__(self, manifest: Dict[str, Any]):
+        self.manifest = manifest
+        self.name = manifest.get("generation", "default")
+        self._resources: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._users = 0
+        self._retired = False
+        self._closed = False
+
+    @classmethod
+    def from_environment(cls) -> "IndexGeneration":
+        """Unversioned indexes at the paths configured in the environment"""
+        return cls({
+            "generation": "default",
+            "bm25_path": os.environ.get("BM25_INDEX_PATH", "/app/indexes/bm25"),
+            "unicoil_path": os.environ.get("UNICOIL_INDEX_PATH", "/app/indexes/unicoil"),
+            "unicoil_native_path": os.environ.get("UNICOIL_NATIVE_INDEX_PATH", "/app/indexes/unicoil_native"),
+            "weaviate_classes": {}
+        })
+
+    def weaviate_class(self, base_class: str) -> str:
+        """Name of this generation's copy of a Weaviate class"""
+        return self.manifest.get("weaviate_classes", {}).get(base_class, base_class)
+
+    def bm25_searcher(self):
+        from pyserini.search.lucene import LuceneSearcher
+        return self._get("bm25", lambda: LuceneSearcher(self.manifest["bm25_path"]))
+
+    def unicoil_searcher(self):
+        from pyserini.search.lucene import LuceneImpactSearcher
+        # Queries are encoded by search.unicoil_search; see search_impact_weights
+        return self._get("unicoil", lambda: LuceneImpactSearcher(self.manifest["unicoil_path"], query_encoder=None))
+
+    def native_index(self):
+        from search.impact_index import ImpactIndex
+        return self._get("unicoil_native", lambda: ImpactIndex.load(self.manifest["unicoil_native_path"]))
+
+    def shard_manifest(self, path_key: str) -> Optional[Dict[str, Any]]:
+        """Shard manifest of one of the generation's indexes, or None if it is unsharded"""
+        return self._get(f"{path_key}_shards", lambda: read_shard_manifest(self.manifest[path_key]) or {}) or None
+
+    def _get(self, name: str, opener: Callable[[], Any]) -> Any:
+        resource = self._resources.get(name)
+        if resource is None:
+            with self._lock:
+                if self._closed:
+                    # Reopening would leak searchers nothing closes again
+                    raise RuntimeError(f"Index generation {self.name} is closed")
+                resource = self._resources.get(name)
+                if resource is None:
+                    resource = opener()
+                    self._resources[name] = resource
+        return resource
+
+    def open(self) -> None:
+        """Open the searchers of the configured engines; raises if an index is missing or broken"""
+        from search.unicoil_search import UNICOIL_ENGINE
+        from search.sharded_search import SHARD_KINDS, open_shards
+        unicoil = ("unicoil_native_path", self.native_index) if UNICOIL_ENGINE == "native" \
+            else ("unicoil_path", self.unicoil_searcher)
+        for path_key, opener in (("bm25_path", self.bm25_searcher), unicoil):
+            shard_manifest = self.shard_manifest(path_key)
+            if shard_manifest is None:
+                opener()
+            else:
+                # Every shard worker opens its shards now, before the generation takes traffic
+                open_shards(SHARD_KINDS[path_key], self.manifest[path_key], shard_manifest)
+
+    def warm(self, queries: List[str] = WARMUP_QUERIES) -> None:
+        """Run queries through every search method so caches and models are loaded"""
+        from search.bm25_search import search_bm25
+        from search.unicoil_search import search_unicoil
+        from search.weaviate_dense_search import search_dense_weaviate
+        from search.weaviate_multivector_search import search_multivector_weaviate
+        with pinned(self):
+            for search_fn in (search_bm25, search_unicoil, search_dense_weaviate, search_multivector_weaviate):
+                for query in queries:
+                    try:
+                        search_fn(query)
+                    except Exception as e:
+                        logger.warning(f"Warm-up of {search_fn.__name__} on generation {self.name} failed: {str(e)}")
+                        break
+
+    @contextmanager
+    def in_use(self):
+        """Hold the generation open while a request uses it"""
+        with self._lock:
+            self._users += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._users -= 1
+                close = self._retired and self._users == 0
+            if close:
+                self.close()
+
+    def retire(self, grace: float) -> None:
+        """Close the generation once grace seconds have passed and no request holds it"""
+        timer = threading.Timer(grace, self._end_grace)
+        timer.daemon = True
+        timer.start()
+
+    def _end_grace(self) -> None:
+        with self._lock:
+            self._retired = True
+            close = self._users == 0
+        if close:
+            self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            resources, self._resources = self._resources, {}
+        for resource in resources.values():
+            if hasattr(resource, "close"):
+                try:
+                    resource.close()
+                except Exception as e:
+                    logger.warning(f"Error closing searcher of generation {self.name}: {str(e)}")
+
+_active: Optional[IndexGeneration] = None
+_active_lock = threading.Lock()
+_pinned = threading.local()
+_watcher = None
+
+def current_generation() -> IndexGeneration:
+    """The generation serving queries on this thread"""
+    global _active
+    generation = getattr(_pinned, "generation", None)
+    if generation is not None:
+        return generation
+    if _active is None:
+        with _active_lock:
+            if _active is None:
+                manifest = read_manifest(CURRENT_MANIFEST)
+                _active = IndexGeneration(manifest) if manifest else IndexGeneration.from_environment()
+    return _active
+
+@contextmanager
+def pinned(generation: IndexGeneration):
+    """Serve queries on the current thread from a given generation (e.g. to warm it), holding it open"""
+    previous = getattr(_pinned, "generation", None)
+    _pinned.generation = generation
+    try:
+        with generation.in_use():
+            yield generation
+    finally:
+        _pinned.generation = previous
+
+def activate(generation: IndexGeneration) -> None:
+    """
+    Swap the serving generation.
+
+    The swap is a single reference assignment, so a request sees either the
+    old or the new generation. The old one is closed once INDEX_RETIRE_GRACE
+    seconds have passed and the requests holding it have finished.
+    """
+    global _active
+    with _active_lock:
+        previous, _active = _active, generation
+    logger.info(f"Serving index generation {generation.name}")
+    if previous is not None and previous is not generation:
+        previous.retire(INDEX_RETIRE_GRACE)
+
+class GenerationWatcher:
+    """
+    Poll the CURRENT manifest and hot-swap to newly published generations.
+
+    A new generation is opened and warmed in the background while the old
+    one keeps serving; if it fails to open, the old one stays active and the
+    swap is retried on the next poll.
+
+    Args:
+        manifest_path: Path of the CURRENT manifest, defaults to CURRENT_MANIFEST
+        interval: Seconds between polls
+    """
+
+    def __init__(self, manifest_path: Optional[str] = None, interval: float = INDEX_POLL_INTERVAL):
+        self.manifest_path = manifest_path or CURRENT_MANIFEST
+        self.interval = interval
+        self._mtime = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="index-generation-watcher", daemon=True)
+
+    def check(self) -> bool:
+        """Swap to the published generation if it changed; returns True on a swap"""
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        manifest = read_manifest(self.manifest_path)
+        if manifest["generation"] == current_generation().name:
+            self._mtime = mtime
+            return False
+        generation = IndexGeneration(manifest)
+        try:
+            generation.open()
+        except Exception as e:
+            logger.error(f"Could not open index generation {generation.name}: {str(e)}")
+            generation.close()
+            return False
+        generation.warm()
+        activate(generation)
+        self._mtime = mtime
+        return True
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Index generation check failed: {str(e)}")
+
+def start_watcher() -> GenerationWatcher:
+    """Load and warm the published generation, then watch for new ones"""
+    global _watcher
+    if _watcher is None:
+        _watcher = GenerationWatcher()
+        if not _watcher.check():
+            # Already serving the published (or unversioned) generation: open
+            # it up front like a swapped-in one, so no query opens an index
+            generation = current_generation()
+            try:
+                generation.open()
+            except Exception as e:
+                logger.error(f"Could not open index generation {generation.name}: {str(e)}")
+            generation.warm()
+        _watcher.start()
+    return _watcher
+
+def stop_watcher() -> None:
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
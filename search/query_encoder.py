@@ -0,0 +1,122 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+# BGE-M3 model for query embedding
+MODEL_NAME = "BAAI/bge-m3"
+
+# Micro-batching settings: how long to wait for more queries and how many to batch
+ENCODE_BATCH_WINDOW_MS = float(os.environ.get("ENCODE_BATCH_WINDOW_MS", "5"))
+ENCODE_MAX_BATCH_SIZE = int(os.environ.get("ENCODE_MAX_BATCH_SIZE", "32"))
+
+model = None
+_batcher = None
+_lock = threading.Lock()
+
+class EncodeBatcher:
+    """
+    Coalesce concurrent encode requests into batched model calls.
+
+    Callers block in encode() while a background thread collects requests
+    arriving within the batching window (up to max_batch_size), runs them
+    through the model in one call and hands each caller its own vector.
+
+    Args:
+        encode_fn: Function encoding a list of texts into a sequence of vectors
+        window_ms: How long to wait for more requests after the first one
+        max_batch_size: Maximum number of texts per model call
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], Sequence], window_ms: float = ENCODE_BATCH_WINDOW_MS,
+                 max_batch_size: int = ENCODE_MAX_BATCH_SIZE):
+        self.encode_fn = encode_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="encode-batcher", daemon=True)
+        self._thread.start()
+
+    def encode(self, text: str):
+        """Encode one text, sharing a model call with concurrent requests"""
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first: tuple) -> List[tuple]:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            try:
+                vectors = self.encode_fn([text for text, _ in batch])
+                if len(vectors) != len(batch):
+                    # zip() would leave the unmatched callers waiting forever
+                    raise ValueError(f"Encoder returned {len(vectors)} vectors for {len(batch)} texts")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+def get_model():
+    global model
+    if model is None:
+        with _lock:
+            if model is None:
+                # Imported lazily so EncodeBatcher can be used with stand-in models
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(MODEL_NAME)
+    return model
+
+def get_batcher() -> EncodeBatcher:
+    """Return the shared query encode batcher"""
+    global _batcher
+    if _batcher is None:
+        with _lock:
+            if _batcher is None:
+                _batcher = EncodeBatcher(
+                    lambda texts: get_model().encode(texts, batch_size=len(texts)),
+                    ENCODE_BATCH_WINDOW_MS,
+                    ENCODE_MAX_BATCH_SIZE
+                )
+    return _batcher
+
+def encode_query(query: str) -> List[float]:
+    """
+    Embed a query with BGE-M3, batched with concurrent queries.
+
+    Args:
+        query: The search query string
+
+    Returns:
+        Dense query vector
+    """
+    return get_batcher().encode(query).tolist()
@@ -0,0 +1,209 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+import logging
+
+from search.index_registry import current_generation
+
+logger = logging.getLogger(__name__)
+
+# Cross-encoder used to rerank retrieved candidates on CPU
+RERANK_MODEL = os.environ.get("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# Default budgets: candidates considered and wall-clock time spent scoring them
+RERANK_MAX_CANDIDATES = int(os.environ.get("RERANK_MAX_CANDIDATES", "50"))
+RERANK_BUDGET_MS = float(os.environ.get("RERANK_BUDGET_MS", "200"))
+# Upper bound on a request's candidate budget; retrieval over-fetches a multiple of it
+RERANK_CANDIDATES_LIMIT = int(os.environ.get("RERANK_CANDIDATES_LIMIT", "200"))
+# Pairs per cross-encoder call
+RERANK_BATCH_SIZE = int(os.environ.get("RERANK_BATCH_SIZE", "16"))
+# Pairs in the first call, while the cost per pair is still unknown
+RERANK_PROBE_BATCH = int(os.environ.get("RERANK_PROBE_BATCH", "2"))
+# Passages are cut to this many characters before tokenization, and pairs to this many tokens
+RERANK_PASSAGE_CHARS = int(os.environ.get("RERANK_PASSAGE_CHARS", "1500"))
+RERANK_MAX_LENGTH = int(os.environ.get("RERANK_MAX_LENGTH", "256"))
+# Stop once the top-k has not changed for this many batches
+RERANK_STABLE_BATCHES = int(os.environ.get("RERANK_STABLE_BATCHES", "2"))
+# (query, doc id) scores kept in memory
+RERANK_CACHE_SIZE = int(os.environ.get("RERANK_CACHE_SIZE", "20000"))
+
+_reranker = None
+_lock = threading.Lock()
+
+def truncate_passage(text: str, max_chars: int = RERANK_PASSAGE_CHARS) -> str:
+    """Cut a passage at the last word boundary within max_chars"""
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
+
+class ScoreCache:
+    """Thread-safe LRU cache of cross-encoder scores"""
+
+    def __init__(self, max_size: int = RERANK_CACHE_SIZE):
+        self.max_size = max_size
+        self._scores: "OrderedDict[Tuple, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+            return score
+
+    def put(self, key: Tuple, score: float) -> None:
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_size:
+                self._scores.popitem(last=False)
+
+class Reranker:
+    """
+    Rerank retrieved candidates with a cross-encoder under a latency budget.
+
+    Candidates are scored in retrieval order, in batches. Each batch is sized
+    to fit the remaining time budget, using a running estimate of the cost
+    per pair; until there is one, a small probe batch measures it. Scoring
+    stops when the candidate budget is used up, when not
+    even one more pair fits the time budget, or when the top-k has been
+    stable for RERANK_STABLE_BATCHES batches. Scored candidates are ranked
+    by cross-encoder score, followed by unscored ones in retrieval order.
+
+    Args:
+        model: Object with a CrossEncoder-style predict(pairs, batch_size) method
+        batch_size: Pairs per model call
+        stable_batches: Batches without a top-k change before stopping early
+        cache: Score cache, shared across requests
+    """
+
+    def __init__(self, model, batch_size: int = RERANK_BATCH_SIZE, stable_batches: int = RERANK_STABLE_BATCHES,
+                 cache: Optional[ScoreCache] = None):
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.stable_batches = stable_batches
+        self.cache = cache if cache is not None else ScoreCache()
+        # Moving average of the model's cost per pair, shared across requests
+        self.ms_per_pair: Optional[float] = None
+        self._estimate_lock = threading.Lock()
+
+    def rerank(self, query: str, results: List[Dict[str, Any]], k: int,
+               max_candidates: int = RERANK_MAX_CANDIDATES, budget_ms: float = RERANK_BUDGET_MS,
+               namespace: str = "") -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Rerank search results.
+
+        Args:
+            query: The search query string
+            results: Search results in retrieval order
+            k: Number of results to return
+            max_candidates: Maximum number of candidates to score
+            budget_ms: Time budget for scoring
+            namespace: Extra cache key part, e.g. the index generation
+
+        Returns:
+            Tuple of (top k results with a rerank_score where scored, stats)
+        """
+        start = time.perf_counter()
+        candidates = results[:max_candidates]
+        scores: Dict[int, float] = {}
+        pending = []
+        # Results aggregated to their document carry the scored passage's id as passage_id
+        keys = [(namespace, query, result.get("passage_id", result["id"])) for result in candidates]
+        for i, key in enumerate(keys):
+            score = self.cache.get(key)
+            if score is None:
+                pending.append(i)
+            else:
+                scores[i] = score
+        cache_hits = len(scores)
+
+        stop_reason = "exhausted"
+        top_k, stable, batches = None, 0, 0
+        while pending:
+            # Only take as many pairs as are expected to fit in the remaining budget
+            remaining_ms = budget_ms - (time.perf_counter() - start) * 1000.0
+            ms_per_pair = self.ms_per_pair
+            if ms_per_pair:
+                size = min(self.batch_size, int(remaining_ms / ms_per_pair))
+            else:
+                # Cold reranker: probe the cost with a few pairs instead of a full batch
+                size = min(self.batch_size, max(1, RERANK_PROBE_BATCH)) if remaining_ms > 0 else 0
+            if size < 1:
+                stop_reason = "budget"
+                break
+            batch, pending = pending[:size], pending[size:]
+            pairs = [(query, truncate_passage(candidates[i].get("contents", ""))) for i in batch]
+            batch_start = time.perf_counter()
+            batch_scores = self.model.predict(pairs, batch_size=len(pairs))
+            self._observe((time.perf_counter() - batch_start) * 1000.0 / len(pairs))
+            for i, score in zip(batch, batch_scores):
+                scores[i] = float(score)
+                self.cache.put(keys[i], scores[i])
+            batches += 1
+
+            new_top_k = sorted(scores, key=scores.get, reverse=True)[:k]
+            stable = stable + 1 if new_top_k == top_k else 0
+            top_k = new_top_k
+            if pending and self.stable_batches and stable >= self.stable_batches:
+                stop_reason = "stable"
+                break
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        ranked += [i for i in range(len(candidates)) if i not in scores]
+        reranked = [dict(candidates[i], rerank_score=scores[i]) if i in scores else candidates[i]
+                    for i in ranked[:k]]
+        stats = {
+            "candidates": len(candidates),
+            "scored": len(scores),
+            "cache_hits": cache_hits,
+            "batches": batches,
+            "stop_reason": stop_reason,
+            "elapsed_ms": (time.perf_counter() - start) * 1000.0
+        }
+        return reranked, stats
+
+    def _observe(self, ms_per_pair: float) -> None:
+        # Requests rerank concurrently on the API's thread pool
+        with self._estimate_lock:
+            if self.ms_per_pair is None:
+                self.ms_per_pair = ms_per_pair
+            else:
+                self.ms_per_pair = 0.8 * self.ms_per_pair + 0.2 * ms_per_pair
+
+def get_reranker() -> Reranker:
+    """Return the shared reranker, loading the cross-encoder on first use"""
+    global _reranker
+    if _reranker is None:
+        with _lock:
+            if _reranker is None:
+                from sentence_transformers import CrossEncoder
+                _reranker = Reranker(CrossEncoder(RERANK_MODEL, max_length=RERANK_MAX_LENGTH, device="cpu"))
+    return _reranker
+
+def rerank_results(query: str, results: List[Dict[str, Any]], k: int,
+                   max_candidates: Optional[int] = None, budget_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Rerank search results with the shared cross-encoder.
+
+    Args:
+        query: The search query string
+        results: Search results in retrieval order
+        k: Number of results to return
+        max_candidates: Candidate budget, defaults to RERANK_MAX_CANDIDATES
+        budget_ms: Time budget, defaults to RERANK_BUDGET_MS
+
+    Returns:
+        Top k results, reranked
+    """
+    reranked, stats = get_reranker().rerank(
+        query, results, k,
+        max_candidates=max_candidates or RERANK_MAX_CANDIDATES,
+        budget_ms=budget_ms if budget_ms is not None else RERANK_BUDGET_MS,
+        namespace=current_generation().name
+    )
+    logger.debug(f"Reranked {stats['scored']}/{stats['candidates']} candidates in {stats['elapsed_ms']:.1f}ms "
+                 f"({stats['cache_hits']} cached, stopped: {stats['stop_reason']})")
+    return reranked
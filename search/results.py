@@ -0,0 +1,168 @@
+from typing import Callable, Dict, List, Any
+import os
+
+from search.index_registry import current_generation
+
+# Metadata fields returned with every search hit
+RESULT_FIELDS = ["contents", "course_id", "activity_id", "course_name", "activity_name", "strand", "cluster_id",
+                 "parent_id"]
+
+# Fields search requests can filter on, as exact matches, in every backend
+METADATA_FIELDS = ["course_id", "activity_id", "course_name", "activity_name", "strand", "cluster_id", "parent_id"]
+# Fields whose missing value is the document's own id (see format_result)
+_SELF_DEFAULT_FIELDS = {"cluster_id", "parent_id"}
+
+# Weaviate properties selected for every hit: the result fields plus the stored passage id and number
+WEAVIATE_FIELDS = RESULT_FIELDS + ["passage_id", "chunk_index"]
+WEAVIATE_ADDITIONAL = ["id", "distance"]
+
+# How many extra candidates to fetch per result slot when collapsing duplicates
+DEDUP_OVERFETCH = int(os.environ.get("DEDUP_OVERFETCH", "3"))
+# How many passages to fetch per result slot when the index holds passages of longer documents
+PASSAGE_OVERFETCH = int(os.environ.get("PASSAGE_OVERFETCH", "3"))
+# Growth of the candidate list while too few hits remain after aggregating passages and collapsing
+COLLAPSE_DEEPENING = 4
+# Deepest candidate list searched to fill top_k; past it fewer hits may be returned
+COLLAPSE_MAX_DEPTH = int(os.environ.get("COLLAPSE_MAX_DEPTH", "10000"))
+
+def format_result(doc: Dict[str, Any], doc_id: str, score: float) -> Dict[str, Any]:
+    """
+    Build a search hit from a stored document.
+
+    Args:
+        doc: Stored document fields
+        doc_id: Document identifier
+        score: Retrieval score
+
+    Returns:
+        Search result with document content and metadata
+    """
+    result = {"id": doc_id, "score": score}
+    for field in RESULT_FIELDS:
+        result[field] = doc.get(field, "")
+    # Documents indexed before deduplication are their own cluster
+    if not result["cluster_id"]:
+        result["cluster_id"] = doc_id
+    # Documents indexed whole are their own parent
+    if not result["parent_id"]:
+        result["parent_id"] = doc_id
+    return result
+
+def metadata_value(doc: Dict[str, Any], field: str) -> str:
+    """Value of a stored document's metadata field that filters match, as reported in its hit"""
+    value = doc.get(field)
+    if not value and field in _SELF_DEFAULT_FIELDS:
+        value = doc.get("id")
+    return str(value or "")
+
+def format_weaviate_hit(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a search hit from a Weaviate object selected with WEAVIATE_FIELDS and WEAVIATE_ADDITIONAL.
+
+    Args:
+        doc: Weaviate object properties and _additional fields
+
+    Returns:
+        Search result under the stored passage id (the object UUID for
+        objects ingested without one), scored by cosine similarity
+    """
+    additional = doc.get("_additional") or {}
+    distance = additional.get("distance")
+    return format_result(doc, doc.get("passage_id") or additional.get("id", ""),
+                         1.0 - distance if distance is not None else 0.0)
+
+def fetch_size(k: int, collapse: bool) -> int:
+    """Number of candidates to retrieve so that k hits remain after aggregating passages and collapsing"""
+    if current_generation().manifest.get("chunking"):
+        k *= PASSAGE_OVERFETCH
+    return k * DEDUP_OVERFETCH if collapse else k
+
+def retrieve_top_k(search_fn: Callable[[int], List[Dict[str, Any]]], k: int,
+                   collapse: bool) -> List[Dict[str, Any]]:
+    """
+    Top k document hits, deepening the candidate list until k remain.
+
+    fetch_size candidates usually leave k hits, but not when the top hits
+    are passages of few documents or one large near-duplicate cluster. The
+    search is then repeated for a deeper list, until k hits remain, the
+    index runs out or COLLAPSE_MAX_DEPTH candidates were searched.
+
+    Args:
+        search_fn: Returns up to the given number of results, sorted by descending score
+        k: Number of results to return
+        collapse: Return one hit per near-duplicate cluster
+
+    Returns:
+        Up to k results, one per parent document
+    """
+    num_candidates = fetch_size(k, collapse)
+    max_depth = max(num_candidates, COLLAPSE_MAX_DEPTH)
+    while True:
+        results = search_fn(num_candidates)
+        hits = finalize_results(results, k, collapse)
+        if len(hits) >= k or len(results) < num_candidates or num_candidates >= max_depth:
+            return hits
+        num_candidates = min(num_candidates * COLLAPSE_DEEPENING, max_depth)
+
+def aggregate_by_parent(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Keep the best-scoring passage of each parent document (max-passage scoring).
+
+    Args:
+        results: Search results sorted by descending score
+
+    Returns:
+        One result per parent, under the parent's id, with the matching
+        passage's contents and its id as passage_id
+    """
+    aggregated = []
+    seen = set()
+    for result in results:
+        parent_id = result.get("parent_id") or result["id"]
+        if parent_id in seen:
+            continue
+        seen.add(parent_id)
+        if parent_id != result["id"]:
+            result = dict(result, id=parent_id, passage_id=result["id"])
+        aggregated.append(result)
+    return aggregated
+
+def finalize_results(results: List[Dict[str, Any]], k: int, collapse: bool) -> List[Dict[str, Any]]:
+    """
+    Turn retrieved passages into the top k document hits.
+
+    Args:
+        results: Search results sorted by descending score
+        k: Number of results to return
+        collapse: Return one hit per near-duplicate cluster
+
+    Returns:
+        Up to k results, one per parent document
+    """
+    results = aggregate_by_parent(results)
+    return collapse_duplicates(results, k) if collapse else results[:k]
+
+def collapse_duplicates(results: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+    """
+    Keep the best-scoring hit of each near-duplicate cluster.
+
+    Args:
+        results: Search results sorted by descending score
+        k: Number of results to return
+
+    Returns:
+        Up to k results, each listing the ids of the duplicates it absorbed
+    """
+    collapsed = []
+    by_cluster = {}
+    for result in results:
+        cluster_id = result.get("cluster_id") or result["id"]
+        if cluster_id in by_cluster:
+            by_cluster[cluster_id]["duplicate_ids"].append(result["id"])
+            continue
+        if len(collapsed) == k:
+            continue
+        result = dict(result, duplicate_ids=[])
+        by_cluster[cluster_id] = result
+        collapsed.append(result)
+    return collapsed
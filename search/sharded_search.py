@@ -0,0 +1,325 @@
+import os
+import json
+import math
+import heapq
+import threading
+import multiprocessing
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import logging
+
+from indexing.sharding import shard_of
+from search.results import metadata_value
+
+logger = logging.getLogger(__name__)
+
+# Shard worker processes; shard i is pinned to worker i % SHARD_WORKERS (0: one worker per shard)
+SHARD_WORKERS = int(os.environ.get("SHARD_WORKERS", "0"))
+# Pyserini's default BM25 parameters, as used by the unsharded searcher
+BM25_K1 = float(os.environ.get("BM25_K1", "0.9"))
+BM25_B = float(os.environ.get("BM25_B", "0.4"))
+# Growth of the candidate list while too few hits pass the metadata filters
+FILTER_DEEPENING = 4
+# Deepest candidate list searched for filtered hits; narrower filters may return fewer than k
+FILTER_MAX_DEPTH = int(os.environ.get("FILTER_MAX_DEPTH", "10000"))
+# Shard sets a worker keeps open (current and previous generation of each index)
+MAX_OPEN_SHARD_SETS = 4
+
+Hit = Tuple[float, Dict[str, Any]]
+
+# Index manifest keys of sharded indexes and the shard kind opened for them
+SHARD_KINDS = {"bm25_path": "bm25", "unicoil_path": "unicoil", "unicoil_native_path": "unicoil_native"}
+
+_workers: List[ProcessPoolExecutor] = []
+_workers_lock = threading.Lock()
+
+def bm25_idf(doc_freq: int, doc_count: int) -> float:
+    """Lucene's BM25 idf"""
+    return math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+def shard_bm25_params(k1: float, b: float, shard_avgdl: float, global_avgdl: float) -> Tuple[float, float]:
+    """
+    BM25 parameters that make a shard normalize lengths by the global average.
+
+    Lucene divides tf by tf + k1 * (1 - b + b * dl / avgdl) using the shard's
+    own avgdl. Choosing k1' and b' with k1' * (1 - b') = k1 * (1 - b) and
+    k1' * b' / shard_avgdl = k1 * b / global_avgdl gives exactly the
+    normalization of the unsharded index.
+
+    Args:
+        k1: BM25 k1 of the unsharded index
+        b: BM25 b of the unsharded index
+        shard_avgdl: Average document length in the shard
+        global_avgdl: Average document length over all shards
+
+    Returns:
+        Tuple of (k1, b) for the shard searcher
+    """
+    ratio = shard_avgdl / global_avgdl
+    shard_k1 = k1 * (1 - b) + k1 * b * ratio
+    return shard_k1, (k1 * b * ratio / shard_k1) if shard_k1 else b
+
+def _matches(doc: Dict[str, Any], filters: Optional[Dict[str, str]]) -> bool:
+    return not filters or all(metadata_value(doc, field) == value for field, value in filters.items())
+
+def collect_hits(search_fn: Callable[[int], List[Any]], searcher, k: int,
+                 filters: Optional[Dict[str, str]], max_depth: int = FILTER_MAX_DEPTH) -> List[Hit]:
+    """
+    Top-k hits passing the filters, deepening the candidate list until enough pass.
+
+    Each round searches again for a deeper list, but only the documents of
+    hits not seen in earlier rounds are loaded and checked. Deepening stops
+    at max_depth candidates (or k, if larger).
+    """
+    max_depth = max(k, max_depth)
+    num_hits = k
+    # Docid -> stored document, or None if it failed the filters
+    checked: Dict[str, Optional[Dict[str, Any]]] = {}
+    while True:
+        hits = search_fn(num_hits)
+        results = []
+        for hit in hits:
+            if hit.docid not in checked:
+                doc = json.loads(searcher.doc(hit.docid).raw())
+                checked[hit.docid] = doc if _matches(doc, filters) else None
+            doc = checked[hit.docid]
+            if doc is not None:
+                results.append((float(hit.score), doc))
+                if len(results) == k:
+                    return results
+        if len(hits) < num_hits:
+            return results
+        if num_hits >= max_depth:
+            logger.warning(f"Only {len(results)} of the top {num_hits} hits pass filters {filters}; "
+                           f"not deepening past FILTER_MAX_DEPTH")
+            return results
+        num_hits = min(num_hits * FILTER_DEEPENING, max_depth)
+
+def search_impact_weights(searcher, weights: Dict[str, int], k: int) -> List[Any]:
+    """
+    Top-k hits of a LuceneImpactSearcher for pre-encoded query weights.
+
+    LuceneImpactSearcher.search() always encodes its query text, so the
+    weights go to the Java searcher directly, which expects Integer weights.
+    """
+    from pyserini.pyclass import JHashMap, JInt
+    query = JHashMap()
+    for term, weight in weights.items():
+        query.put(term, JInt(int(weight)))
+    return list(searcher.object.search(query, k))
+
+class _Bm25Shard:
+    """Searcher and term statistics of one BM25 shard"""
+
+    def __init__(self, path: str):
+        from pyserini.search.lucene import LuceneSearcher
+        from pyserini.index.lucene import LuceneIndexReader
+        self.searcher = LuceneSearcher(path)
+        self.reader = LuceneIndexReader(path)
+        stats = self.reader.stats()
+        self.doc_count = stats["non_empty_documents"]
+        self.total_terms = stats["total_terms"]
+
+    def doc_freq(self, term: str) -> int:
+        doc_freq, _ = self.reader.get_term_counts(term, analyzer=None)
+        return doc_freq or 0
+
+    def close(self) -> None:
+        self.searcher.close()
+
+def _open_shard(kind: str, path: str):
+    if kind == "bm25":
+        return _Bm25Shard(path)
+    if kind == "unicoil":
+        from pyserini.search.lucene import LuceneImpactSearcher
+        return LuceneImpactSearcher(path, query_encoder=None)
+    if kind == "unicoil_native":
+        from search.impact_index import ImpactIndex
+        return ImpactIndex.load(path)
+    raise ValueError(f"Unknown shard kind: {kind}")
+
+# Shards opened in this worker process by index, least recently used index first
+_open_shards: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+
+def _get_shard(kind: str, index_dir: str, name: str) -> Any:
+    """Open a shard once per worker and keep it open"""
+    key = (kind, index_dir)
+    shards = _open_shards.get(key)
+    if shards is None:
+        shards = _open_shards[key] = {}
+        while len(_open_shards) > MAX_OPEN_SHARD_SETS:
+            _, evicted = _open_shards.popitem(last=False)
+            for shard in evicted.values():
+                if hasattr(shard, "close"):
+                    shard.close()
+    else:
+        _open_shards.move_to_end(key)
+    shard = shards.get(name)
+    if shard is None:
+        shard = shards[name] = _open_shard(kind, os.path.join(index_dir, name))
+    return shard
+
+def open_worker_shards(kind: str, index_dir: str, names: List[str]) -> int:
+    """Open the given shards in this worker; runs in a shard worker"""
+    for name in names:
+        _get_shard(kind, index_dir, name)
+    return len(names)
+
+def bm25_worker_stats(index_dir: str, names: List[str], query: str) -> Dict[str, Any]:
+    """
+    Document count, term count and query term document frequencies of some BM25 shards.
+
+    Runs in a shard worker, over the shards pinned to it.
+    """
+    stats: Dict[str, Any] = {"doc_count": 0, "total_terms": 0, "doc_freqs": Counter()}
+    for name in names:
+        shard = _get_shard("bm25", index_dir, name)
+        stats["doc_count"] += shard.doc_count
+        stats["total_terms"] += shard.total_terms
+        for term in set(shard.reader.analyze(query)):
+            stats["doc_freqs"][term] += shard.doc_freq(term)
+    return stats
+
+def search_bm25_shard(index_dir: str, names: List[str], shard: int, query: str, k: int,
+                      filters: Optional[Dict[str, str]] = None, stats: Optional[Dict[str, Any]] = None,
+                      k1: float = BM25_K1, b: float = BM25_B) -> List[Hit]:
+    """
+    Search one BM25 shard, scoring with statistics of the whole index.
+
+    Runs in a shard worker. Each query term is boosted by the ratio of its
+    global to shard idf, and the shard's k1/b are adjusted to the global
+    average length, so scores equal those of the unsharded index. The
+    global statistics are gathered from all workers beforehand (see
+    global_bm25_stats), since a worker only holds its own shards.
+    """
+    from pyserini.search.lucene import querybuilder
+
+    if stats is None:
+        raise ValueError("Sharded BM25 search needs the global statistics of the index")
+    target = _get_shard("bm25", index_dir, names[shard])
+    doc_count, total_terms = stats["doc_count"], stats["total_terms"]
+
+    # Same bag-of-words query as Pyserini: one clause per term, boosted by its count
+    builder = querybuilder.get_boolean_query_builder()
+    should = querybuilder.JBooleanClauseOccur['should'].value
+    num_clauses = 0
+    for term, count in Counter(target.reader.analyze(query)).items():
+        shard_df = target.doc_freq(term)
+        if shard_df == 0:
+            continue
+        boost = count * bm25_idf(stats["doc_freqs"][term], doc_count) / bm25_idf(shard_df, target.doc_count)
+        term_query = querybuilder.JTermQuery(querybuilder.JTerm("contents", term))
+        builder.add(querybuilder.get_boost_query(term_query, boost), should)
+        num_clauses += 1
+    if num_clauses == 0:
+        return []
+
+    target.searcher.set_bm25(*shard_bm25_params(k1, b, target.total_terms / target.doc_count,
+                                                total_terms / doc_count))
+    lucene_query = builder.build()
+    return collect_hits(lambda n: target.searcher.search(lucene_query, k=n), target.searcher, k, filters)
+
+def search_impact_shard(index_dir: str, names: List[str], shard: int, weights: Dict[str, int], k: int,
+                        filters: Optional[Dict[str, str]] = None, engine: str = "lucene") -> List[Hit]:
+    """
+    Search one uniCOIL shard with pre-encoded query weights.
+
+    Runs in a shard worker. Impact scores do not depend on collection
+    statistics, so shard scores are directly comparable.
+    """
+    if engine == "native":
+        index = _get_shard("unicoil_native", index_dir, names[shard])
+        return [(float(score), index.docs[doc_num]) for doc_num, score in index.search(weights, k=k, filters=filters)]
+    searcher = _get_shard("unicoil", index_dir, names[shard])
+    return collect_hits(lambda n: search_impact_weights(searcher, weights, n), searcher, k, filters)
+
+def shard_worker(shard: int, num_shards: int) -> ProcessPoolExecutor:
+    """
+    The single-process executor a shard is pinned to.
+
+    Each worker only opens the shards pinned to it, so the API holds one
+    copy of every index rather than one per worker.
+    """
+    worker = shard % (SHARD_WORKERS or num_shards)
+    with _workers_lock:
+        while len(_workers) <= worker:
+            # Spawned: the parent may already run a JVM and threads
+            _workers.append(ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")))
+        return _workers[worker]
+
+def shutdown_shard_pool() -> None:
+    with _workers_lock:
+        workers = list(_workers)
+        _workers.clear()
+    for worker in workers:
+        worker.shutdown()
+
+def _pinned_names(shard_manifest: Dict[str, Any], shards: List[int]) -> "OrderedDict[ProcessPoolExecutor, List[str]]":
+    """Shard directory names grouped by the worker they are pinned to"""
+    names = shard_manifest["shards"]
+    groups: "OrderedDict[ProcessPoolExecutor, List[str]]" = OrderedDict()
+    for shard in shards:
+        groups.setdefault(shard_worker(shard, len(names)), []).append(names[shard])
+    return groups
+
+def open_shards(kind: str, index_dir: str, shard_manifest: Dict[str, Any]) -> None:
+    """
+    Open every shard of an index in the worker it is pinned to.
+
+    Called when an index generation is opened, so no shard is first opened
+    by a live query; raises if a shard is missing or broken.
+    """
+    groups = _pinned_names(shard_manifest, list(range(shard_manifest["num_shards"])))
+    futures = [worker.submit(open_worker_shards, kind, index_dir, names) for worker, names in groups.items()]
+    for future in futures:
+        future.result()
+
+def global_bm25_stats(index_dir: str, shard_manifest: Dict[str, Any], query: str) -> Dict[str, Any]:
+    """Statistics of the whole BM25 index for the terms of a query, summed over all shards"""
+    groups = _pinned_names(shard_manifest, list(range(shard_manifest["num_shards"])))
+    futures = [worker.submit(bm25_worker_stats, index_dir, names, query) for worker, names in groups.items()]
+    stats: Dict[str, Any] = {"doc_count": 0, "total_terms": 0, "doc_freqs": Counter()}
+    for future in futures:
+        worker_stats = future.result()
+        stats["doc_count"] += worker_stats["doc_count"]
+        stats["total_terms"] += worker_stats["total_terms"]
+        stats["doc_freqs"].update(worker_stats["doc_freqs"])
+    return stats
+
+def route(shard_manifest: Dict[str, Any], filters: Optional[Dict[str, str]]) -> List[int]:
+    """Shards that can hold matches; a filter on a shard key value selects a single shard"""
+    num_shards, shard_by = shard_manifest["num_shards"], shard_manifest["shard_by"]
+    # Documents without a shard key are placed by id, so an empty value can match in any shard
+    if filters and filters.get(shard_by):
+        return [shard_of({shard_by: filters[shard_by]}, num_shards, shard_by)]
+    return list(range(num_shards))
+
+def scatter_gather(task: Callable, index_dir: str, shard_manifest: Dict[str, Any], query: Any, k: int,
+                   filters: Optional[Dict[str, str]] = None, **options: Any) -> List[Hit]:
+    """
+    Run a shard search task on every relevant shard and merge the top k.
+
+    Args:
+        task: search_bm25_shard or search_impact_shard
+        index_dir: Directory of the sharded index
+        shard_manifest: Its shard manifest
+        query: Query string or encoded query weights
+        k: Number of hits to return
+        filters: Optional dictionary of metadata filters (field:value)
+        **options: Passed through to the task
+
+    Returns:
+        List of (score, document) pairs, best first
+    """
+    names = shard_manifest["shards"]
+    futures = [shard_worker(shard, len(names)).submit(task, index_dir, names, shard, query, k, filters, **options)
+               for shard in route(shard_manifest, filters)]
+    hits = [hit for future in futures for hit in future.result()]
+    return heapq.nlargest(k, hits, key=lambda hit: hit[0])
+
+def search_bm25_sharded(index_dir: str, shard_manifest: Dict[str, Any], query: str, k: int,
+                        filters: Optional[Dict[str, str]] = None) -> List[Hit]:
+    """Gather the global BM25 statistics of a query, then scatter it over the shards"""
+    stats = global_bm25_stats(index_dir, shard_manifest, query)
+    return scatter_gather(search_bm25_shard, index_dir, shard_manifest, query, k, filters, stats=stats)
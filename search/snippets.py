@@ -0,0 +1,124 @@
+import os
+import re
+from collections import Counter, deque
+from typing import Dict, List, Any, Set
+
+# Longest snippet a request may ask for
+SNIPPET_MAX_LENGTH = int(os.environ.get("SNIPPET_MAX_LENGTH", "2000"))
+
+_TOKEN_RE = re.compile(r"\w+")
+_SENTENCE_END_RE = re.compile(r"[.!?]")
+
+# Common words that should not steer snippet selection
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how",
+    "in", "is", "it", "of", "on", "or", "the", "to", "what", "when", "which", "who", "why", "with"
+}
+
+def query_terms(query: str) -> Set[str]:
+    """Lowercased query terms without stopwords"""
+    return {t for t in _TOKEN_RE.findall(query.lower()) if t not in STOPWORDS}
+
+def _starts_sentence(text: str, position: int) -> bool:
+    i = position - 1
+    while i >= 0 and text[i].isspace():
+        i -= 1
+    return i < 0 or text[i] in ".!?"
+
+def extract_snippet(text: str, query: str, max_chars: int = 200) -> str:
+    """
+    Extract the passage of a text that covers the most distinct query terms.
+
+    A window of at most max_chars is slid over word starts; the window
+    containing the most distinct query terms wins. Ties go to windows that
+    start at the sentence containing their first match, then to windows
+    whose matches sit closest to the centre, then to earlier ones. Only ends
+    where text was cut are marked with an ellipsis; a window that reaches
+    the last word keeps the text's closing punctuation, which counts
+    towards max_chars.
+
+    Args:
+        text: Full document contents
+        query: The search query string
+        max_chars: Maximum snippet length (excluding ellipses)
+
+    Returns:
+        Query-biased snippet
+    """
+    if len(text) <= max_chars:
+        return text
+    tokens = list(_TOKEN_RE.finditer(text))
+    if not tokens:
+        return text[:max_chars] + "…"
+
+    # Where each token's window would end; the last one keeps the closing punctuation
+    text_end = len(text.rstrip())
+    ends = [token.end() for token in tokens]
+    ends[-1] = text_end
+
+    terms = query_terms(query)
+    counts: Counter = Counter()
+    # Indexes of the matching tokens inside the current window
+    matches: deque = deque()
+    best_start, best_end, best_score = 0, 0, (-1, False, 0)
+    end = 0
+    for start in range(len(tokens)):
+        window_start = tokens[start].start()
+        # Extend the window while the next token still fits
+        while end < len(tokens) and ends[end] - window_start <= max_chars:
+            term = tokens[end].group().lower()
+            if term in terms:
+                counts[term] += 1
+                matches.append(end)
+            end += 1
+        if matches:
+            first_match, last_match = tokens[matches[0]], tokens[matches[-1]]
+            # The window opens the sentence its first match is in
+            leads_in = (_starts_sentence(text, window_start)
+                        and not _SENTENCE_END_RE.search(text, window_start, first_match.start()))
+            before = first_match.start() - window_start
+            after = ends[end - 1] - last_match.end()
+            score = (len(counts), leads_in, -abs(before - after))
+        else:
+            score = (0, _starts_sentence(text, window_start), 0)
+        if score > best_score and end > start:
+            best_start, best_end, best_score = start, end, score
+        if end == start:
+            # This token alone does not fit; later windows start past it
+            end += 1
+            continue
+        term = tokens[start].group().lower()
+        if term in terms:
+            counts[term] -= 1
+            matches.popleft()
+            if counts[term] == 0:
+                del counts[term]
+        if end == len(tokens) and len(counts) < best_score[0]:
+            # Later windows only shrink, so they cannot cover more terms
+            break
+
+    if best_end <= best_start:
+        # A single token longer than max_chars
+        return text[:max_chars] + "…"
+    snippet_start = tokens[best_start].start()
+    snippet_end = ends[best_end - 1]
+    snippet = text[snippet_start:snippet_end]
+    if snippet_start > 0:
+        snippet = "…" + snippet
+    if snippet_end < text_end:
+        snippet = snippet + "…"
+    return snippet
+
+def apply_snippets(results: List[Dict[str, Any]], query: str, max_chars: int) -> List[Dict[str, Any]]:
+    """
+    Replace the contents of each hit with a query-biased snippet.
+
+    Args:
+        results: Search results
+        query: The search query string
+        max_chars: Maximum snippet length
+
+    Returns:
+        New list of results with shortened contents
+    """
+    return [dict(r, contents=extract_snippet(r.get("contents", ""), query, max_chars)) for r in results]
@@ -1,12 +1,74 @@
-from pyserini.search import LuceneImpactSearcher
 from typing import Dict, List, Optional, Any
 import os
-import json
+import threading
 
-# Path to the uniCOIL index
-INDEX_PATH = os.environ.get("UNICOIL_INDEX_PATH", "/app/indexes/unicoil")
+from search.results import format_result, retrieve_top_k
+from search.index_registry import current_generation
+from search.sharded_search import collect_hits, scatter_gather, search_impact_shard, search_impact_weights
 
-def search_unicoil(query: str, filters: Optional[Dict[str, str]] = None, k: int = 10) -> List[Dict[str, Any]]:
+# "lucene" uses Pyserini's LuceneImpactSearcher, "native" the in-process NumPy engine
+UNICOIL_ENGINE = os.environ.get("UNICOIL_ENGINE", "lucene")
+
+_query_model = None
+_load_lock = threading.Lock()
+
+def get_native_index():
+    """Native impact index of the index generation being served"""
+    return current_generation().native_index()
+
+def encode_query(query: str) -> Dict[str, int]:
+    """
+    Encode a query into quantized uniCOIL term weights.
+    
+    Args:
+        query: The search query string
+        
+    Returns:
+        Dictionary mapping terms to quantized weights
+    """
+    global _query_model
+    from indexing.pyserini_unicoil_index import (
+        IMPACT_QUANTIZATION, load_unicoil_model, encode_unicoil_document, quantize_impacts
+    )
+    if _query_model is None:
+        with _load_lock:
+            if _query_model is None:
+                _query_model = load_unicoil_model()
+    model, tokenizer = _query_model
+    # Quantize like the index being served; older generations did not record their scale
+    scale = current_generation().manifest.get("impact_quantization", IMPACT_QUANTIZATION)
+    return quantize_impacts(encode_unicoil_document(query, model, tokenizer), scale)
+
+def search_unicoil_native(query: str, filters: Optional[Dict[str, str]] = None, k: int = 10) -> List[Dict[str, Any]]:
+    """
+    Search the in-process impact index with MaxScore top-k retrieval.
+    
+    Args:
+        query: The search query string
+        filters: Optional dictionary of metadata filters (field:value)
+        k: Number of results to return
+        
+    Returns:
+        List of search results with document content and metadata
+    """
+    return search_native_weights(encode_query(query), filters, k)
+
+def search_native_weights(weights: Dict[str, int], filters: Optional[Dict[str, str]] = None,
+                          k: int = 10) -> List[Dict[str, Any]]:
+    """Search the in-process impact index with encoded query weights"""
+    generation = current_generation()
+    shard_manifest = generation.shard_manifest("unicoil_native_path")
+    if shard_manifest:
+        hits = scatter_gather(search_impact_shard, generation.manifest["unicoil_native_path"], shard_manifest,
+                              weights, k, filters, engine="native")
+        return [format_result(doc, doc.get("id", ""), score) for score, doc in hits]
+    index = get_native_index()
+    hits = index.search(weights, k=k, filters=filters)
+    return [format_result(index.docs[doc_num], index.docs[doc_num].get("id", str(doc_num)), float(score))
+            for doc_num, score in hits]
+
+def search_unicoil(query: str, filters: Optional[Dict[str, str]] = None, k: int = 10,
+                   collapse: bool = False) -> List[Dict[str, Any]]:
     """
     Search using uniCOIL with optional metadata filtering.
     
@@ -14,40 +76,35 @@ def search_unicoil(query: str, filters: Optional[Dict[str, str]] = None, k: int
         query: The search query string
         filters: Optional dictionary of metadata filters (field:value)
         k: Number of results to return
+        collapse: Return one hit per near-duplicate cluster
         
     Returns:
         List of search results with document content and metadata
     """
-    # Initialize the searcher with impact search
-    searcher = LuceneImpactSearcher(INDEX_PATH)
+    # Encoded once here, however deep the search goes; shard workers only score
+    weights = encode_query(query)
+    if UNICOIL_ENGINE == "native":
+        return retrieve_top_k(lambda num_candidates: search_native_weights(weights, filters, num_candidates),
+                              k, collapse)
     
-    # Construct filter query if filters are provided
-    filter_query = None
-    if filters and len(filters) > 0:
-        filter_clauses = []
-        for field, value in filters.items():
-            filter_clauses.append(f"{field}:{value}")
-        filter_query = " AND ".join(filter_clauses)
+    generation = current_generation()
+    shard_manifest = generation.shard_manifest("unicoil_path")
+    if shard_manifest:
+        def retrieve(num_candidates: int) -> List[Dict[str, Any]]:
+            hits = scatter_gather(search_impact_shard, generation.manifest["unicoil_path"], shard_manifest,
+                                  weights, num_candidates, filters)
+            return [format_result(doc, doc.get("id", ""), score) for score, doc in hits]
+        return retrieve_top_k(retrieve, k, collapse)
     
-    # Perform the search
-    if filter_query:
-        hits = searcher.search(query, k=k, query_generator=None, filter_query=filter_query)
-    else:
-        hits = searcher.search(query, k=k)
+    # Shared impact searcher of the index generation being served; queries are
+    # searched as term weights like in the sharded path
+    searcher = generation.unicoil_searcher()
     
-    # Process results
-    results = []
-    for hit in hits:
-        doc = json.loads(searcher.doc(hit.docid).raw())
-        results.append({
-            "id": doc.get("id", hit.docid),
-            "score": hit.score,
-            "contents": doc.get("contents", ""),
-            "course_id": doc.get("course_id", ""),
-            "activity_id": doc.get("activity_id", ""),
-            "course_name": doc.get("course_name", ""),
-            "activity_name": doc.get("activity_name", ""),
-            "strand": doc.get("strand", "")
-        })
+    # LuceneImpactSearcher takes no filter query, so filters are exact field
+    # matches on the stored documents, deepening the hit list until k pass
+    def retrieve(num_candidates: int) -> List[Dict[str, Any]]:
+        hits = collect_hits(lambda n: search_impact_weights(searcher, weights, n), searcher,
+                            num_candidates, filters)
+        return [format_result(doc, doc.get("id", ""), score) for score, doc in hits]
     
-    return results
\ No newline at end of file
+    return retrieve_top_k(retrieve, k, collapse)
@@ -0,0 +1,101 @@
+import os
+import time
+import threading
+import logging
+from typing import Any, Callable, Optional
+import requests
+import weaviate
+from weaviate.config import ConnectionConfig
+
+logger = logging.getLogger(__name__)
+
+# Weaviate connection settings
+WEAVIATE_HOST = os.environ.get("WEAVIATE_HOST", "weaviate")
+WEAVIATE_PORT = os.environ.get("WEAVIATE_PORT", "8080")
+WEAVIATE_URL = f"http://{WEAVIATE_HOST}:{WEAVIATE_PORT}"
+
+# Connection pool and timeout settings
+WEAVIATE_POOL_CONNECTIONS = int(os.environ.get("WEAVIATE_POOL_CONNECTIONS", "10"))
+WEAVIATE_POOL_MAXSIZE = int(os.environ.get("WEAVIATE_POOL_MAXSIZE", "40"))
+WEAVIATE_CONNECT_TIMEOUT = float(os.environ.get("WEAVIATE_CONNECT_TIMEOUT", "2"))
+WEAVIATE_READ_TIMEOUT = float(os.environ.get("WEAVIATE_READ_TIMEOUT", "20"))
+WEAVIATE_HEALTH_CHECK_INTERVAL = float(os.environ.get("WEAVIATE_HEALTH_CHECK_INTERVAL", "30"))
+
+_client = None
+_last_health_check = 0.0
+_lock = threading.Lock()
+
+def create_client(url: str = WEAVIATE_URL, startup_period: Optional[int] = None) -> weaviate.Client:
+    """
+    Create a Weaviate client backed by a keep-alive connection pool.
+
+    Args:
+        url: Weaviate base URL
+        startup_period: Seconds to wait for Weaviate to become ready, None to not wait
+
+    Returns:
+        Weaviate client
+    """
+    return weaviate.Client(
+        url,
+        timeout_config=(WEAVIATE_CONNECT_TIMEOUT, WEAVIATE_READ_TIMEOUT),
+        # The API skips the blocking readiness wait; health is checked lazily in get_client
+        startup_period=startup_period,
+        additional_config=weaviate.Config(
+            connection_config=ConnectionConfig(
+                session_pool_connections=WEAVIATE_POOL_CONNECTIONS,
+                session_pool_maxsize=WEAVIATE_POOL_MAXSIZE
+            )
+        )
+    )
+
+def get_client() -> weaviate.Client:
+    """
+    Return the shared Weaviate client, creating or replacing it when unhealthy.
+
+    The client is health-checked at most every WEAVIATE_HEALTH_CHECK_INTERVAL
+    seconds, so the check never sits on the hot path of every query.
+    """
+    global _client, _last_health_check
+    now = time.monotonic()
+    if _client is not None and now - _last_health_check < WEAVIATE_HEALTH_CHECK_INTERVAL:
+        return _client
+
+    with _lock:
+        if _client is not None and now - _last_health_check < WEAVIATE_HEALTH_CHECK_INTERVAL:
+            return _client
+        if _client is not None:
+            try:
+                healthy = _client.is_live()
+            except requests.exceptions.RequestException:
+                healthy = False
+            if not healthy:
+                logger.warning("Weaviate health check failed, reconnecting")
+                _client = None
+        if _client is None:
+            _client = create_client()
+        _last_health_check = now
+        return _client
+
+def reset_client() -> None:
+    """Drop the shared client so the next call to get_client reconnects"""
+    global _client
+    with _lock:
+        _client = None
+
+def run_query(query_fn: Callable[[weaviate.Client], Any]) -> Any:
+    """
+    Run a query against the shared client, reconnecting once on connection errors.
+
+    Args:
+        query_fn: Function taking the client and returning the query result
+
+    Returns:
+        Result of query_fn
+    """
+    try:
+        return query_fn(get_client())
+    except requests.exceptions.ConnectionError:
+        logger.warning("Lost connection to Weaviate, retrying with a new client")
+        reset_client()
+        return query_fn(get_client())
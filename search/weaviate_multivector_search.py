@@ -1,24 +1,13 @@
-import weaviate
 from typing import Dict, List, Optional, Any
 import os
-from sentence_transformers import SentenceTransformer
 
-# Weaviate connection settings
-WEAVIATE_HOST = os.environ.get("WEAVIATE_HOST", "weaviate")
-WEAVIATE_PORT = os.environ.get("WEAVIATE_PORT", "8080")
-WEAVIATE_URL = f"http://{WEAVIATE_HOST}:{WEAVIATE_PORT}"
+from search.results import WEAVIATE_FIELDS, WEAVIATE_ADDITIONAL, format_weaviate_hit, retrieve_top_k
+from search.weaviate_client import run_query
+from search.query_encoder import encode_query
+from search.index_registry import current_generation
 
-# BGE-M3 model for query embedding
-MODEL_NAME = "BAAI/bge-m3"
-model = None
-
-def get_model():
-    global model
-    if model is None:
-        model = SentenceTransformer(MODEL_NAME)
-    return model
-
-def search_multivector_weaviate(query: str, filters: Optional[Dict[str, str]] = None, k: int = 10) -> List[Dict[str, Any]]:
+def search_multivector_weaviate(query: str, filters: Optional[Dict[str, str]] = None, k: int = 10,
+                                collapse: bool = False) -> List[Dict[str, Any]]:
     """
     Search using multi-vector BGE-M3 embeddings stored in Weaviate.
     
@@ -26,16 +15,13 @@ def search_multivector_weaviate(query: str, filters: Optional[Dict[str, str]] =
         query: The search query string
         filters: Optional dictionary of metadata filters (field:value)
         k: Number of results to return
+        collapse: Return one hit per near-duplicate cluster
         
     Returns:
         List of search results with document content and metadata
     """
-    # Initialize Weaviate client
-    client = weaviate.Client(WEAVIATE_URL)
-    
-    # Generate query embedding
-    model = get_model()
-    query_vector = model.encode(query).tolist()
+    # Generate query embedding, micro-batched with concurrent requests
+    query_vector = encode_query(query)
     
     # Prepare filter if provided
     where_filter = None
@@ -48,29 +34,29 @@ def search_multivector_weaviate(query: str, filters: Optional[Dict[str, str]] =
                 "valueString": value
             })
     
-    # Perform the search
-    result = client.query.get(
-        "VetDocumentMultiVector",
-        ["id", "contents", "course_id", "activity_id", "course_name", "activity_name", "strand"]
-    ).with_near_vector(
-        {"vector": query_vector}
-    ).with_where(
-        where_filter
-    ).with_limit(k).do()
-    
-    # Process results
-    results = []
-    if result and "data" in result and "Get" in result["data"] and "VetDocumentMultiVector" in result["data"]["Get"]:
-        for doc in result["data"]["Get"]["VetDocumentMultiVector"]:
-            results.append({
-                "id": doc.get("id", ""),
-                "score": doc.get("_additional", {}).get("score", 0.0),
-                "contents": doc.get("contents", ""),
-                "course_id": doc.get("course_id", ""),
-                "activity_id": doc.get("activity_id", ""),
-                "course_name": doc.get("course_name", ""),
-                "activity_name": doc.get("activity_name", ""),
-                "strand": doc.get("strand", "")
-            })
+    # Perform the search on the shared, pooled client
+    class_name = current_generation().weaviate_class("VetDocumentMultiVector")
+    def retrieve(num_candidates: int) -> List[Dict[str, Any]]:
+        def build_query(client):
+            # The object UUID and distance are only returned as _additional fields
+            query_builder = client.query.get(
+                class_name,
+                WEAVIATE_FIELDS
+            ).with_additional(WEAVIATE_ADDITIONAL).with_near_vector(
+                {"vector": query_vector}
+            ).with_limit(num_candidates)
+            # The v3 client rejects a None where filter
+            if where_filter:
+                query_builder = query_builder.with_where(where_filter)
+            return query_builder.do()
+        
+        result = run_query(build_query)
+        
+        # Process results
+        results = []
+        if result and "data" in result and "Get" in result["data"] and class_name in result["data"]["Get"]:
+            for doc in result["data"]["Get"][class_name]:
+                results.append(format_weaviate_hit(doc))
+        return results
     
-    return results
\ No newline at end of file
+    return retrieve_top_k(retrieve, k, collapse)
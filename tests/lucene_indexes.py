@@ -0,0 +1,34 @@
+import os
+import json
+
+import pytest
+
+def require_lucene():
+    """Skip the calling test module unless Pyserini can start its JVM"""
+    try:
+        from pyserini.search.lucene import LuceneSearcher  # noqa: F401
+    except Exception as e:  # ImportError, or a JVM that fails to start
+        pytest.skip(f"Pyserini is not usable here: {e}", allow_module_level=True)
+
+def build_index(documents, input_dir, index_dir, impact=False):
+    """
+    Index documents with Anserini's IndexCollection, storing raw documents.
+
+    Args:
+        documents: Document dictionaries; with impact=True each carries an integer {term: impact} vector
+        input_dir: Directory the collection is written to
+        index_dir: Index directory
+        impact: Build an impact index (JsonVectorCollection) instead of a BM25 index
+    """
+    from pyserini.pyclass import autoclass
+    os.makedirs(input_dir, exist_ok=True)
+    with open(os.path.join(input_dir, "docs.jsonl"), 'w') as f:
+        for doc in documents:
+            f.write(json.dumps(doc) + "\n")
+    args = ["-input", input_dir, "-index", index_dir, "-threads", "1", "-storeRaw",
+            "-generator", "DefaultLuceneDocumentGenerator"]
+    if impact:
+        args += ["-collection", "JsonVectorCollection", "-impact", "-pretokenized"]
+    else:
+        args += ["-collection", "JsonCollection", "-storePositions", "-storeDocvectors"]
+    autoclass("io.anserini.index.IndexCollection").main(args)
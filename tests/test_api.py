@@ -0,0 +1,65 @@
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+import api.main as api_main
+from api.main import SearchRequest, app
+from search.results import METADATA_FIELDS
+
+def test_filters_on_metadata_fields_are_accepted():
+    request = SearchRequest(query="dog", filters={"strand": "Surgery", "course_id": "VET101"})
+    assert request.filters == {"strand": "Surgery", "course_id": "VET101"}
+
+def test_unknown_filter_fields_are_rejected():
+    with pytest.raises(ValidationError):
+        SearchRequest(query="dog", filters={"nonexistent": "x"})
+
+def test_unknown_filter_fields_are_client_errors():
+    # Not entered as a context manager, so no indexes are opened
+    response = TestClient(app).post("/search/unicoil", json={"query": "dog", "filters": {"nonexistent": "x"}})
+    assert response.status_code == 422
+    assert "nonexistent" in response.text
+
+@pytest.mark.parametrize("options", [{"rerank_candidates": 0}, {"rerank_candidates": -5},
+                                     {"rerank_budget_ms": 0}, {"rerank_budget_ms": -1.5}])
+def test_non_positive_rerank_budgets_are_rejected(options):
+    with pytest.raises(ValidationError):
+        SearchRequest(query="dog", rerank=True, **options)
+    response = TestClient(app).post("/search/bm25", json=dict(options, query="dog", rerank=True))
+    assert response.status_code == 422
+
+def test_rerank_budgets_default_to_the_server_settings():
+    request = SearchRequest(query="dog", rerank=True)
+    assert request.rerank_candidates is None and request.rerank_budget_ms is None
+    request = SearchRequest(query="dog", rerank=True, rerank_candidates=50, rerank_budget_ms=150.0)
+    assert request.rerank_candidates == 50 and request.rerank_budget_ms == 150.0
+
+@pytest.mark.parametrize("top_k", [0, -1])
+def test_non_positive_top_k_is_rejected(top_k):
+    with pytest.raises(ValidationError):
+        SearchRequest(query="dog", top_k=top_k)
+    response = TestClient(app).post("/search/all", json={"query": "dog", "top_k": top_k})
+    assert response.status_code == 422
+
+def test_search_endpoints_return_results_unvalidated(monkeypatch):
+    results = [{"id": "d1", "score": 1.5, "extra": {"nested": [1, 2]}}]
+    monkeypatch.setattr(api_main, "run_search", lambda search_fn, request, generation: results)
+    monkeypatch.setattr(api_main, "current_generation", lambda: api_main.IndexGeneration({"generation": "G1"}))
+    client = TestClient(app)
+    response = client.post("/search/dense", json={"query": "dog", "top_k": 1})
+    assert response.status_code == 200
+    assert response.json()["results"] == results
+    assert response.json()["metadata"]["index_generation"] == "G1"
+    response = client.post("/search/all", json={"query": "dog", "top_k": 1})
+    assert response.json()["multi_vector_results"] == results
+
+@pytest.mark.parametrize("endpoint", ["/search/bm25", "/search/unicoil", "/search/dense", "/search/multivector"])
+def test_streaming_is_rejected_by_single_method_endpoints(endpoint, monkeypatch):
+    monkeypatch.setattr(api_main, "run_search", lambda search_fn, request, generation: [])
+    response = TestClient(app).post(endpoint, json={"query": "dog", "stream": True})
+    assert response.status_code == 422
+    assert "/search/all" in response.json()["detail"]
+
+def test_parent_documents_are_filterable():
+    assert "parent_id" in METADATA_FIELDS
+    assert SearchRequest(query="dog", filters={"parent_id": "doc1"}).filters == {"parent_id": "doc1"}
@@ -0,0 +1,47 @@
+from indexing.chunking import chunk_document, passage_id, passage_windows, token_spans
+
+def document(word_count, **fields):
+    return dict({"id": "doc", "contents": " ".join(f"w{i}" for i in range(word_count)),
+                 "course_id": "c1", "cluster_id": "doc", "vector": {"w0": 1}}, **fields)
+
+def test_windows_cover_the_text_with_overlap():
+    spans = token_spans(" ".join(f"w{i}" for i in range(25)))
+    windows = passage_windows(spans, size=10, overlap=3)
+    assert windows == [(0, 10), (7, 17), (14, 24), (21, 25)]
+
+def test_windows_do_not_split_words():
+    # Subword tokens: (start, end, starts_word); words are 3, 2, 3 and 2 tokens long
+    starts = [True, False, False, True, False, True, False, False, True, False]
+    spans = [(i, i + 1, s) for i, s in enumerate(starts)]
+    for first, end in passage_windows(spans, size=4, overlap=1):
+        assert spans[first][2]
+        assert end == len(spans) or spans[end][2]
+
+def test_short_documents_keep_their_id():
+    passages = chunk_document(document(5), size=10, overlap=2)
+    assert len(passages) == 1
+    assert passages[0]["id"] == "doc" and passages[0]["parent_id"] == "doc"
+    assert passages[0]["chunk_index"] == 0
+    assert passages[0]["vector"] == {"w0": 1}
+
+def test_long_documents_are_split_into_passages():
+    passages = chunk_document(document(25), size=10, overlap=3)
+    assert [p["id"] for p in passages] == [passage_id("doc", i) for i in range(4)]
+    assert [p["id"] for p in passages] == ["doc#0", "doc#1", "doc#2", "doc#3"]
+    assert [p["chunk_index"] for p in passages] == [0, 1, 2, 3]
+    assert all(p["parent_id"] == "doc" and p["course_id"] == "c1" for p in passages)
+    # Fields derived from the whole document must be recomputed per passage
+    assert all("cluster_id" not in p and "vector" not in p for p in passages)
+    assert passages[0]["contents"].split() == [f"w{i}" for i in range(10)]
+    assert passages[1]["contents"].split()[0] == "w7"
+    assert passages[-1]["contents"].split()[-1] == "w24"
+
+def test_chunking_passages_again_changes_nothing():
+    passages = chunk_document(document(25), size=10, overlap=3)
+    assert [chunk_document(p, size=10, overlap=3) for p in passages] == [[p] for p in passages]
+
+def test_documents_without_an_id_use_their_position():
+    doc = document(25)
+    del doc["id"]
+    passages = chunk_document(doc, position=7, size=10, overlap=3)
+    assert passages[0]["id"] == "doc7#0" and passages[0]["parent_id"] == "doc7"
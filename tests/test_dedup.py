@@ -0,0 +1,98 @@
+import search.results as results_module
+from indexing.dedup import assign_clusters, find_near_duplicates, group_by_cluster
+from search.index_registry import IndexGeneration, pinned
+from search.results import retrieve_top_k
+
+# Settings for the chain test: 4-row bands make pairs above ~0.6 Jaccard near-certain LSH candidates
+THRESHOLD = 0.63
+BANDS = 32
+
+def words(prefix, count):
+    return [f"{prefix}{i}" for i in range(count)]
+
+def replace(tokens, start, end, prefix):
+    return tokens[:start] + words(prefix, end - start) + tokens[end:]
+
+def test_exact_and_near_duplicates_join_the_first_document():
+    base = words("w", 200)
+    documents = [
+        {"id": "a", "contents": " ".join(base)},
+        {"id": "b", "contents": " ".join(base)},
+        {"id": "c", "contents": " ".join(replace(base, 199, 200, "x"))},
+        {"id": "d", "contents": " ".join(words("other", 200))},
+    ]
+    assert find_near_duplicates(documents) == {"a": "a", "b": "a", "c": "a", "d": "d"}
+
+def test_chains_of_edits_are_not_merged():
+    # Jaccard(a, b) ~ 0.74 and (b, c) ~ 0.72, but (a, c) ~ 0.53
+    a = words("w", 400)
+    b = replace(a, 340, 400, "x")
+    c = replace(b, 280, 340, "y")
+    documents = [{"id": name, "contents": " ".join(tokens)} for name, tokens in (("a", a), ("b", b), ("c", c))]
+    clusters = find_near_duplicates(documents, threshold=THRESHOLD, bands=BANDS)
+    assert clusters["b"] == "a"
+    assert clusters["c"] == "c"
+
+def test_empty_documents_stay_alone():
+    documents = [{"id": "a", "contents": ""}, {"id": "b", "contents": "..."}]
+    assert find_near_duplicates(documents) == {"a": "a", "b": "b"}
+
+def test_assign_and_group_clusters():
+    text = " ".join(words("w", 50))
+    documents = [
+        {"id": "a", "contents": text},
+        {"id": "b", "contents": " ".join(words("other", 50))},
+        {"id": "c", "contents": text},
+    ]
+    assert assign_clusters(documents) == 2
+    assert [doc["cluster_id"] for doc in documents] == ["a", "b", "a"]
+    groups = group_by_cluster(documents)
+    assert list(groups) == ["a", "b"]
+    assert [doc["id"] for doc in groups["a"]] == ["a", "c"]
+
+def ranked_hits(clusters):
+    """Hits sorted by descending score, in the given clusters"""
+    return [{"id": f"doc{i}", "score": float(len(clusters) - i), "cluster_id": cluster, "parent_id": f"doc{i}"}
+            for i, cluster in enumerate(clusters)]
+
+def test_collapsing_deepens_until_k_clusters_remain():
+    # The top 40 hits are one large near-duplicate cluster
+    hits = ranked_hits(["big"] * 40 + [f"c{i}" for i in range(10)])
+    depths = []
+
+    def search_fn(num_candidates):
+        depths.append(num_candidates)
+        return hits[:num_candidates]
+
+    with pinned(IndexGeneration({"generation": "G1"})):
+        results = retrieve_top_k(search_fn, 5, collapse=True)
+    assert [r["cluster_id"] for r in results] == ["big", "c0", "c1", "c2", "c3"]
+    assert len(results[0]["duplicate_ids"]) == 39
+    assert depths == [15, 60]
+
+def test_deepening_stops_when_the_index_runs_out():
+    hits = ranked_hits(["big"] * 20 + ["c0"])
+    depths = []
+
+    def search_fn(num_candidates):
+        depths.append(num_candidates)
+        return hits[:num_candidates]
+
+    with pinned(IndexGeneration({"generation": "G1"})):
+        results = retrieve_top_k(search_fn, 5, collapse=True)
+    assert [r["cluster_id"] for r in results] == ["big", "c0"]
+    assert depths == [15, 60]
+
+def test_deepening_stops_at_the_maximum_depth(monkeypatch):
+    monkeypatch.setattr(results_module, "COLLAPSE_MAX_DEPTH", 30)
+    hits = ranked_hits(["big"] * 100 + ["c0"])
+    depths = []
+
+    def search_fn(num_candidates):
+        depths.append(num_candidates)
+        return hits[:num_candidates]
+
+    with pinned(IndexGeneration({"generation": "G1"})):
+        results = retrieve_top_k(search_fn, 5, collapse=True)
+    assert len(results) == 1
+    assert depths == [15, 30]
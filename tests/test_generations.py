@@ -0,0 +1,179 @@
+import os
+import time
+import threading
+
+import pytest
+
+import indexing.generations as generations
+import search.index_registry as index_registry
+from search.index_registry import GenerationWatcher, IndexGeneration, activate, current_generation, pinned
+
+@pytest.fixture(autouse=True)
+def index_root(tmp_path, monkeypatch):
+    """Generations under a temporary INDEX_ROOT, with no generation active yet"""
+    monkeypatch.setattr(generations, "GENERATIONS_DIR", str(tmp_path / "generations"))
+    monkeypatch.setattr(generations, "CURRENT_MANIFEST", str(tmp_path / "CURRENT.json"))
+    monkeypatch.setattr(generations, "BUILDING_MANIFEST", str(tmp_path / "BUILDING.json"))
+    monkeypatch.setattr(index_registry, "CURRENT_MANIFEST", str(tmp_path / "CURRENT.json"))
+    monkeypatch.setattr(index_registry, "_active", None)
+    monkeypatch.setattr(index_registry, "_watcher", None)
+    return tmp_path
+
+@pytest.fixture
+def lifecycle(monkeypatch):
+    """Record opened, warmed and closed generations instead of touching indexes"""
+    events = []
+    failing = set()
+
+    def open_generation(generation):
+        if generation.name in failing:
+            raise RuntimeError("missing index")
+        events.append(("open", generation.name))
+
+    monkeypatch.setattr(IndexGeneration, "open", open_generation)
+    monkeypatch.setattr(IndexGeneration, "warm", lambda generation: events.append(("warm", generation.name)))
+    monkeypatch.setattr(IndexGeneration, "close", lambda generation: events.append(("close", generation.name)))
+    return events, failing
+
+def publish(name):
+    manifest = generations.new_generation(name)
+    os.makedirs(manifest["root"], exist_ok=True)
+    generations.publish(manifest)
+    return manifest
+
+def test_build_resumes_until_published(index_root):
+    manifest = generations.start_build()
+    assert os.path.isdir(manifest["root"])
+    assert generations.read_manifest(generations.BUILDING_MANIFEST) == manifest
+    assert generations.start_build() == manifest
+
+    generations.publish(manifest)
+    current = generations.read_manifest(generations.CURRENT_MANIFEST)
+    assert current["generation"] == manifest["generation"] and "published_at" in current
+    assert not os.path.exists(generations.BUILDING_MANIFEST)
+    assert not os.path.exists(generations.CURRENT_MANIFEST + ".tmp")
+
+def test_retiring_keeps_the_previous_generation():
+    class Schema:
+        def __init__(self):
+            self.deleted = []
+
+        def exists(self, class_name):
+            return True
+
+        def delete_class(self, class_name):
+            self.deleted.append(class_name)
+
+    class Client:
+        schema = Schema()
+
+    for name in ("G1", "G2"):
+        publish(name)
+    publish("G3")
+    assert generations.retire_old_generations(Client, keep=2) == ["G1"]
+    assert generations.list_generations() == ["G2", "G3"]
+    assert Client.schema.deleted == ["VetDocument_G1", "VetDocumentMultiVector_G1"]
+
+def test_current_and_building_generations_are_never_retired():
+    for name in ("G1", "G2", "G3"):
+        os.makedirs(generations.new_generation(name)["root"])
+    generations.write_manifest(generations.CURRENT_MANIFEST, generations.new_generation("G1"))
+    generations.write_manifest(generations.BUILDING_MANIFEST, generations.new_generation("G2"))
+    assert generations.retire_old_generations(keep=1) == []
+    assert generations.list_generations() == ["G1", "G2", "G3"]
+
+def test_watcher_swaps_to_a_published_generation(lifecycle):
+    events, _ = lifecycle
+    publish("G1")
+    watcher = GenerationWatcher()
+    assert not watcher.check()
+    assert current_generation().name == "G1"
+
+    publish("G2")
+    assert watcher.check()
+    assert current_generation().name == "G2"
+    # Opened and warmed before it took traffic
+    assert events[:2] == [("open", "G2"), ("warm", "G2")]
+    assert not watcher.check()
+
+def test_watcher_keeps_serving_when_a_generation_fails_to_open(lifecycle):
+    events, failing = lifecycle
+    publish("G1")
+    watcher = GenerationWatcher()
+    watcher.check()
+
+    failing.add("G2")
+    publish("G2")
+    assert not watcher.check()
+    assert current_generation().name == "G1"
+    assert ("close", "G2") in events
+
+    # Retried on the next poll
+    failing.clear()
+    assert watcher.check()
+    assert current_generation().name == "G2"
+
+def test_start_watcher_opens_and_warms_the_initial_generation(lifecycle):
+    events, _ = lifecycle
+    publish("G1")
+    index_registry.start_watcher()
+    try:
+        assert events == [("open", "G1"), ("warm", "G1")]
+        assert current_generation().name == "G1"
+    finally:
+        index_registry.stop_watcher()
+
+def test_in_flight_requests_stay_on_their_generation(lifecycle, monkeypatch):
+    monkeypatch.setattr(index_registry, "INDEX_RETIRE_GRACE", 60)
+    old, new = IndexGeneration({"generation": "G1"}), IndexGeneration({"generation": "G2"})
+    activate(old)
+    started, swapped = threading.Event(), threading.Event()
+    seen = []
+
+    def request():
+        with pinned(current_generation()):
+            started.set()
+            swapped.wait()
+            seen.append(current_generation().name)
+
+    thread = threading.Thread(target=request)
+    thread.start()
+    started.wait()
+    activate(new)
+    swapped.set()
+    thread.join()
+    assert seen == ["G1"]
+    assert current_generation().name == "G2"
+
+def test_replaced_generation_is_closed_after_the_grace_period(lifecycle, monkeypatch):
+    events, _ = lifecycle
+    monkeypatch.setattr(index_registry, "INDEX_RETIRE_GRACE", 0.2)
+    activate(IndexGeneration({"generation": "G1"}))
+    activate(IndexGeneration({"generation": "G2"}))
+    assert ("close", "G1") not in events
+    deadline = time.monotonic() + 5
+    while ("close", "G1") not in events and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert ("close", "G1") in events
+    assert ("close", "G2") not in events
+
+def test_retired_generation_stays_open_until_its_requests_finish(lifecycle, monkeypatch):
+    events, _ = lifecycle
+    monkeypatch.setattr(index_registry, "INDEX_RETIRE_GRACE", 0.05)
+    old = IndexGeneration({"generation": "G1"})
+    activate(old)
+    with pinned(current_generation()):
+        activate(IndexGeneration({"generation": "G2"}))
+        time.sleep(0.3)
+        # Past the grace period, but a request still holds it
+        assert ("close", "G1") not in events
+    assert ("close", "G1") in events
+
+def test_closed_generation_does_not_reopen_searchers():
+    generation = IndexGeneration({"generation": "G1"})
+    opened = []
+    assert generation._get("probe", lambda: opened.append(1) or "searcher") == "searcher"
+    generation.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        generation._get("probe", lambda: opened.append(1) or "searcher")
+    assert opened == [1]
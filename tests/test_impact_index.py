@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from search.impact_index import BLOCK_SIZE, ImpactIndex, decode_varints, encode_varints
+from search.sharded_search import search_impact_weights
+from tests.lucene_indexes import build_index, require_lucene
+
+VOCAB = [f"t{i}" for i in range(60)]
+STRANDS = ["number", "algebra", "geometry"]
+
+def random_documents(count, max_impact, seed=0):
+    rng = np.random.default_rng(seed)
+    # Skewed term frequencies, so some posting lists are long and others short
+    probabilities = 1.0 / np.arange(1, len(VOCAB) + 1)
+    probabilities /= probabilities.sum()
+    documents = []
+    for i in range(count):
+        terms = rng.choice(VOCAB, size=rng.integers(1, 20), replace=False, p=probabilities)
+        documents.append({
+            "id": f"doc{i}",
+            "strand": STRANDS[i % len(STRANDS)],
+            "vector": {str(term): int(rng.integers(1, max_impact + 1)) for term in terms},
+        })
+    return documents
+
+def random_queries(count, seed=1):
+    rng = np.random.default_rng(seed)
+    return [{str(term): int(rng.integers(1, 100))
+             for term in rng.choice(VOCAB, size=rng.integers(1, 8), replace=False)}
+            for _ in range(count)]
+
+@pytest.fixture(scope="module")
+def index():
+    return ImpactIndex.from_documents(random_documents(1000, max_impact=255))
+
+@pytest.mark.parametrize("k", [1, 10, 100])
+def test_maxscore_matches_exhaustive_search(index, k):
+    for query in random_queries(50):
+        assert index.search(query, k) == index.exhaustive_search(query, k)
+
+@pytest.mark.parametrize("filters", [{"strand": "algebra"}, {"strand": "missing"}])
+def test_maxscore_matches_exhaustive_search_with_filters(index, filters):
+    for query in random_queries(20):
+        assert index.search(query, 10, filters) == index.exhaustive_search(query, 10, filters)
+
+def test_unknown_terms_and_empty_queries(index):
+    assert index.search({"unknown": 5}, 10) == []
+    assert index.search({}, 10) == []
+    assert index.search({"t0": 5}, 0) == []
+
+def test_impacts_above_uint8_are_kept():
+    index = ImpactIndex.from_documents(random_documents(200, max_impact=1000))
+    assert index.impacts.dtype == np.uint16
+    assert int(index.impacts.max()) > 255
+    for query in random_queries(20):
+        assert index.search(query, 10) == index.exhaustive_search(query, 10)
+
+def test_save_and_load_round_trip(index, tmp_path):
+    index.save(str(tmp_path))
+    loaded = ImpactIndex.load(str(tmp_path))
+    for query in random_queries(10):
+        assert loaded.search(query, 10) == index.search(query, 10)
+    assert loaded.docs == index.docs
+
+def test_varints_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 16383, 16384, 2 ** 21, 2 ** 32 - 1], dtype=np.int64)
+    data, lengths = encode_varints(values)
+    assert lengths.tolist() == [1, 1, 1, 2, 2, 2, 3, 4, 5]
+    assert decode_varints(data).tolist() == values.tolist()
+    assert decode_varints(encode_varints(np.arange(100))[0]).tolist() == list(range(100))
+
+def test_posting_lists_span_several_blocks(index):
+    t = max(index.vocab.values(), key=lambda t: index.offsets[t + 1] - index.offsets[t])
+    assert index.offsets[t + 1] - index.offsets[t] > 2 * BLOCK_SIZE
+    doc_nums, _ = index._postings(t)
+    # Looking up every other posting decodes single blocks, not the whole list
+    hit, impacts = index._lookup(t, doc_nums[::2 * BLOCK_SIZE])
+    assert hit.all()
+    assert impacts.tolist() == index.impacts[index.offsets[t]:index.offsets[t + 1]][::2 * BLOCK_SIZE].tolist()
+    assert not index._lookup(t, np.array([len(index.docs)]))[0].any()
+
+def test_uncompressed_indexes_still_load(index, tmp_path):
+    doc_nums = np.concatenate([index._postings(t)[0] for t in range(len(index.vocab))])
+    np.savez_compressed(tmp_path / "postings.npz", offsets=index.offsets, doc_nums=doc_nums.astype(np.uint16),
+                        impacts=index.impacts)
+    index.save(str(tmp_path / "saved"))
+    for name in ("vocab.json", "docs.jsonl"):
+        (tmp_path / name).write_text((tmp_path / "saved" / name).read_text())
+    loaded = ImpactIndex.load(str(tmp_path))
+    for query in random_queries(10):
+        assert loaded.search(query, 10) == index.search(query, 10)
+
+def test_concurrent_searches_keep_their_own_scores(index):
+    queries = random_queries(40, seed=2)
+    expected = [index.exhaustive_search(query, 10) for query in queries]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(lambda query: index.search(query, 10), queries)) == expected
+
+@pytest.fixture(scope="module")
+def lucene_searcher(tmp_path_factory):
+    require_lucene()
+    from pyserini.search.lucene import LuceneImpactSearcher
+    root = tmp_path_factory.mktemp("lucene")
+    documents = random_documents(1000, max_impact=255)
+    build_index(documents, str(root / "input"), str(root / "index"), impact=True)
+    searcher = LuceneImpactSearcher(str(root / "index"), query_encoder=None)
+    yield searcher
+    searcher.close()
+
+@pytest.mark.parametrize("k", [1, 10, 100])
+def test_rankings_match_lucene(index, lucene_searcher, k):
+    for query in random_queries(50):
+        native = index.search(query, k)
+        lucene = search_impact_weights(lucene_searcher, query, k)
+        assert [hit.score for hit in lucene] == [score for _, score in native]
+        # Tied documents may come in another order, but each has its native score
+        native_scores = {index.docs[doc_num]["id"]: score for doc_num, score in index.exhaustive_search(query, 1000)}
+        assert all(hit.score == native_scores[hit.docid] for hit in lucene)
+
+def test_queries_are_quantized_with_the_scale_of_the_generation(monkeypatch):
+    import indexing.pyserini_unicoil_index as unicoil_index
+    import search.unicoil_search as unicoil_search
+    from search.index_registry import IndexGeneration, pinned
+    monkeypatch.setattr(unicoil_search, "_query_model", ("model", "tokenizer"))
+    monkeypatch.setattr(unicoil_index, "encode_unicoil_document",
+                        lambda query, model, tokenizer: [["canine", 0.5], ["kidney", 0.25]])
+    with pinned(IndexGeneration({"generation": "G1", "impact_quantization": 10})):
+        assert unicoil_search.encode_query("canine kidney") == {"canine": 5, "kidney": 2}
+    # Generations without a recorded scale use IMPACT_QUANTIZATION
+    with pinned(IndexGeneration({"generation": "G0"})):
+        assert unicoil_search.encode_query("canine kidney") == {"canine": 50, "kidney": 25}
+
+def test_parent_filters_match_passages_and_whole_documents():
+    documents = [
+        {"id": "book#0", "parent_id": "book", "vector": {"t1": 5}},
+        {"id": "book#1", "parent_id": "book", "vector": {"t1": 3}},
+        {"id": "quiz", "vector": {"t1": 4}},
+    ]
+    index = ImpactIndex.from_documents(documents)
+    assert [index.docs[d]["id"] for d, _ in index.search({"t1": 1}, 10, filters={"parent_id": "book"})] == \
+        ["book#0", "book#1"]
+    # Documents indexed whole are their own parent
+    assert [index.docs[d]["id"] for d, _ in index.search({"t1": 1}, 10, filters={"parent_id": "quiz"})] == ["quiz"]
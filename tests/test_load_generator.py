@@ -0,0 +1,128 @@
+import asyncio
+import random
+from collections import Counter
+
+import httpx
+import pytest
+
+from benchmarks.load_generator import (
+    HISTOGRAM_BOUNDS_MS, Recorder, histogram, main, parse_mix, plan_requests, poisson_schedule, report, send
+)
+
+BODIES = [{"query": "canine vaccination"}, {"query": "equine colic"}]
+
+def test_parse_mix_defaults_weights_to_one():
+    assert parse_mix("bm25=4, dense=0.5,all") == [("bm25", 4.0), ("dense", 0.5), ("all", 1.0)]
+
+def test_poisson_schedule_is_reproducible():
+    assert poisson_schedule(50, 10, random.Random(7)) == poisson_schedule(50, 10, random.Random(7))
+    assert poisson_schedule(50, 10, random.Random(7)) != poisson_schedule(50, 10, random.Random(8))
+
+def test_poisson_schedule_has_the_requested_rate():
+    offsets = poisson_schedule(100, 100, random.Random(0))
+    assert offsets == sorted(offsets)
+    assert 0 < offsets[0] and offsets[-1] < 100
+    # 10000 expected arrivals, standard deviation 100
+    assert abs(len(offsets) - 10000) < 400
+    gaps = [b - a for a, b in zip(offsets, offsets[1:])]
+    assert sum(gaps) / len(gaps) == pytest.approx(0.01, rel=0.05)
+    # Exponential gaps: about 1/e of them are longer than the mean
+    assert sum(gap > 0.01 for gap in gaps) / len(gaps) == pytest.approx(0.368, abs=0.03)
+
+def test_plan_follows_the_endpoint_and_filter_weights():
+    offsets = [i / 100 for i in range(4000)]
+    plan = plan_requests(BODIES, offsets, [("bm25", 3), ("dense", 1)], [("none", 1), ("strand", 1)],
+                         random.Random(0))
+    assert [offset for offset, _, _ in plan] == offsets
+    endpoints = Counter(endpoint for _, endpoint, _ in plan)
+    assert endpoints["bm25"] / len(plan) == pytest.approx(0.75, abs=0.03)
+    filtered = [body for _, _, body in plan if "filters" in body]
+    assert len(filtered) / len(plan) == pytest.approx(0.5, abs=0.03)
+    assert all(list(body["filters"]) == ["strand"] for body in filtered)
+    assert {body["query"] for _, _, body in plan} == {body["query"] for body in BODIES}
+
+def test_plan_keeps_the_endpoint_and_filters_of_replayed_requests():
+    bodies = [{"query": "dog", "endpoint": "all", "filters": {"course_id": "VET101"}}]
+    plan = plan_requests(bodies, [0.0, 1.0], [("bm25", 1)], [("strand", 1)], random.Random(0))
+    assert [(endpoint, body) for _, endpoint, body in plan] == \
+        [("all", {"query": "dog", "filters": {"course_id": "VET101"}})] * 2
+    # The replayed bodies themselves are left alone
+    assert bodies[0]["endpoint"] == "all"
+
+@pytest.mark.parametrize("endpoint_mix, filter_mix, bodies, message", [
+    ([("bm25", 1), ("sparse", 1)], [("none", 1)], BODIES, "--mix: sparse"),
+    ([("bm25", 1)], [("activity", 1)], BODIES, "--filters: activity"),
+    ([("bm25", 1)], [("none", 1)], [{"query": "dog", "endpoint": "hybrid"}], "--queries: hybrid"),
+])
+def test_plan_rejects_unknown_names(endpoint_mix, filter_mix, bodies, message):
+    with pytest.raises(ValueError, match=message):
+        plan_requests(bodies, [0.0], endpoint_mix, filter_mix, random.Random(0))
+
+def test_unknown_endpoints_stop_the_run_before_sending(monkeypatch):
+    monkeypatch.setattr("benchmarks.load_generator.run_load", lambda *args: pytest.fail("requests were sent"))
+    with pytest.raises(SystemExit):
+        main(["--mix", "bm25=1,sparse=1", "--duration", "1"])
+
+def test_histogram_buckets_latencies_by_upper_bound():
+    lines = histogram([0.5, 1.0, 1.5, 30, 30, 30, 20000], width=6).splitlines()
+    assert lines == [
+        f"    {'0-1ms':>14} {2:>7} ####",
+        f"    {'1-2ms':>14} {1:>7} ##",
+        f"    {'20-50ms':>14} {3:>7} ######",
+        f"    {'>10000ms':>14} {1:>7} ##",
+    ]
+    assert HISTOGRAM_BOUNDS_MS[-1] == float("inf")
+
+def test_report_counts_latencies_and_errors_per_endpoint(capsys):
+    recorder = Recorder()
+    for latency in range(1, 101):
+        recorder.record("bm25", float(latency), None)
+    recorder.record("bm25", 5000.0, "timeout")
+    recorder.record("dense", 3.0, "http_500")
+    recorder.send_lag_ms = [0.5] * 99 + [50.0]
+    rows = report(recorder, elapsed=10.0, rate=10.0)
+    assert rows["bm25"]["count"] == 100 and rows["bm25"]["sent"] == 101
+    assert rows["bm25"]["p50_ms"] == 50.0 and rows["bm25"]["p99_ms"] == 99.0
+    assert rows["bm25"]["errors"] == {"timeout": 1}
+    assert rows["dense"]["error_rate"] == 1.0
+    assert rows["total"]["sent"] == 102 and rows["total"]["qps"] == 10.0
+    assert rows["send_lag"]["p99_ms"] == 0.5
+    assert "fell behind" not in capsys.readouterr().out
+
+def test_report_warns_when_the_generator_falls_behind(capsys):
+    recorder = Recorder()
+    recorder.record("bm25", 1.0, None)
+    recorder.send_lag_ms = [25.0]
+    report(recorder, elapsed=1.0, rate=1.0)
+    assert "fell behind" in capsys.readouterr().out
+
+def run_send(status=200, server_delay=0.0, scheduled_ago=0.0, timeout=5.0):
+    """Send one request scheduled scheduled_ago seconds in the past to a stub server"""
+    async def handler(request):
+        await asyncio.sleep(server_delay)
+        return httpx.Response(status, json={"results": []})
+
+    async def run():
+        recorder = Recorder()
+        async with httpx.AsyncClient(base_url="http://api", transport=httpx.MockTransport(handler)) as client:
+            scheduled = asyncio.get_running_loop().time() - scheduled_ago
+            await send(client, "bm25", {"query": "dog"}, scheduled, timeout, recorder)
+        return recorder
+
+    return asyncio.run(run())
+
+def test_latency_is_measured_from_the_scheduled_time():
+    # Sent 0.2s late: the delay counts, as it would for a queued request
+    recorder = run_send(server_delay=0.05, scheduled_ago=0.2)
+    [latency] = recorder.latencies["bm25"]
+    assert 250 <= latency < 1000
+    assert recorder.send_lag_ms[0] >= 200
+
+def test_timeout_counts_from_the_scheduled_time():
+    recorder = run_send(server_delay=0.2, scheduled_ago=0.9, timeout=1.0)
+    assert recorder.errors["bm25"] == Counter({"timeout": 1})
+    assert not recorder.latencies["bm25"]
+
+def test_http_errors_are_recorded_by_status():
+    recorder = run_send(status=503)
+    assert recorder.errors["bm25"] == Counter({"http_503": 1})
@@ -0,0 +1,86 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from search.query_encoder import EncodeBatcher
+
+class RecordingEncoder:
+    """Encode a text as [text, its length], recording the batches it sees"""
+
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        if self.error is not None:
+            raise self.error
+        return [[text, len(text)] for text in texts]
+
+def encode_concurrently(batcher, texts):
+    with ThreadPoolExecutor(len(texts)) as pool:
+        futures = [pool.submit(batcher.encode, text) for text in texts]
+        return [future.exception() or future.result() for future in futures]
+
+def test_concurrent_callers_get_their_own_vectors():
+    encoder = RecordingEncoder()
+    texts = [f"query {'x' * i}" for i in range(16)]
+    batcher = EncodeBatcher(encoder, window_ms=10000, max_batch_size=len(texts))
+    try:
+        assert encode_concurrently(batcher, texts) == [[text, len(text)] for text in texts]
+    finally:
+        batcher.close()
+    # One model call for all of them
+    assert len(encoder.batches) == 1 and sorted(encoder.batches[0]) == sorted(texts)
+
+def test_full_batch_is_flushed_without_waiting_for_the_window():
+    encoder = RecordingEncoder()
+    batcher = EncodeBatcher(encoder, window_ms=10000, max_batch_size=4)
+    try:
+        start = time.monotonic()
+        encode_concurrently(batcher, ["a", "b", "c", "d"])
+        assert time.monotonic() - start < 5
+    finally:
+        batcher.close()
+    assert [len(batch) for batch in encoder.batches] == [4]
+
+def test_partial_batch_is_flushed_when_the_window_expires():
+    encoder = RecordingEncoder()
+    batcher = EncodeBatcher(encoder, window_ms=50, max_batch_size=32)
+    try:
+        start = time.monotonic()
+        assert batcher.encode("a") == ["a", 1]
+        elapsed = time.monotonic() - start
+    finally:
+        batcher.close()
+    assert 0.04 <= elapsed < 5
+    assert encoder.batches == [["a"]]
+
+def test_encode_errors_reach_every_caller_of_the_batch():
+    encoder = RecordingEncoder(error=RuntimeError("model failed"))
+    batcher = EncodeBatcher(encoder, window_ms=10000, max_batch_size=3)
+    try:
+        results = encode_concurrently(batcher, ["a", "b", "c"])
+        assert all(isinstance(result, RuntimeError) and str(result) == "model failed" for result in results)
+        # The batcher keeps serving after a failed batch
+        encoder.error = None
+        assert encode_concurrently(batcher, ["d", "e", "f"]) == [["d", 1], ["e", 1], ["f", 1]]
+    finally:
+        batcher.close()
+    assert [len(batch) for batch in encoder.batches] == [3, 3]
+
+def test_close_finishes_the_pending_batch():
+    encoder = RecordingEncoder()
+    batcher = EncodeBatcher(encoder, window_ms=10000, max_batch_size=32)
+    with ThreadPoolExecutor(1) as pool:
+        future = pool.submit(batcher.encode, "a")
+        time.sleep(0.05)
+        batcher.close()
+        assert future.result(timeout=5) == ["a", 1]
+
+def test_missing_vectors_fail_every_caller_of_the_batch():
+    batcher = EncodeBatcher(lambda texts: [[0.0]] * (len(texts) - 1), window_ms=10000, max_batch_size=3)
+    try:
+        results = encode_concurrently(batcher, ["a", "b", "c"])
+    finally:
+        batcher.close()
+    assert all(isinstance(result, ValueError) and "2 vectors for 3 texts" in str(result) for result in results)
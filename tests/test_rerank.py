@@ -0,0 +1,83 @@
+from benchmarks.standin_models import StandInCrossEncoder
+from search.rerank import RERANK_PROBE_BATCH, Reranker
+
+class RecordingCrossEncoder(StandInCrossEncoder):
+    def __init__(self, fixed_ms=1.0, per_item_ms=0.5):
+        super().__init__(fixed_ms, per_item_ms)
+        self.batch_sizes = []
+
+    def predict(self, pairs, batch_size=32, **kwargs):
+        self.batch_sizes.append(len(pairs))
+        return super().predict(pairs, batch_size, **kwargs)
+
+def candidates(count, matching=0):
+    """Hits in retrieval order; the first `matching` mention the query"""
+    return [{"id": f"doc{i}", "contents": "red fox" if i < matching else f"passage {i}"}
+            for i in range(count)]
+
+def test_cold_reranker_probes_before_full_batches():
+    model = RecordingCrossEncoder()
+    reranker = Reranker(model, batch_size=8, stable_batches=0)
+    results, stats = reranker.rerank("red fox", candidates(20, matching=3), k=5, budget_ms=10000)
+    assert model.batch_sizes[0] == RERANK_PROBE_BATCH
+    assert model.batch_sizes[1] == 8
+    assert stats["scored"] == 20 and stats["stop_reason"] == "exhausted"
+    assert [r["id"] for r in results[:3]] == ["doc0", "doc1", "doc2"]
+    assert all("rerank_score" in r for r in results)
+
+def test_cold_batch_respects_the_budget():
+    model = RecordingCrossEncoder(fixed_ms=10.0, per_item_ms=10.0)
+    reranker = Reranker(model, batch_size=16)
+    _, stats = reranker.rerank("red fox", candidates(50), k=10, budget_ms=40)
+    assert model.batch_sizes[0] == RERANK_PROBE_BATCH
+    assert stats["stop_reason"] == "budget"
+    assert stats["elapsed_ms"] < 80
+
+def test_warm_batches_are_sized_to_the_remaining_budget():
+    model = RecordingCrossEncoder(fixed_ms=5.0, per_item_ms=5.0)
+    reranker = Reranker(model, batch_size=16, stable_batches=0)
+    reranker.rerank("warm up", candidates(20), k=10, budget_ms=10000)
+    _, stats = reranker.rerank("red fox", candidates(50), k=10, budget_ms=100)
+    assert stats["stop_reason"] == "budget"
+    assert 0 < stats["scored"] < 50
+    assert stats["elapsed_ms"] < 150
+
+def test_zero_budget_keeps_retrieval_order():
+    model = RecordingCrossEncoder()
+    reranker = Reranker(model)
+    results, stats = reranker.rerank("red fox", candidates(10, matching=10), k=5, budget_ms=0)
+    assert model.batch_sizes == []
+    assert stats["scored"] == 0 and stats["stop_reason"] == "budget"
+    assert [r["id"] for r in results] == [f"doc{i}" for i in range(5)]
+    assert all("rerank_score" not in r for r in results)
+
+def test_candidate_budget_limits_scoring():
+    reranker = Reranker(RecordingCrossEncoder(), stable_batches=0)
+    _, stats = reranker.rerank("red fox", candidates(30), k=5, max_candidates=12, budget_ms=10000)
+    assert stats["candidates"] == 12 and stats["scored"] == 12
+
+def test_stable_top_k_stops_early():
+    reranker = Reranker(RecordingCrossEncoder(), batch_size=4, stable_batches=2)
+    reranker.rerank("warm up", candidates(8), k=3, budget_ms=10000)
+    _, stats = reranker.rerank("red fox", candidates(40, matching=3), k=3, budget_ms=10000)
+    assert stats["stop_reason"] == "stable"
+    assert stats["scored"] < 40
+
+def test_scores_are_cached_per_namespace_and_passage():
+    model = RecordingCrossEncoder()
+    reranker = Reranker(model, stable_batches=0)
+    hits = [
+        {"id": "doc", "passage_id": "doc#0", "contents": "red fox"},
+        {"id": "doc", "passage_id": "doc#1", "contents": "blue whale"},
+    ]
+    _, stats = reranker.rerank("red fox", hits, k=2, budget_ms=10000, namespace="gen-1")
+    assert stats["cache_hits"] == 0 and stats["scored"] == 2
+
+    calls = len(model.batch_sizes)
+    results, stats = reranker.rerank("red fox", hits, k=2, budget_ms=10000, namespace="gen-1")
+    assert stats["cache_hits"] == 2 and len(model.batch_sizes) == calls
+    assert [r["passage_id"] for r in results] == ["doc#0", "doc#1"]
+    assert results[0]["rerank_score"] > results[1]["rerank_score"]
+
+    _, stats = reranker.rerank("red fox", hits, k=2, budget_ms=10000, namespace="gen-2")
+    assert stats["cache_hits"] == 0
@@ -0,0 +1,62 @@
+import pytest
+
+from indexing.scheduler import Checkpoint, Stage, reset_checkpoints, run_stages
+
+ITEMS = list(range(10))
+
+class FlakyWork:
+    """Processes ITEMS one at a time, checkpointing after each, failing once at fail_at"""
+
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.processed = []
+
+    def __call__(self, checkpoint, progress):
+        for position in range(checkpoint.position, len(ITEMS)):
+            if position == self.fail_at:
+                self.fail_at = None
+                raise RuntimeError("interrupted")
+            self.processed.append(ITEMS[position])
+            checkpoint.save(position + 1)
+            progress.update()
+
+def test_stage_resumes_from_its_checkpoint(tmp_path):
+    work = FlakyWork(fail_at=4)
+    stages = [Stage("encode", work, total=len(ITEMS))]
+    with pytest.raises(RuntimeError):
+        run_stages(stages, str(tmp_path))
+    assert Checkpoint("encode", str(tmp_path)).position == 4
+
+    run_stages(stages, str(tmp_path))
+    assert work.processed == ITEMS
+    assert Checkpoint("encode", str(tmp_path)).completed
+
+def test_completed_stages_are_skipped(tmp_path):
+    work = FlakyWork()
+    stages = [Stage("encode", work, total=len(ITEMS))]
+    run_stages(stages, str(tmp_path))
+    run_stages(stages, str(tmp_path))
+    assert work.processed == ITEMS
+
+    reset_checkpoints(str(tmp_path))
+    run_stages(stages, str(tmp_path))
+    assert work.processed == ITEMS + ITEMS
+
+def test_dependents_wait_for_a_failed_stage(tmp_path):
+    encode = FlakyWork(fail_at=0)
+    ingest = FlakyWork()
+    stages = [
+        Stage("ingest", ingest, total=len(ITEMS), depends_on=["encode"]),
+        Stage("encode", encode, total=len(ITEMS)),
+    ]
+    with pytest.raises(RuntimeError):
+        run_stages(stages, str(tmp_path))
+    assert ingest.processed == []
+
+    run_stages(stages, str(tmp_path))
+    assert encode.processed == ITEMS
+    assert ingest.processed == ITEMS
+
+def test_unknown_dependency_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        run_stages([Stage("ingest", FlakyWork(), depends_on=["encode"])], str(tmp_path))
@@ -0,0 +1,219 @@
+import json
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from tests.lucene_indexes import build_index, require_lucene
+
+import search.unicoil_search as unicoil_search
+from indexing.sharding import partition, shard_dirs, write_shard_manifest
+from search.bm25_search import search_bm25
+from search.impact_index import ImpactIndex
+from search.index_registry import IndexGeneration, pinned
+from search.sharded_search import collect_hits, route, scatter_gather, search_impact_shard, shard_bm25_params, shutdown_shard_pool
+
+NUM_SHARDS = 3
+WORDS = ["canine", "feline", "equine", "kidney", "vaccine", "colic", "renal", "fracture", "dental", "parasite",
+         "anaesthesia", "nutrition"]
+STRANDS = ["Internal Medicine", "Surgery", "Diagnostics"]
+QUERIES = ["canine kidney", "equine colic fracture", "feline renal nutrition", "dental parasite vaccine"]
+
+def corpus(num_docs=60, seed=0):
+    """Documents of varied lengths, so shard and global average lengths differ"""
+    rng = random.Random(seed)
+    documents = []
+    for i in range(num_docs):
+        words = rng.choices(WORDS, weights=range(len(WORDS), 0, -1), k=rng.randint(3, 40))
+        documents.append({
+            "id": f"doc{i}",
+            "contents": " ".join(words),
+            "strand": STRANDS[i % len(STRANDS)],
+            "vector": {word: rng.randint(1, 300) for word in set(words)},
+        })
+    return documents
+
+def build_sharded(documents, index_dir, build_shard, shard_by="id"):
+    for shard_docs, shard_dir in zip(partition(documents, NUM_SHARDS, shard_by), shard_dirs(index_dir, NUM_SHARDS)):
+        build_shard(shard_docs, shard_dir)
+    write_shard_manifest(index_dir, NUM_SHARDS, shard_by)
+
+def assert_same_ranking(results, expected, k):
+    """
+    Results rank like the first k of expected, a deeper unsharded hit list.
+
+    Tied documents may come in another order (Lucene breaks ties by internal
+    doc number), so each document must only have its unsharded score.
+    """
+    # Lucene scores in float32; boosts and adjusted k1/b round slightly differently
+    assert [r["score"] for r in results] == pytest.approx([e["score"] for e in expected[:k]], rel=1e-4)
+    expected_scores = {e["id"]: e["score"] for e in expected}
+    for result in results:
+        assert result["score"] == pytest.approx(expected_scores[result["id"]], rel=1e-4)
+
+@pytest.fixture(scope="module", autouse=True)
+def shard_pool():
+    yield
+    shutdown_shard_pool()
+
+@pytest.fixture(scope="module")
+def bm25_generations(tmp_path_factory):
+    require_lucene()
+    root = tmp_path_factory.mktemp("bm25")
+    documents = corpus()
+    build_index(documents, str(root / "input"), str(root / "unsharded"))
+    build_sharded(documents, str(root / "sharded"),
+                  lambda docs, shard_dir: build_index(docs, f"{shard_dir}-input", shard_dir))
+    unsharded = IndexGeneration({"generation": "unsharded", "bm25_path": str(root / "unsharded")})
+    sharded = IndexGeneration({"generation": "sharded", "bm25_path": str(root / "sharded")})
+    yield unsharded, sharded
+    unsharded.close()
+
+@pytest.fixture(scope="module")
+def lucene_impact_generations(tmp_path_factory):
+    require_lucene()
+    root = tmp_path_factory.mktemp("unicoil")
+    documents = corpus()
+    build_index(documents, str(root / "input"), str(root / "unsharded"), impact=True)
+    build_sharded(documents, str(root / "sharded"),
+                  lambda docs, shard_dir: build_index(docs, f"{shard_dir}-input", shard_dir, impact=True))
+    unsharded = IndexGeneration({"generation": "unsharded", "unicoil_path": str(root / "unsharded")})
+    sharded = IndexGeneration({"generation": "sharded", "unicoil_path": str(root / "sharded")})
+    yield unsharded, sharded
+    unsharded.close()
+
+@pytest.fixture(scope="module")
+def native_generations(tmp_path_factory):
+    root = tmp_path_factory.mktemp("native")
+    documents = corpus()
+    ImpactIndex.from_documents(documents).save(str(root / "unsharded"))
+    build_sharded(documents, str(root / "sharded"),
+                  lambda docs, shard_dir: ImpactIndex.from_documents(docs).save(shard_dir))
+    return (IndexGeneration({"generation": "unsharded", "unicoil_native_path": str(root / "unsharded")}),
+            IndexGeneration({"generation": "sharded", "unicoil_native_path": str(root / "sharded")}))
+
+def test_shard_bm25_params_normalize_by_the_global_average_length():
+    k1, b = shard_bm25_params(0.9, 0.4, shard_avgdl=30.0, global_avgdl=20.0)
+    # Same length-independent part, and the same weight on dl relative to the global average
+    assert k1 * (1 - b) == pytest.approx(0.9 * 0.6)
+    assert k1 * b / 30.0 == pytest.approx(0.9 * 0.4 / 20.0)
+    assert shard_bm25_params(0.9, 0.4, 20.0, 20.0) == pytest.approx((0.9, 0.4))
+
+def test_shard_key_filters_route_to_one_shard():
+    shard_manifest = {"num_shards": NUM_SHARDS, "shard_by": "course_id", "shards": ["a", "b", "c"]}
+    assert len(route(shard_manifest, {"course_id": "VET101"})) == 1
+    assert route(shard_manifest, {"strand": "Surgery"}) == [0, 1, 2]
+    # Documents without a course are spread by id
+    assert route(shard_manifest, {"course_id": ""}) == [0, 1, 2]
+    assert route(shard_manifest, None) == [0, 1, 2]
+
+@pytest.mark.parametrize("filters", [None, {"strand": "Surgery"}])
+def test_sharded_bm25_matches_unsharded(bm25_generations, filters):
+    unsharded, sharded = bm25_generations
+    for query in QUERIES:
+        with pinned(unsharded):
+            expected = search_bm25(query, filters, k=30)
+        with pinned(sharded):
+            results = search_bm25(query, filters, k=10)
+        assert len(results) == 10
+        assert_same_ranking(results, expected, 10)
+        if filters:
+            assert all(r["strand"] == "Surgery" for r in results)
+
+@pytest.mark.parametrize("filters", [None, {"strand": "Surgery"}])
+def test_sharded_native_impact_search_matches_unsharded(native_generations, monkeypatch, filters):
+    unsharded, sharded = native_generations
+    rng = random.Random(1)
+    for _ in range(10):
+        weights = {word: rng.randint(1, 200) for word in rng.sample(WORDS, 3)}
+        monkeypatch.setattr(unicoil_search, "encode_query", lambda query: weights)
+        with pinned(unsharded):
+            expected = unicoil_search.search_unicoil_native("query", filters, k=30)
+        with pinned(sharded):
+            results = unicoil_search.search_unicoil_native("query", filters, k=10)
+        assert_same_ranking(results, expected, 10)
+
+@pytest.mark.parametrize("filters", [None, {"strand": "Surgery"}])
+def test_sharded_lucene_impact_search_matches_unsharded(lucene_impact_generations, monkeypatch, filters):
+    unsharded, sharded = lucene_impact_generations
+    monkeypatch.setattr(unicoil_search, "UNICOIL_ENGINE", "lucene")
+    monkeypatch.setattr(unicoil_search, "encode_query", lambda query: {"canine": 30, "colic": 20, "renal": 10})
+    with pinned(unsharded):
+        expected = unicoil_search.search_unicoil("query", filters, k=30)
+    with pinned(sharded):
+        results = unicoil_search.search_unicoil("query", filters, k=10)
+    assert len(results) == 10
+    assert_same_ranking(results, expected, 10)
+
+def test_merge_keeps_the_best_hits_of_all_shards(native_generations):
+    _, sharded = native_generations
+    path = sharded.manifest["unicoil_native_path"]
+    weights = {"canine": 10, "kidney": 5}
+    hits = scatter_gather(search_impact_shard, path, sharded.shard_manifest("unicoil_native_path"), weights, 7,
+                          engine="native")
+    scores = [score for score, _ in hits]
+    assert len(hits) == 7 and scores == sorted(scores, reverse=True)
+    # Every shard's own top 7 is no better than the merged 7th hit, unless it made the merge
+    merged_ids = {doc["id"] for _, doc in hits}
+    for name in sharded.shard_manifest("unicoil_native_path")["shards"]:
+        shard = ImpactIndex.load(f"{path}/{name}")
+        for doc_num, score in shard.search(weights, 7):
+            assert shard.docs[doc_num]["id"] in merged_ids or score <= scores[-1]
+
+@pytest.mark.parametrize("filters", [{"course_id": ""}, {"course_id": "VET102"}])
+def test_course_sharded_search_finds_documents_without_a_course(tmp_path, monkeypatch, filters):
+    documents = corpus()
+    for i, doc in enumerate(documents):
+        if i % 3:
+            doc["course_id"] = f"VET10{i % 3}"
+    ImpactIndex.from_documents(documents).save(str(tmp_path / "unsharded"))
+    build_sharded(documents, str(tmp_path / "sharded"),
+                  lambda docs, shard_dir: ImpactIndex.from_documents(docs).save(shard_dir), shard_by="course_id")
+    unsharded = IndexGeneration({"generation": "unsharded", "unicoil_native_path": str(tmp_path / "unsharded")})
+    sharded = IndexGeneration({"generation": "sharded", "unicoil_native_path": str(tmp_path / "sharded")})
+    monkeypatch.setattr(unicoil_search, "encode_query", lambda query: {word: 10 for word in WORDS})
+    with pinned(unsharded):
+        expected = unicoil_search.search_unicoil_native("query", filters, k=30)
+    with pinned(sharded):
+        results = unicoil_search.search_unicoil_native("query", filters, k=10)
+    assert len(results) == 10
+    assert_same_ranking(results, expected, 10)
+
+class CountingSearcher:
+    """Hits over stored documents in a fixed ranking, counting document loads"""
+
+    def __init__(self, documents):
+        self.documents = {doc["id"]: doc for doc in documents}
+        self.ranking = [doc["id"] for doc in documents]
+        self.loads = []
+        self.depths = []
+
+    def search(self, k):
+        self.depths.append(k)
+        return [SimpleNamespace(docid=docid, score=float(len(self.ranking) - rank))
+                for rank, docid in enumerate(self.ranking[:k])]
+
+    def doc(self, docid):
+        self.loads.append(docid)
+        return SimpleNamespace(raw=lambda: json.dumps(self.documents[docid]))
+
+def test_deepening_loads_each_document_once():
+    documents = [{"id": f"doc{i}", "strand": "Surgery" if i % 20 == 19 else "Diagnostics"} for i in range(400)]
+    searcher = CountingSearcher(documents)
+    hits = collect_hits(searcher.search, searcher, 5, {"strand": "Surgery"})
+    assert [doc["id"] for _, doc in hits] == ["doc19", "doc39", "doc59", "doc79", "doc99"]
+    assert searcher.depths == [5, 20, 80, 320]
+    assert len(searcher.loads) == len(set(searcher.loads)) == 100
+
+def test_deepening_stops_at_the_maximum_depth():
+    documents = [{"id": f"doc{i}", "strand": "Surgery" if i == 350 else "Diagnostics"} for i in range(400)]
+    searcher = CountingSearcher(documents)
+    assert collect_hits(searcher.search, searcher, 5, {"strand": "Surgery"}, max_depth=100) == []
+    assert searcher.depths == [5, 20, 80, 100]
+    assert len(searcher.loads) == 100
+
+def test_parent_filters_match_whole_documents_by_id():
+    documents = [{"id": "book#0", "parent_id": "book"}, {"id": "quiz"}, {"id": "exam", "parent_id": ""}]
+    searcher = CountingSearcher(documents)
+    assert [doc["id"] for _, doc in collect_hits(searcher.search, searcher, 5, {"parent_id": "quiz"})] == ["quiz"]
+    assert [doc["id"] for _, doc in collect_hits(searcher.search, searcher, 5, {"parent_id": "exam"})] == ["exam"]
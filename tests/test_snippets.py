@@ -0,0 +1,56 @@
+import pytest
+from pydantic import ValidationError
+
+from api.main import SearchRequest
+from search.snippets import SNIPPET_MAX_LENGTH, extract_snippet
+
+FILLER = "Cats purr softly in the sun all afternoon long. "
+
+def test_short_text_is_returned_unchanged():
+    assert extract_snippet("The dog barks here.", "dog", 100) == "The dog barks here."
+
+def test_window_at_the_end_keeps_punctuation():
+    text = FILLER * 3 + "The dog barks here."
+    assert extract_snippet(text, "dog barks", 40) == "…The dog barks here."
+
+def test_window_at_the_start_has_no_leading_ellipsis():
+    text = "The dog barks here. " + FILLER * 3
+    snippet = extract_snippet(text, "dog barks", 40)
+    assert snippet.startswith("The dog barks here.")
+    assert snippet.endswith("…")
+
+def test_window_in_the_middle_is_cut_on_both_sides():
+    text = FILLER * 3 + "The dog barks here. " + FILLER * 3
+    snippet = extract_snippet(text, "dog barks", 40)
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert "The dog barks here." in snippet
+    assert len(snippet.strip("…")) <= 40
+
+def test_window_covers_the_most_distinct_terms():
+    text = "dog " + FILLER * 3 + "The dog barks at the cat. " + FILLER * 3
+    snippet = extract_snippet(text, "dog barks cat", 40)
+    assert "dog barks at the cat" in snippet
+
+def test_word_longer_than_the_window_is_cut():
+    assert extract_snippet("x" * 50, "x", 10) == "x" * 10 + "…"
+
+def test_words_longer_than_the_window_are_skipped():
+    text = "dog " + "x" * 50 + " the dog barks"
+    assert extract_snippet(text, "x dog barks", 14) == "…dog barks"
+
+@pytest.mark.parametrize("length", [0, -1, SNIPPET_MAX_LENGTH + 1])
+def test_out_of_range_snippet_lengths_are_rejected(length):
+    with pytest.raises(ValidationError):
+        SearchRequest(query="dog", snippet_length=length)
+
+def test_closing_punctuation_counts_towards_the_length():
+    text = "alpha beta gamma. " * 10 + "delta epsilon zeta!!!"
+    snippet = extract_snippet(text, "zeta", 20)
+    assert snippet.endswith("zeta!!!")
+    assert len(snippet.strip("…")) <= 20
+
+@pytest.mark.parametrize("max_chars", range(5, 60))
+def test_snippets_never_exceed_the_length(max_chars):
+    text = "alpha beta gamma. " * 10 + "delta epsilon zeta!!!   "
+    for query in ("zeta", "alpha delta", "gamma", "missing", "epsilon"):
+        assert len(extract_snippet(text, query, max_chars).strip("…")) <= max_chars
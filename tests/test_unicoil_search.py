@@ -0,0 +1,42 @@
+import pytest
+
+from tests.lucene_indexes import build_index, require_lucene
+
+require_lucene()
+
+import search.unicoil_search as unicoil_search
+from search.index_registry import IndexGeneration, pinned
+
+DOCUMENTS = [
+    {"id": "d1", "contents": "canine vaccine", "vector": {"canine": 120, "vaccine": 80}, "strand": "Surgery"},
+    {"id": "d2", "contents": "feline kidney", "vector": {"feline": 100, "kidney": 90}, "strand": "Medicine"},
+    {"id": "d3", "contents": "canine kidney", "vector": {"canine": 50, "kidney": 40}, "strand": "Medicine"},
+]
+
+QUERY_WEIGHTS = {"canine": 3, "kidney": 2}
+
+@pytest.fixture(scope="module")
+def generation(tmp_path_factory):
+    root = tmp_path_factory.mktemp("unicoil")
+    build_index(DOCUMENTS, str(root / "encoded"), str(root / "index"), impact=True)
+    generation = IndexGeneration({"generation": "test", "unicoil_path": str(root / "index")})
+    yield generation
+    generation.close()
+
+@pytest.fixture(autouse=True)
+def lucene_engine(monkeypatch):
+    monkeypatch.setattr(unicoil_search, "UNICOIL_ENGINE", "lucene")
+    # Pre-encoded weights stand in for the uniCOIL model
+    monkeypatch.setattr(unicoil_search, "encode_query", lambda query: QUERY_WEIGHTS)
+
+def test_search_ranks_by_impact_scores(generation):
+    with pinned(generation):
+        results = unicoil_search.search_unicoil("canine kidney", k=3)
+    # d1: 3 * 120, d3: 3 * 50 + 2 * 40, d2: 2 * 90
+    assert [(r["id"], r["score"]) for r in results] == [("d1", 360.0), ("d3", 230.0), ("d2", 180.0)]
+    assert results[0]["contents"] == "canine vaccine"
+
+def test_search_applies_filters(generation):
+    with pinned(generation):
+        results = unicoil_search.search_unicoil("canine kidney", filters={"strand": "Medicine"}, k=1)
+    assert [r["id"] for r in results] == ["d3"]
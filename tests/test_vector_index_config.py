@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+import indexing.vector_index_config as vector_index_config
+from indexing.vector_index_config import DEFAULT_INDEX_SETTINGS, build_vector_index_config, get_index_settings, \
+    load_index_overrides
+
+def test_uncompressed_settings_pass_through():
+    config = build_vector_index_config({"ef": 128, "maxConnections": 32, "compression": "none"})
+    assert config == {"skip": False, "ef": 128, "maxConnections": 32}
+
+def test_compression_defaults_to_none():
+    assert build_vector_index_config({}) == {"skip": False}
+
+def test_pq_defaults():
+    config = build_vector_index_config({"compression": "pq"})
+    assert config["pq"] == {
+        "enabled": True,
+        "segments": 0,
+        "centroids": 256,
+        "trainingLimit": 100000,
+        "encoder": {"type": "kmeans", "distribution": "log-normal"}
+    }
+
+def test_pq_options():
+    config = build_vector_index_config({"compression": "pq", "pqSegments": 96, "pqCentroids": 128,
+                                        "trainingLimit": 5000, "ef": 64})
+    assert config["ef"] == 64
+    assert config["pq"]["segments"] == 96 and config["pq"]["centroids"] == 128
+    assert config["pq"]["trainingLimit"] == 5000
+    assert "compression" not in config and "pqSegments" not in config
+
+def test_bq_with_rescoring():
+    assert build_vector_index_config({"compression": "bq"})["bq"] == {"enabled": True}
+    config = build_vector_index_config({"compression": "bq", "rescoreLimit": 200})
+    assert config["bq"] == {"enabled": True, "rescoreLimit": 200}
+    assert "rescoreLimit" not in config
+
+def test_sq_defaults_and_options():
+    assert build_vector_index_config({"compression": "sq"})["sq"] == {"enabled": True, "trainingLimit": 100000}
+    config = build_vector_index_config({"compression": "sq", "trainingLimit": 1000, "rescoreLimit": 64})
+    assert config["sq"] == {"enabled": True, "trainingLimit": 1000, "rescoreLimit": 64}
+
+def test_unknown_compression_is_rejected():
+    with pytest.raises(ValueError, match="Unknown vector compression"):
+        build_vector_index_config({"compression": "opq"})
+
+@pytest.mark.parametrize("settings", [
+    {"compression": "none", "rescoreLimit": 100},
+    {"compression": "pq", "rescoreLimit": 100},
+    {"compression": "bq", "trainingLimit": 1000},
+    {"compression": "sq", "pqSegments": 96},
+    {"pqCentroids": 256},
+])
+def test_options_of_other_compressions_are_rejected(settings):
+    with pytest.raises(ValueError, match="only applies to"):
+        build_vector_index_config(settings)
+
+@pytest.mark.parametrize("settings", [
+    {"compression": "bq", "rescoreLimit": 0},
+    {"compression": "sq", "trainingLimit": -1},
+    {"compression": "sq", "trainingLimit": "1000"},
+    {"compression": "pq", "pqSegments": -8},
+    {"compression": "pq", "pqSegments": 1.5},
+    {"compression": "pq", "pqCentroids": 512},
+    {"compression": "pq", "pqCentroids": True},
+])
+def test_invalid_option_values_are_rejected(settings):
+    with pytest.raises(ValueError, match="must be an integer"):
+        build_vector_index_config(settings)
+
+def test_default_settings_build():
+    for settings in DEFAULT_INDEX_SETTINGS.values():
+        build_vector_index_config(settings)
+    config = build_vector_index_config(get_index_settings("VetDocumentMultiVector"))
+    assert config["ef"] == 256 and config["multiVectorStorage"] is True
+
+def test_overrides_apply_to_versioned_classes(monkeypatch):
+    overrides = {"VetDocument": {"compression": "bq", "rescoreLimit": 100}, "VetDocument_G2": {"ef": 64}}
+    monkeypatch.setattr(vector_index_config, "load_index_overrides", lambda: overrides)
+    assert get_index_settings("VetDocument_G2", "VetDocument") == {"compression": "bq", "rescoreLimit": 100, "ef": 64}
+    assert get_index_settings("VetDocument_G1", "VetDocument") == {"compression": "bq", "rescoreLimit": 100}
+
+def test_overrides_are_read_inline_or_from_a_file(tmp_path):
+    overrides = {"VetDocument": {"compression": "sq"}}
+    path = tmp_path / "index_config.json"
+    path.write_text(json.dumps(overrides))
+    assert load_index_overrides(json.dumps(overrides)) == overrides
+    assert load_index_overrides(str(path)) == overrides
+    assert load_index_overrides("") == {}
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import search.weaviate_client as weaviate_client
+from search.weaviate_client import get_client, run_query
+
+class StubClient:
+    """Stand-in for weaviate.Client that only answers health checks"""
+
+    def __init__(self, live=True):
+        self.live = live
+        self.health_checks = 0
+
+    def is_live(self):
+        self.health_checks += 1
+        if isinstance(self.live, Exception):
+            raise self.live
+        return self.live
+
+@pytest.fixture
+def clients(monkeypatch):
+    """Clients created by get_client, in creation order, with no shared client yet"""
+    created = []
+
+    def create_client(*args, **kwargs):
+        created.append(StubClient())
+        return created[-1]
+
+    monkeypatch.setattr(weaviate_client, "create_client", create_client)
+    monkeypatch.setattr(weaviate_client, "_client", None)
+    monkeypatch.setattr(weaviate_client, "_last_health_check", 0.0)
+    return created
+
+def failing_query(failures):
+    """Query raising ConnectionError on its first `failures` calls, recording the clients it ran on"""
+    calls = []
+
+    def query_fn(client):
+        calls.append(client)
+        if len(calls) <= failures:
+            raise requests.exceptions.ConnectionError("connection refused")
+        return {"data": len(calls)}
+
+    return query_fn, calls
+
+def test_connection_error_is_retried_once_on_a_new_client(clients):
+    query_fn, calls = failing_query(failures=1)
+    assert run_query(query_fn) == {"data": 2}
+    assert len(clients) == 2
+    assert calls == clients
+
+def test_second_connection_error_is_raised(clients):
+    query_fn, calls = failing_query(failures=2)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        run_query(query_fn)
+    assert len(calls) == 2 and len(clients) == 2
+
+def test_other_errors_are_not_retried(clients):
+    def query_fn(client):
+        raise ValueError("bad query")
+
+    with pytest.raises(ValueError):
+        run_query(query_fn)
+    assert len(clients) == 1
+
+def test_health_is_checked_at_most_once_per_interval(clients, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(weaviate_client, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    client = get_client()
+    assert get_client() is client
+    assert client.health_checks == 0
+
+    now[0] += weaviate_client.WEAVIATE_HEALTH_CHECK_INTERVAL
+    assert get_client() is client
+    assert client.health_checks == 1
+    assert get_client() is client
+    assert client.health_checks == 1
+
+@pytest.mark.parametrize("live", [False, requests.exceptions.ConnectionError("connection refused")])
+def test_unhealthy_client_is_replaced(clients, monkeypatch, live):
+    now = [1000.0]
+    monkeypatch.setattr(weaviate_client, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    client = get_client()
+    client.live = live
+    now[0] += weaviate_client.WEAVIATE_HEALTH_CHECK_INTERVAL
+    replacement = get_client()
+    assert replacement is not client and replacement is clients[-1]
+    assert len(clients) == 2